@@ -1,6 +1,10 @@
+import asyncio
+import contextlib
+import json
 import logging
-import base64
 import os
+import time
+import uuid
 
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -15,126 +19,450 @@ from livekit.agents import (
     RunContext,
     WorkerOptions,
     cli,
-    metrics,
     get_job_context,
+    metrics,
 )
-from livekit.agents.llm import function_tool, ImageContent
-from livekit.plugins import noise_cancellation, openai, silero
+from livekit.agents.llm import ChatContext, ImageContent, function_tool
+
+# Imported eagerly: the turn detector registers its inference runner, which the worker's
+# shared inference process is built from. The openai, silero and noise_cancellation plugins
+# are only needed inside jobs and are imported in prewarm/entrypoint (see `_import_plugins`).
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
-from livekit import rtc
-import asyncio
-import io
-import httpx
-import openai as openai_lib
-from livekit.agents.utils.images import encode as lk_encode
-from livekit.agents.utils.images import EncodeOptions as LKEncodeOptions, ResizeOptions as LKResizeOptions
-import json
-import uuid
+
+# The screen and vision modules stay eager: livekit.agents already loads numpy and its image
+# utilities, so they add only Pillow and ~15 ms to a ~2 s import, and prewarm needs them anyway
+from agent_logging import LogRollup, install_queue_logging, log_sampled
+from chat_compaction import ChatCompactor
+from llm_routing import HedgedLLM
+from perf_metrics import SessionMetrics
+from prompt_stream import PromptStreamer
+from screen_capture import (
+    SCREEN_REGION_THUMBNAIL_SIDE,
+    EncodedFrame,
+    ScreenCapture,
+    get_encode_executor,
+)
+from screen_ocr import SCREEN_TEXT_HEADER, ScreenTextReader
+from session_reaper import IdleReaper
+from tts_cache import PhraseAudioCache
+from ui_publisher import UiPublisher
+from vision_context import estimate_request_bytes, prune_screenshots, screenshots_last
+from vision_policy import VisionDecision, VisionPolicy
+from worker_load import JobLoadReporter, WorkerLoadEstimator, mode_for_room
 
 logger = logging.getLogger("agent")
 
 load_dotenv(".env")
 
+TTS_MODEL = "gpt-4o-mini-tts"
+TTS_VOICE = "echo"
+
+# Fixed phrases are pre-rendered once and replayed from the phrase audio cache
+GREETINGS = {
+    "copilot": "Pair Mode activated! What do you want to do?",
+    "lesson": "Hi! Ready for a quick learning session?",
+}
+CONVERSATION_TIMEOUT_MESSAGE = os.getenv(
+    "CONVERSATION_TIMEOUT_MESSAGE",
+    "Time's up! Ending the session now. You can reconnect if you'd like to continue.",
+)
+IDLE_PROMPT_MESSAGE = os.getenv("IDLE_PROMPT_MESSAGE", "Are you still there?")
+IDLE_TIMEOUT_MESSAGE = os.getenv(
+    "IDLE_TIMEOUT_MESSAGE",
+    "Looks like you stepped away, so I'm ending the session. Reconnect anytime!",
+)
+
+
+# The lesson runs as one agent per section (see `Assistant.lesson_section`), so each LLM
+# request carries the shared rules plus only the active section's script.
+LESSON_PREAMBLE = """You are a helpful voice AI assistant.
+Your responses are concise, to the point, and without any complex formatting or punctuation including emojis, asterisks, or other symbols.
+You are curious, friendly, and have a sense of humor.
+
+**GENERAL RULES, VERY IMPORTANT:**
+
+-- In Lesson sections, that's a rough script, you can improvise and add your own touches, just make sure that the education is fun, engaging, quick and goal is achieved.
+-- Don't spit out a lot of text at once: not more than 1-2 sentences at once -- and then wait for the user to reply (ask a question or ask for them to do something to make it fun, conversational and interactive).
+-- After asking a question, stop speaking and wait for the user to reply.
+-- If user has shared their screen and navigates ChatGPT using your instructions, acknowledge that you see it and either confirm that they are doing it correctly or help them. Use very concise reactions like "Ok I see", "All good", "No not there" etc.
+
+**INTERACTION SEQUENCE**
+
+The session has four sections: Introduction, Lesson 1: AI Alignment, Lesson 2: Critical Thinking and Wrap-up.
+Below is the script of the current section only; you get the next one after marking this one "completed".
+"""
+
+LESSON_SECTIONS = {
+    "0": """**Introduction**
+
+Greetings message will be sent from your side automatically.
+After user replies, say "Great, Let's start! It will be quciker and more fun if you open ChatGPT and share your screen with me"
+
+If required, help user open ChatGPT (https://chatgpt.com) in a new tab and share it with you (your app has a standard video call inerface with "Share screen" button).
+If user doesn't want to share their screen, that's fine, you can still help them with the lesson.
+
+After screen is shared or user doesn't want to share it, call the `set_lesson_status` tool with the id=0 and status "completed".
+If the screen is shared, confirm it with a quick reaction like "Ok I see the screen now thanks!".
+""",
+    "1": """**Lesson 1: AI Alignment**
+
+Start this lesson with smth concise and catchy like this: "Let's start! Personalization is key for aligning your AI to your needs and values. Ask ChatGPT to suggest one recipe for the dinner." (call update_prompt tool with the "suggest one recipe for the dinner" prompt and tell the  user that they can copy the prompt from the converation interface (don't voice the prompt out loud))
+After it's done, ask if this was on point or not? After getting an answer or if screen is shared, ackowledge the recipe with a reaction like Yummy, Meh or anything short and emotional. And then move to the next step.
+On the left bottom corner of the screen, there should be a button with a person or letter icon depending on the version and account. Ask user to click on it depending on what you see, e.g. "Click on the cat icon" or "Click on the letter A icon".
+They/you will see the "Customize ChatGPT" menu and should click there too. Ask for them to confirm when done, wait for the answer.
+Ask user about their favorite food. Wait for the answer. If they say that they don't know, say that you can use hamburger as an example.
+After receiving the answer about the favourite food or defaulting to hamburgers, ask user to put it into the box.
+But also add there that they LOVE this food and only eat it. When done, ask to click Save and open a new chat and ask ChatGPT to suggest a recipe for the dinner again and ask "let you know what they think".
+Acknowledge the difference in the recipe.
+Make a conclusion about an importance of personalization: that was a simple example, but it's important to personalize your AI to your needs and values.
+Especially if you rely on it when it comes to high stakes decisions like choosing a job, a partner, a house, etc.
+Then you can move to the next lesson with a phrase like "Ok let's move next!".
+Call the `set_lesson_status` tool with id=1 and status "completed".
+""",
+    "2": """**Lesson 2: Critical Thinking**
+
+Content for this lesson (you can change the wording to make it more engaging):
+- LLMs are designed to maximize both helpfulness and engagement. Therefore they can be biased towards what's more engaging, not what's more helpful.
+One example of it is Confirmation Bias. If you craft a prompt that is biased towards a certain outcome, the LLM will tend to confirm that outcome.
+Example: you can first ask "give me three reasons why dropping out of college will be my best decision, and nothing else". (you must also call update_prompt tool with the prompt and ask user to copy the prompt from your converation interface)
+And then ask the opposite: "give me three reasons why staying in college will be my best decision, and nothing else". (you must also call update_prompt tool with the prompt and ask user to copy the prompt from your converation interface)
+Ask user if see the point. After getting the answer, mention the importance of critical thinking and art of crafting prompts.
+Call the `set_lesson_status` tool with id=2 and status "completed".
+""",
+    "3": """**Wrap-up**
+
+Congratulate the user for completing the lessons! Great job! Say that they are ready to use AI to their advantage and you are happy to assist them during ChatGPT journey in "Pair Mode". (that is another mode that they can switch to on the main screen)
+Call the `set_lesson_status` tool with id=3 and status "completed".
+""",
+}
+
+
+def lesson_instructions(section: str) -> str:
+    return f"{LESSON_PREAMBLE}\n{LESSON_SECTIONS[section]}"
+
+
+def next_lesson_section(section: str) -> str | None:
+    sections = list(LESSON_SECTIONS)
+    index = sections.index(section) + 1
+    return sections[index] if index < len(sections) else None
+
+
+async def publish_lesson_status(section_id: str, status: str) -> None:
+    ctx = get_job_context()
+    payload = {"type": "lesson_status", "id": section_id, "status": status}
+    await ctx.room.local_participant.publish_data(
+        json.dumps(payload).encode("utf-8"),
+        topic="lesson-status",
+    )
+    logger.info("published lesson status: %s", payload)
+
 
 class Assistant(Agent):
-    def __init__(self, instructions: str | None = None) -> None:
-        super().__init__(
-            instructions=instructions
-            or """You are a helpful voice AI assistant.
-            Your responses are concise, to the point, and without any complex formatting or punctuation including emojis, asterisks, or other symbols.
-            You are curious, friendly, and have a sense of humor.
-
-            **GENERAL RULES, VERY IMPORTANT:**
-
-            -- In Lesson sections, that's a rough script, you can improvise and add your own touches, just make sure that the education is fun, engaging, quick and goal is achieved.
-            -- Don't spit out a lot of text at once: not more than 1-2 sentences at once -- and then wait for the user to reply (ask a question or ask for them to do something to make it fun, conversational and interactive).
-            -- After asking a question, stop speaking and wait for the user to reply.
-            -- If user has shared their screen and navigates ChatGPT using your instructions, acknowledge that you see it and either confirm that they are doing it correctly or help them. Use very concise reactions like "Ok I see", "All good", "No not there" etc.
-            
-            **INTERACTION SEQUENCE** (this is the main script)
-
-            **Introduction**
-
-            Greetings message will be sent from your side automatically.
-            After user replies, say "Great, Let's start! It will be quciker and more fun if you open ChatGPT and share your screen with me"
-
-            If required, help user open ChatGPT (https://chatgpt.com) in a new tab and share it with you (your app has a standard video call inerface with "Share screen" button).
-            If user doesn't want to share their screen, that's fine, you can still help them with the lesson.
-            
-            After screen is shared or user doesn't want to share it, call the `set_lesson_status` tool with the id=0 and status "completed".             
-            If the screen is shared, confirm it with a quick reaction like "Ok I see the screen now thanks!".
-
-            **Lesson 1: AI Alignment**
-
-            Call the `set_lesson_status` tool with id=1 and status "active".
-            Start this lesson with smth concise and catchy like this: "Let's start! Personalization is key for aligning your AI to your needs and values. Ask ChatGPT to suggest one recipe for the dinner." (call update_prompt tool with the "suggest one recipe for the dinner" prompt and tell the  user that they can copy the prompt from the converation interface (don't voice the prompt out loud))
-            After it's done, ask if this was on point or not? After getting an answer or if screen is shared, ackowledge the recipe with a reaction like Yummy, Meh or anything short and emotional. And then move to the next step.
-            On the left bottom corner of the screen, there should be a button with a person or letter icon depending on the version and account. Ask user to click on it depending on what you see, e.g. "Click on the cat icon" or "Click on the letter A icon".  
-            They/you will see the "Customize ChatGPT" menu and should click there too. Ask for them to confirm when done, wait for the answer.
-            Ask user about their favorite food. Wait for the answer. If they say that they don't know, say that you can use hamburger as an example. 
-            After receiving the answer about the favourite food or defaulting to hamburgers, ask user to put it into the box. 
-            But also add there that they LOVE this food and only eat it. When done, ask to click Save and open a new chat and ask ChatGPT to suggest a recipe for the dinner again and ask "let you know what they think".
-            Acknowledge the difference in the recipe. 
-            Make a conclusion about an importance of personalization: that was a simple example, but it's important to personalize your AI to your needs and values. 
-            Especially if you rely on it when it comes to high stakes decisions like choosing a job, a partner, a house, etc. 
-            Then you can move to the next lesson with a phrase like "Ok let's move next!".
-            Call the `set_lesson_status` tool with id=1 and status "completed".
-
-            **Lesson 2: Critical Thinking**
-            
-            Call the `set_lesson_status` tool with id=2 and status "active".
-            Content for this lesson (you can change the wording to make it more engaging):
-            - LLMs are designed to maximize both helpfulness and engagement. Therefore they can be biased towards what's more engaging, not what's more helpful.
-            One example of it is Confirmation Bias. If you craft a prompt that is biased towards a certain outcome, the LLM will tend to confirm that outcome.
-            Example: you can first ask "give me three reasons why dropping out of college will be my best decision, and nothing else". (you must also call update_prompt tool with the prompt and ask user to copy the prompt from your converation interface)
-            And then ask the opposite: "give me three reasons why staying in college will be my best decision, and nothing else". (you must also call update_prompt tool with the prompt and ask user to copy the prompt from your converation interface)
-            Ask user if see the point. After getting the answer, mention the importance of critical thinking and art of crafting prompts.
-            Call the `set_lesson_status` tool with id=2 and status "completed".
-
-            **Wrap-up**
-            Call the `set_lesson_status` tool with id=3 and status "active".        
-            Congratulate the user for completing the lessons! Great job! Say that they are ready to use AI to their advantage and you are happy to assist them during ChatGPT journey in "Pair Mode". (that is another mode that they can switch to on the main screen)
-            Call the `set_lesson_status` tool with id=3 and status "completed".
-            """,
-        )
+    def __init__(
+        self,
+        instructions: str | None = None,
+        screen_capture: ScreenCapture | None = None,
+        session_metrics: SessionMetrics | None = None,
+        load_reporter: JobLoadReporter | None = None,
+        compactor: ChatCompactor | None = None,
+        vision_policy: VisionPolicy | None = None,
+        screen_reader: ScreenTextReader | None = None,
+        ui_publisher: UiPublisher | None = None,
+        prompt_streamer: PromptStreamer | None = None,
+        lesson_section: str | None = None,
+        chat_ctx: ChatContext | None = None,
+    ) -> None:
+        self._screen_capture = screen_capture
+        self._session_metrics = session_metrics
+        self._load_reporter = load_reporter
+        self._compactor = compactor
+        self._vision_policy = vision_policy
+        self._screen_reader = screen_reader
+        self._ui_publisher = ui_publisher
+        self._prompt_streamer = prompt_streamer
+        # Without explicit instructions this is the lesson flow, one section per agent
+        if instructions is None:
+            lesson_section = lesson_section or next(iter(LESSON_SECTIONS))
+            instructions = lesson_instructions(lesson_section)
+        self.lesson_section = lesson_section
+        super().__init__(instructions=instructions, chat_ctx=chat_ctx or NOT_GIVEN)
+
+    async def on_enter(self) -> None:
+        # The first section starts with the scripted greeting; later ones are handoffs mid-lesson
+        if self.lesson_section is None or self.lesson_section == next(
+            iter(LESSON_SECTIONS)
+        ):
+            return
+        try:
+            await self._publish_lesson_status(self.lesson_section, "active")
+        except Exception:
+            logger.exception("failed to publish lesson status")
+        self.session.generate_reply()
+
+    async def _publish_lesson_status(self, section_id: str, status: str) -> None:
+        if self._ui_publisher:
+            # Queued and sent in order with retries; the tool doesn't wait for it
+            self._ui_publisher.publish(
+                "lesson-status",
+                {"type": "lesson_status", "id": section_id, "status": status},
+            )
+        else:
+            await publish_lesson_status(section_id, status)
 
     async def on_user_turn_completed(self, turn_ctx, new_message) -> None:
         # Attach the most recent screen frame (if any) to the new user message for vision-capable LLMs
-        ctx = get_job_context()
-        jpeg = ctx.proc.userdata.get("latest_screen_jpeg")
-        if jpeg:
-            data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("utf-8")
-            # Hint providers to use higher-detail vision when supported
-            try:
-                new_message.content.append(ImageContent(image=data_url, inference_detail="high"))
-                logger.info("attached screen image to chat ctx: %d bytes", len(jpeg))
-            except Exception:
-                # Fallback without extra options if provider doesn't support inference_detail
-                new_message.content.append(ImageContent(image=data_url))
-                logger.info("attached screen image to chat ctx (basic): %d bytes", len(jpeg))
+        capture = self._screen_capture
+        # Encodes the newest frame only if it hasn't been encoded yet
+        encoded = await capture.encoder.get_encoded() if capture else None
+        attached = 0
+        if encoded and not capture.change_detector.should_attach(encoded):
+            detector = capture.change_detector
+            # Screen hasn't changed since the last attached screenshot; don't pay for it again
+            log_sampled(
+                "screen unchanged",
+                "screen unchanged (diff=%s); skipping image attach, avoided=%d",
+                detector.last_diff,
+                detector.attachments_avoided,
+            )
+            if os.getenv("SCREEN_UNCHANGED_POLICY", "note") == "note":
+                new_message.content.append(
+                    "(The shared screen has not changed since the last screenshot.)"
+                )
+        elif encoded:
+            # In "ocr" screen context mode the screen goes as text when OCR reads it well enough
+            screen_text = (
+                await self._read_screen_text(encoded) if self._screen_reader else None
+            )
+            if screen_text is not None:
+                new_message.content.append(screen_text)
+            elif (
+                self._screen_reader
+                and os.getenv("SCREEN_OCR_FALLBACK", "image") != "image"
+            ):
+                new_message.content.append(
+                    "(The shared screen could not be read this turn.)"
+                )
+            else:
+                attached = await self._attach_screen(capture, encoded, new_message)
+            if attached:
+                # Only a frame the model has seen is the baseline for the next change
+                capture.change_detector.mark_attached(encoded)
+
+        # Keep only the newest screenshots at full detail; older ones are replaced or downgraded.
+        # turn_ctx is what this reply is generated from, update_chat_ctx persists it for later turns.
+        max_images = int(os.getenv("VISION_HISTORY_MAX_IMAGES", "2"))
+        pruned = prune_screenshots(
+            turn_ctx,
+            keep=max(0, max_images - attached),
+            policy=os.getenv("VISION_HISTORY_POLICY", "placeholder"),
+        )
+        if pruned:
+            await self.update_chat_ctx(turn_ctx)
+            log_sampled(
+                "screenshots pruned",
+                "pruned %d older screenshots from chat ctx",
+                pruned,
+                value=pruned,
+                unit="images",
+            )
+        if self._compactor:
+            # Summarizes older turns in the background once the history outgrows its budget
+            self._compactor.maybe_compact(self)
         await super().on_user_turn_completed(turn_ctx, new_message)
 
+    async def _read_screen_text(self, encoded: EncodedFrame) -> str | None:
+        reader = self._screen_reader
+        result = await reader.read(encoded)
+        if not reader.usable(result):
+            logger.info(
+                "screen OCR not usable (confidence=%s, words=%s); falling back",
+                round(result.confidence, 2) if result else None,
+                result.words if result else None,
+            )
+            return None
+        log_sampled(
+            "screen OCR used",
+            "screen OCR used instead of image: %d chars, confidence=%.2f",
+            len(result.text),
+            result.confidence,
+            value=len(result.text),
+            unit="chars",
+        )
+        return f"{SCREEN_TEXT_HEADER}\n{result.text}"
+
+    async def _attach_screen(
+        self, capture: ScreenCapture, encoded: EncodedFrame, new_message
+    ) -> int:
+        """Attach the screen to `new_message` as allowed by the vision policy; returns the number of images."""
+        attached = 0
+        # In "region" attach mode a change confined to part of the screen can go as a crop
+        region = capture.changed_region(encoded)
+        decision = self._decide_vision(capture, encoded, new_message, region)
+        crop = None
+        if region and (decision is None or decision.crop):
+            crop = await capture.encoder.get_region(encoded, region)
+            if crop is None and decision:
+                # The frame was replaced before it could be cropped: decide (and charge) for
+                # the full screenshot that goes instead
+                self._vision_policy.refund(decision)
+                decision = self._decide_vision(capture, encoded, new_message, None)
+        if decision and not decision.attach:
+            new_message.content.append("(A screenshot was not attached this turn.)")
+        else:
+            if crop:
+                x0, y0, x1, y1 = region
+                new_message.content.append(
+                    f"(The screenshot is a close-up of the part of the screen that changed, "
+                    f"pixels {x0},{y0} to {x1},{y1} of the full screen.)"
+                )
+                self._attach_screen_image(new_message, crop, "high")
+                attached += 1
+                if capture.region_thumbnail:
+                    thumbnail = await capture.encoder.get_downscaled(
+                        encoded, SCREEN_REGION_THUMBNAIL_SIDE
+                    )
+                    self._attach_screen_image(new_message, thumbnail, "low")
+                    attached += 1
+            else:
+                if (
+                    decision
+                    and not decision.crop
+                    and max(encoded.width, encoded.height) > decision.max_side
+                ):
+                    encoded = await capture.encoder.get_downscaled(
+                        encoded, decision.max_side
+                    )
+                self._attach_screen_image(
+                    new_message, encoded, decision.detail if decision else "high"
+                )
+                attached += 1
+        return attached
+
+    def _decide_vision(
+        self,
+        capture: ScreenCapture,
+        encoded: EncodedFrame,
+        new_message,
+        region: tuple[int, int, int, int] | None,
+    ) -> VisionDecision | None:
+        """Detail and resolution for this turn, from how much changed, what the user said and the image budget."""
+        if not self._vision_policy:
+            return None
+        return self._vision_policy.decide(
+            diff=capture.change_detector.last_diff,
+            transcript=new_message.text_content or "",
+            width=encoded.width,
+            height=encoded.height,
+            region=(region[2] - region[0], region[3] - region[1]) if region else None,
+            thumbnail=capture.region_thumbnail,
+        )
+
+    def _attach_screen_image(self, message, encoded: EncodedFrame, detail: str) -> None:
+        jpeg = encoded.jpeg
+        data_url = encoded.data_url
+        try:
+            message.content.append(
+                ImageContent(image=data_url, inference_detail=detail)
+            )
+            log_sampled(
+                "screen image attached",
+                "attached screen image to chat ctx: %d bytes, %dx%d, %s detail",
+                len(jpeg),
+                encoded.width,
+                encoded.height,
+                detail,
+                value=len(jpeg),
+                unit="bytes",
+            )
+        except Exception:
+            # Fallback without extra options if provider doesn't support inference_detail
+            message.content.append(ImageContent(image=data_url))
+            log_sampled(
+                "screen image attached",
+                "attached screen image to chat ctx (basic): %d bytes",
+                len(jpeg),
+                value=len(jpeg),
+                unit="bytes",
+            )
+        if self._session_metrics:
+            self._session_metrics.observe_screen_image(len(jpeg))
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        # Keep the prompt prefix byte-stable for provider prompt caching: instructions, tools
+        # in a fixed order and text-only history first, screenshots last
+        chat_ctx = screenshots_last(chat_ctx)
+        tools = sorted(tools, key=lambda tool: getattr(tool, "id", ""))
+        logger.info(
+            "llm request: %d items, ~%d bytes",
+            len(chat_ctx.items),
+            estimate_request_bytes(chat_ctx),
+        )
+        # Open LLM streams count towards this job's load
+        with (
+            self._load_reporter.llm_stream()
+            if self._load_reporter
+            else contextlib.nullcontext()
+        ):
+            if self._prompt_streamer is None:
+                async for chunk in Agent.default.llm_node(
+                    self, chat_ctx, tools, model_settings
+                ):
+                    yield chunk
+                return
+            # Same as the default node, with update_prompt's text streamed to the UI as it's generated
+            async with self.session.llm.chat(
+                chat_ctx=chat_ctx,
+                tools=tools,
+                tool_choice=model_settings.tool_choice if model_settings else NOT_GIVEN,
+                conn_options=self.session.conn_options.llm_conn_options,
+            ) as stream:
+                self._prompt_streamer.watch(stream)
+                try:
+                    async for chunk in stream:
+                        yield chunk
+                finally:
+                    self._prompt_streamer.finish_all()
+
     @function_tool
-    async def set_lesson_status(self, context: RunContext, id: str, status: str) -> str:
+    async def set_lesson_status(
+        self, context: RunContext, id: str, status: str
+    ) -> str | Agent:
         """Update the frontend conversation status via the LiveKit data channel.
 
         - id: one of "0" (introduction), "1" (lesson 1), "2" (lesson 2), "3" (final notes) corresponding to sections
         - status: "pending" | "active" | "completed"
         - at the conversation start, lesson 0 is active and the rest are pending
         - at the end of the conversation, all lessons should be "completed"
+        - marking the current section "completed" moves on to the next section's script
         """
-        ctx = get_job_context()
-        payload = {"type": "lesson_status", "id": id, "status": status}
         try:
-            await ctx.room.local_participant.publish_data(
-                json.dumps(payload).encode("utf-8"),
-                topic="lesson-status",
-            )
-            logger.info("published lesson status: %s", payload)
-            return f"Updated lesson {id} to {status}."
+            await self._publish_lesson_status(id, status)
         except Exception:
             logger.exception("failed to publish lesson status")
             return "Failed to update lesson status."
+        # Finishing the current section hands off to the agent for the next one
+        next_section = (
+            next_lesson_section(id)
+            if id == self.lesson_section and status == "completed"
+            else None
+        )
+        if next_section is None:
+            return f"Updated lesson {id} to {status}."
+        logger.info(
+            "lesson section %s completed; handing off to section %s", id, next_section
+        )
+        return Assistant(
+            screen_capture=self._screen_capture,
+            session_metrics=self._session_metrics,
+            load_reporter=self._load_reporter,
+            compactor=self._compactor,
+            vision_policy=self._vision_policy,
+            screen_reader=self._screen_reader,
+            ui_publisher=self._ui_publisher,
+            prompt_streamer=self._prompt_streamer,
+            lesson_section=next_section,
+            chat_ctx=self.chat_ctx,
+        )
 
     @function_tool
     async def update_prompt(self, context: RunContext, text: str) -> str:
@@ -143,8 +471,17 @@ class Assistant(Agent):
         Sends a data message with type "prompt_update" and the latest prompt text.
         Call this multiple times as the prompt evolves.
         """
+        # The call id ties this final text to the partial text streamed while it was generated
+        payload = {
+            "type": "prompt_update",
+            "text": text,
+            "call_id": context.function_call.call_id if context else None,
+        }
+        if self._ui_publisher:
+            # A burst of updates only sends the latest prompt
+            self._ui_publisher.publish("prompt-update", payload, coalesce_key="prompt")
+            return "Prompt updated."
         ctx = get_job_context()
-        payload = {"type": "prompt_update", "text": text}
         try:
             await ctx.room.local_participant.publish_data(
                 json.dumps(payload).encode("utf-8"),
@@ -157,16 +494,89 @@ class Assistant(Agent):
             return "Failed to update prompt."
 
 
+def _import_plugins() -> None:
+    """Import the job-only plugins; they register themselves, which must happen on the main thread."""
+    from livekit.plugins import noise_cancellation, openai, silero  # noqa: F401
+
+
 def prewarm(proc: JobProcess):
+    profile: dict[str, float] = {}
+    step_started = time.perf_counter()
+
+    def _step(name: str) -> None:
+        nonlocal step_started
+        now = time.perf_counter()
+        profile[f"{name}_s"] = round(now - step_started, 3)
+        step_started = now
+
+    if os.getenv("LOG_QUEUE", "1") == "1":
+        # Log records are formatted and shipped to the worker on a background thread, not the event loop
+        install_queue_logging()
+    _import_plugins()
+    _step("plugins")
+    from livekit.plugins import silero
+
+    from llm_clients import PortkeyClientPool
+
     proc.userdata["vad"] = silero.VAD.load()
+    _step("vad")
+    # Each job runs in its own process, so this starts the encode threads before the job
+    # does rather than sharing them; frame encodes never run on the event loop
+    get_encode_executor()
+    # None unless PORTKEY_API_KEY is set
+    proc.userdata["portkey_pool"] = PortkeyClientPool.from_env()
+    # Load pre-rendered greetings/timeout/idle audio from disk so the first words need no TTS round trip
+    phrase_cache = PhraseAudioCache.from_env()
+    for phrase in (
+        *GREETINGS.values(),
+        CONVERSATION_TIMEOUT_MESSAGE,
+        IDLE_PROMPT_MESSAGE,
+        IDLE_TIMEOUT_MESSAGE,
+    ):
+        phrase_cache.preload(phrase, TTS_VOICE, TTS_MODEL)
+    proc.userdata["phrase_cache"] = phrase_cache
+    _step("caches")
+    proc.userdata["startup_profile"] = profile
+    if os.getenv("STARTUP_PROFILE", "0") == "1":
+        logger.info("startup profile: %s", profile)
+
+
+def _turn_detector(ctx: JobContext) -> MultilingualModel:
+    """The job's turn detector, warmed with a first prediction in the background.
+
+    Kept in the process's userdata, but each job runs in its own process, so what carries
+    over is the warm-up: the model runs in the worker's shared inference process, and its
+    first prediction there is slower (ONNX session warm-up). It is paid while the greeting
+    plays instead of on the user's first turn.
+    """
+    model = ctx.proc.userdata.get("turn_detector")
+    if model is None:
+        model = ctx.proc.userdata["turn_detector"] = MultilingualModel()
+        warm_ctx = ChatContext.empty()
+        warm_ctx.add_message(role="user", content="Hello")
+        task = asyncio.create_task(model.predict_end_of_turn(warm_ctx, timeout=10))
+        task.add_done_callback(_log_turn_detector_warmup)
+    return model
+
+
+def _log_turn_detector_warmup(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("turn detector warm-up failed: %s", task.exception())
 
 
 async def entrypoint(ctx: JobContext):
+    from livekit.plugins import noise_cancellation, openai
+
     # Logging setup
     # Add any other context you want in all log entries here
     ctx.log_context_fields = {
         "room": ctx.room.name,
     }
+    # Hot-path lines (per frame, per turn) are rate-limited and rolled up into periodic summaries
+    log_rollup = LogRollup.from_env()
+    if log_rollup:
+        log_rollup.activate()
+        ctx.add_shutdown_callback(log_rollup.aclose)
 
     # Per-conversation session id for tracing/Portkey metadata
     session_id = uuid.uuid4().hex
@@ -175,49 +585,54 @@ async def entrypoint(ctx: JobContext):
 
     # Determine mode from room name prefix
     room_name = ctx.room.name or ""
-    mode = "copilot" if room_name.startswith("copilot_") else "lesson"
+    mode = mode_for_room(room_name)
     logger.info("detected mode from room name: %s", mode)
 
     # Set up a voice AI pipeline. If PORTKEY_API_KEY is set, route LLM via Portkey.
-    portkey_api_key = os.getenv("PORTKEY_API_KEY")
-    if portkey_api_key:
-        portkey_model = os.getenv("PORTKEY_LLM_MODEL", "gpt-4o")
-        portkey_base_url = os.getenv("PORTKEY_BASE_URL", "https://api.portkey.ai/v1")
-        headers = {}
-        provider = os.getenv("PORTKEY_PROVIDER")
-        config_id = os.getenv("PORTKEY_CONFIG")
-        if provider:
-            headers["x-portkey-provider"] = provider
-        if config_id:
-            headers["x-portkey-config"] = config_id
-        upstream_openai = os.getenv("PORTKEY_UPSTREAM_OPENAI_API_KEY")
-        if upstream_openai:
-            headers["x-portkey-openai-api-key"] = upstream_openai
-        # Attach Portkey metadata: include session_id so requests can be grouped per conversation
-        headers["x-portkey-metadata"] = json.dumps({"session_id": session_id, "mode": mode})
-        # Build a custom AsyncClient so we can inject Portkey headers
-        http_client = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
-            follow_redirects=True,
-            limits=httpx.Limits(max_connections=50, max_keepalive_connections=50, keepalive_expiry=120),
-            headers=headers or None,
-        )
-        # Portkey expects x-portkey-api-key in headers; do not send as Authorization
-        http_client.headers["x-portkey-api-key"] = portkey_api_key
-        # If user provided a virtual key slug, set both accepted headers
-        vkey = os.getenv("PORTKEY_VIRTUAL_KEY")
-        if vkey:
-            #if not vkey.startswith("@"):
-            #    vkey = "@" + vkey
-            http_client.headers.setdefault("x-portkey-provider", vkey)
-            http_client.headers.setdefault("x-portkey-virtual-key", vkey)
-        oa_client = openai_lib.AsyncClient(api_key=None, base_url=portkey_base_url, http_client=http_client)
-        llm_client = openai.LLM(model=portkey_model, client=oa_client)
-        logger.info("Portkey enabled: model=%s base_url=%s provider=%s config=%s", portkey_model, portkey_base_url, bool(provider or vkey), bool(config_id))
+    portkey_pool = ctx.proc.userdata.get("portkey_pool")
+    if portkey_pool:
+        # Shared connection pool from prewarm; session metadata goes out as per-request headers
+        llm_client = portkey_pool.llm_for_session(session_id=session_id, mode=mode)
+        ctx.add_shutdown_callback(portkey_pool.release)
+        portkey_pool.warm()
+        if (
+            os.getenv("OPENAI_API_KEY")
+            and os.getenv("LLM_ROUTING", "hedged") == "hedged"
+        ):
+            # A late first token from the gateway is hedged to direct OpenAI instead of dead air
+            llm_client = HedgedLLM(
+                [
+                    ("portkey", llm_client),
+                    (
+                        "openai",
+                        openai.LLM(
+                            model="gpt-4o-mini", prompt_cache_key=f"agent-{mode}"
+                        ),
+                    ),
+                ],
+                hedge_after=float(os.getenv("LLM_HEDGE_AFTER", "1.5")),
+            )
+            ctx.add_shutdown_callback(llm_client.aclose)
+            logger.info(
+                "LLM routing: portkey, hedged to direct OpenAI after %.2fs",
+                llm_client.hedge_after,
+            )
     else:
-        llm_client = openai.LLM(model="gpt-4o-mini")
+        # Requests with the same static prefix share a cache key so they land on the same cache
+        llm_client = openai.LLM(model="gpt-4o-mini", prompt_cache_key=f"agent-{mode}")
         logger.info("Portkey disabled; using direct OpenAI model=%s", "gpt-4o-mini")
 
+    # Summaries go through their own LLM instance so they don't count as user turns in the metrics
+    if portkey_pool:
+        summary_llm = portkey_pool.llm_for_summaries(session_id=session_id, mode=mode)
+    else:
+        summary_llm = openai.LLM(model="gpt-4o-mini", prompt_cache_key="agent-summary")
+
+    tts_engine = openai.TTS(model=TTS_MODEL, voice=TTS_VOICE)
+    compactor = ChatCompactor.from_env(summary_llm)
+    ctx.add_shutdown_callback(compactor.aclose)
+    phrase_cache = ctx.proc.userdata["phrase_cache"]
+
     session = AgentSession(
         # A Large Language Model (LLM) is your agent's brain, processing user input and generating a response
         # See all providers at https://docs.livekit.io/agents/integrations/llm/
@@ -227,17 +642,17 @@ async def entrypoint(ctx: JobContext):
         stt=openai.STT(model="gpt-4o-transcribe"),
         # Text-to-speech (TTS) is your agent's voice, turning the LLM's text into speech that the user can hear
         # See all providers at https://docs.livekit.io/agents/integrations/tts/
-        tts=openai.TTS(voice="echo"),
+        tts=tts_engine,
         # VAD and turn detection are used to determine when the user is speaking and when the agent should respond
         # See more at https://docs.livekit.io/agents/build/turns
-        turn_detection=MultilingualModel(),
+        turn_detection=_turn_detector(ctx),
         vad=ctx.proc.userdata["vad"],
         # allow the LLM to generate a response while waiting for the end of turn
         # See more at https://docs.livekit.io/agents/build/audio/#preemptive-generation
         preemptive_generation=False,
         userdata=ctx.proc.userdata,  # share process userdata with tools
     )
-    
+
     # To use a realtime model instead of a voice pipeline, use the following session setup instead:
     # session = AgentSession(
     #     # See all providers at https://docs.livekit.io/agents/integrations/realtime/
@@ -254,79 +669,110 @@ async def entrypoint(ctx: JobContext):
     # Metrics collection, to measure pipeline performance
     # For more information, see https://docs.livekit.io/agents/build/metrics/
     usage_collector = metrics.UsageCollector()
+    # Worker-wide latency histograms, exported on the worker's Prometheus endpoint
+    session_metrics = SessionMetrics(mode)
 
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
+        session_metrics.collect(ev.metrics)
 
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        logger.info("phrase audio cache stats: %s", phrase_cache.stats())
+        logger.info("screen capture stats: %s", screen_capture.stats())
+        logger.info("screen encode executor stats: %s", get_encode_executor().stats())
+        logger.info("chat compaction stats: %s", compactor.stats())
+        if isinstance(llm_client, HedgedLLM):
+            logger.info("llm routing stats: %s", llm_client.stats())
+        logger.info("vision policy stats: %s", vision_policy.stats())
+        if screen_reader:
+            logger.info("screen OCR stats: %s", screen_reader.stats())
+        logger.info("ui publisher stats: %s", ui_publisher.stats())
+        if prompt_streamer:
+            logger.info("prompt streaming stats: %s", prompt_streamer.stats())
+        if idle_reaper:
+            logger.info("idle reaper stats: %s", idle_reaper.stats())
 
     ctx.add_shutdown_callback(log_usage)
 
-    # Subscribe to screen-share video and keep latest JPEG in process userdata
-    @ctx.room.on("track_subscribed")
-    def _on_track_subscribed(track: rtc.RemoteTrack, publication: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+    # Capture the user's shared screen for this session only; frames never outlive the job
+    screen_capture = ScreenCapture(
+        ctx.room,
+        capture_mode=os.getenv("SCREEN_CAPTURE_MODE", "lazy"),
+        # Fraction of the downsampled screen that must change before a new screenshot is attached
+        change_threshold=float(os.getenv("SCREEN_CHANGE_THRESHOLD", "0.002")),
+        # "region" attaches a native-resolution crop around localized changes instead of the whole screen
+        attach_mode=os.getenv("SCREEN_ATTACH_MODE", "full"),
+        region_padding=int(os.getenv("SCREEN_REGION_PADDING", "32")),
+        region_max_area=float(os.getenv("SCREEN_REGION_MAX_AREA", "0.5")),
+        region_thumbnail=os.getenv("SCREEN_REGION_THUMBNAIL", "0") == "1",
+        # Frames are only needed at turn end, so a low rate costs little freshness (at most 1/fps)
+        max_fps=float(os.getenv("SCREEN_CAPTURE_MAX_FPS", "2")),
+        source_quality=os.getenv("SCREEN_CAPTURE_QUALITY", "high"),
+        stream_capacity=int(os.getenv("SCREEN_STREAM_CAPACITY", "1")),
+    )
+    screen_capture.start()
+    ctx.add_shutdown_callback(screen_capture.aclose)
+    vision_policy = VisionPolicy.from_env()
+    # None unless SCREEN_CONTEXT_MODE=ocr and Tesseract is installed
+    screen_reader = ScreenTextReader.from_env()
+    # Lesson status and prompt updates go through one ordered queue per session
+    ui_publisher = UiPublisher(ctx.room)
+    ui_publisher.start()
+    ctx.add_shutdown_callback(ui_publisher.aclose)
+    prompt_streamer = (
+        PromptStreamer(ctx.room) if os.getenv("PROMPT_STREAMING", "1") == "1" else None
+    )
+    if prompt_streamer:
+        ctx.add_shutdown_callback(prompt_streamer.aclose)
+
+    # Hard upper bound on the conversation; silent sessions are reaped well before it,
+    # freeing the worker for other users
+    timeout_seconds = float(os.getenv("CONVERSATION_TIMEOUT_SECONDS", "300"))
+
+    async def _idle_prompt() -> None:
+        await phrase_cache.say(
+            session, tts_engine, IDLE_PROMPT_MESSAGE, voice=TTS_VOICE
+        )
+
+    async def _idle_shutdown(reason: str) -> None:
         try:
-            is_video = isinstance(track, rtc.RemoteVideoTrack)
-            # Capture any remote video track; frontend publishes screen as a video track
-            if is_video:
-                if not ctx.proc.userdata.get("_screen_capture_started"):
-                    ctx.proc.userdata["_screen_capture_started"] = True
-                    logger.info("video track subscribed; starting frame capture (treating as screen share)")
-                    asyncio.create_task(_capture_screen_frames(ctx, track))
-                else:
-                    logger.info("video track subscribed; capture already running, ignoring additional track")
+            await phrase_cache.say(
+                session,
+                tts_engine,
+                IDLE_TIMEOUT_MESSAGE,
+                voice=TTS_VOICE,
+                allow_interruptions=False,
+            )
         except Exception:
-            logger.exception("error handling track_subscribed")
-
-    async def _capture_screen_frames(ctx: JobContext, video_track: rtc.RemoteVideoTrack):
-        stream = rtc.VideoStream(video_track)
-        # sample frames at a modest rate to avoid overhead
-        async for frame in stream:
-            try:
-                jpeg_bytes = None
-
-                # One-time diagnostics on first frame
-                if not ctx.proc.userdata.get("_frame_diag_logged"):
-                    try:
-                        event_type = type(frame).__name__
-                        frame_obj = getattr(frame, "frame", frame)
-                        caps = {
-                            "event_type": event_type,
-                            "frame_type": type(frame_obj).__name__,
-                        }
-                        logger.info("video frame capabilities: %s", caps)
-                    except Exception:
-                        logger.debug("failed to log frame capabilities", exc_info=True)
-                    finally:
-                        ctx.proc.userdata["_frame_diag_logged"] = True
-
-                # Unwrap frame if this is an event wrapper
-                frame_obj = getattr(frame, "frame", frame)
-
-                # Use LiveKit images.encode utility to JPEG-encode the frame
-                try:
-                    # Resize to 1024x1024 (fit) to improve OCR/vision robustness
-                    jpeg_bytes = lk_encode(
-                        frame_obj,
-                        LKEncodeOptions(
-                            format="JPEG",
-                            resize_options=LKResizeOptions(width=1024, height=1024, strategy="scale_aspect_fit"),
-                        ),
-                    )
-                except Exception:
-                    logger.debug("images.encode failed", exc_info=True)
-
-                if jpeg_bytes:
-                    ctx.proc.userdata["latest_screen_jpeg"] = jpeg_bytes
-                    logger.info("captured screen frame: %d bytes", len(jpeg_bytes))
-                else:
-                    logger.debug("frame conversion produced no bytes; waiting for next frame")
-            except Exception:
-                logger.exception("failed to convert video frame to JPEG")
+            logger.exception("failed to deliver idle message before shutdown")
+        ctx.shutdown(reason=reason)
+
+    idle_reaper = IdleReaper.from_env(
+        hard_timeout=timeout_seconds,
+        on_prompt=_idle_prompt,
+        on_shutdown=_idle_shutdown,
+        screen_probe=screen_capture.poll_activity,
+        mode=mode,
+    )
+    if idle_reaper:
+        phrase_cache.prefetch(tts_engine, IDLE_PROMPT_MESSAGE, voice=TTS_VOICE)
+        phrase_cache.prefetch(tts_engine, IDLE_TIMEOUT_MESSAGE, voice=TTS_VOICE)
+        idle_reaper.watch_session(session)
+        ctx.add_shutdown_callback(idle_reaper.aclose)
+
+    # Reports capture, encode rate, LLM streams and loop lag to the worker's load_fnc
+    load_reporter = JobLoadReporter.from_env(ctx.job.id, mode)
+    if load_reporter:
+        load_reporter.watch_capture(
+            lambda: screen_capture.capturing,
+            lambda: screen_capture.encoder.frames_encoded,
+        )
+        load_reporter.start()
+        ctx.add_shutdown_callback(load_reporter.aclose)
 
     # # Add a virtual avatar to the session, if desired
     # # For other providers, see https://docs.livekit.io/agents/integrations/avatar/
@@ -337,8 +783,7 @@ async def entrypoint(ctx: JobContext):
     # await avatar.start(session, room=ctx.room)
 
     # Start the session, which initializes the voice pipeline and warms up the models
-    copilot_instructions = (
-        """You are a helpful AI copilot for using ChatGPT together. Keep replies short and practical.
+    copilot_instructions = """You are a helpful AI copilot for using ChatGPT together. Keep replies short and practical.
         You have an extensive knowledge of ChatGPT and can help the user with their tasks and questions.
         Ask the user to open the chatgpt.com website and share their screen as it will help you help them better (your app has a standard video call inerface with "Share screen" button). Say "Please share a tab with chatgpt.com and we can start". If not shared, you can still help them with effecient tackling of any tasks and questions within ChatGPT.
         After user shares their screen or declines to share it, you can start the conversation. 
@@ -372,8 +817,30 @@ async def entrypoint(ctx: JobContext):
         - GPT-5 Thinking: Deeper reasoning mode. Use for complex coding, analysis, or synthesis where accuracy matters more than speed.
         - GPT-5 Pro: Extended, research-grade intelligence. Use for the most demanding analyses and long contexts on Pro/Team tiers.
         """
+    agent = (
+        Assistant(
+            instructions=copilot_instructions,
+            screen_capture=screen_capture,
+            session_metrics=session_metrics,
+            load_reporter=load_reporter,
+            compactor=compactor,
+            vision_policy=vision_policy,
+            screen_reader=screen_reader,
+            ui_publisher=ui_publisher,
+            prompt_streamer=prompt_streamer,
+        )
+        if mode == "copilot"
+        else Assistant(
+            screen_capture=screen_capture,
+            session_metrics=session_metrics,
+            load_reporter=load_reporter,
+            compactor=compactor,
+            vision_policy=vision_policy,
+            screen_reader=screen_reader,
+            ui_publisher=ui_publisher,
+            prompt_streamer=prompt_streamer,
+        )
     )
-    agent = Assistant(instructions=copilot_instructions) if mode == "copilot" else Assistant()
     await session.start(
         agent=agent,
         room=ctx.room,
@@ -389,21 +856,27 @@ async def entrypoint(ctx: JobContext):
     await ctx.connect()
 
     # Schedule an auto-timeout to end the conversation after a configurable duration
-    timeout_seconds = float(os.getenv("CONVERSATION_TIMEOUT_SECONDS", "300"))
-    timeout_message = os.getenv(
-        "CONVERSATION_TIMEOUT_MESSAGE",
-        "Time's up! Ending the session now. You can reconnect if you'd like to continue.",
-    )
+    timeout_message = CONVERSATION_TIMEOUT_MESSAGE
+    phrase_cache.prefetch(tts_engine, timeout_message, voice=TTS_VOICE)
 
     async def _conversation_timeout_task() -> None:
         try:
             await asyncio.sleep(timeout_seconds)
-            logger.info("conversation timeout reached; initiating shutdown", extra={"timeout_seconds": timeout_seconds})
+            logger.info(
+                "conversation timeout reached; initiating shutdown",
+                extra={"timeout_seconds": timeout_seconds},
+            )
             try:
-                await session.say(timeout_message, allow_interruptions=False)
+                await phrase_cache.say(
+                    session,
+                    tts_engine,
+                    timeout_message,
+                    voice=TTS_VOICE,
+                    allow_interruptions=False,
+                )
             except Exception:
                 logger.exception("failed to deliver timeout message before shutdown")
-            await ctx.shutdown(reason=f"conversation timeout ({int(timeout_seconds)}s)")
+            ctx.shutdown(reason=f"conversation timeout ({int(timeout_seconds)}s)")
         except asyncio.CancelledError:
             logger.info("conversation timeout task cancelled before expiry")
 
@@ -418,11 +891,57 @@ async def entrypoint(ctx: JobContext):
                 pass
 
     ctx.add_shutdown_callback(_cancel_timeout_task)
+    if idle_reaper:
+        idle_reaper.start()
 
     # Proactive greeting at session start
-    greeting = "Pair Mode activated! What do you want to do?" if mode == "copilot" else "Hi! Ready for a quick learning session?"
-    await session.say(greeting, allow_interruptions=False)
+    await phrase_cache.say(
+        session,
+        tts_engine,
+        GREETINGS[mode],
+        voice=TTS_VOICE,
+        allow_interruptions=False,
+    )
+
+
+_last_logged_load = 0.0
+
+
+def _log_worker_load(snapshot: dict) -> None:
+    global _last_logged_load
+    if abs(snapshot["load"] - _last_logged_load) >= 0.05:
+        _last_logged_load = snapshot["load"]
+        logger.info("worker load: %s", snapshot)
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
+    import sys
+
+    if "download-files" in sys.argv:
+        # Job-only plugins are imported lazily; the download command needs all of them registered
+        _import_plugins()
+    prometheus_port = os.getenv("PROMETHEUS_PORT")
+    # Prewarmed processes waiting for jobs; livekit keeps none in dev mode, so every dev job cold-starts
+    idle_processes = os.getenv("WORKER_IDLE_PROCESSES")
+    # Per-job cost model instead of raw CPU; the load is also reported on the worker's /worker endpoint
+    worker_load = WorkerLoadEstimator.from_env(on_update=_log_worker_load)
+    try:
+        cli.run_app(
+            WorkerOptions(
+                entrypoint_fnc=entrypoint,
+                prewarm_fnc=prewarm,
+                request_fnc=worker_load.request_fnc,
+                load_fnc=worker_load.load_fnc,
+                load_threshold=worker_load.threshold,
+                # Latency histograms from every job process are aggregated on :PROMETHEUS_PORT/metrics
+                prometheus_port=int(prometheus_port) if prometheus_port else NOT_GIVEN,
+                prometheus_multiproc_dir=os.getenv("PROMETHEUS_MULTIPROC_DIR"),
+                **(
+                    {"num_idle_processes": int(idle_processes)}
+                    if idle_processes
+                    else {}
+                ),
+            )
+        )
+    finally:
+        worker_load.close()
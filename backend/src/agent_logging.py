@@ -0,0 +1,188 @@
+import asyncio
+import contextvars
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger("agent")
+
+_listeners: dict[str, logging.handlers.QueueListener] = {}
+
+
+class _DeferredFormatHandler(logging.handlers.QueueHandler):
+    """Queues records with only the message rendered; formatting and output happen on the listener thread.
+
+    Filters on this handler (e.g. the job's log context fields) still run on the caller, so
+    they see its context.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Render now: the arguments may change once the caller moves on
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def install_queue_logging(
+    target: logging.Logger | None = None,
+) -> logging.handlers.QueueListener | None:
+    """Move `target`'s handlers (default: root) behind a queue drained on a background thread.
+
+    Call once per process, before jobs start, so the job's log context filter is attached to
+    the queue handler. Returns the listener, or None when there is nothing to move.
+    """
+    target = target or logging.getLogger()
+    if target.name in _listeners:
+        return _listeners[target.name]
+    handlers = list(target.handlers)
+    if not handlers:
+        return None
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    for handler in handlers:
+        target.removeHandler(handler)
+        _flush_before_close(handler, target.name)
+    target.addHandler(_DeferredFormatHandler(log_queue))
+    listener.start()
+    _listeners[target.name] = listener
+    return listener
+
+
+def stop_queue_logging(target: logging.Logger | None = None) -> None:
+    """Drain the queue into the real handlers and stop the listener thread."""
+    listener = _listeners.pop((target or logging.getLogger()).name, None)
+    if listener is not None:
+        listener.stop()
+
+
+def _flush_before_close(handler: logging.Handler, name: str) -> None:
+    close = handler.close
+
+    def _close() -> None:
+        # The process is exiting (e.g. the job's IPC log handler is closed): send what is queued first
+        listener = _listeners.pop(name, None)
+        if listener is not None:
+            listener.stop()
+        close()
+
+    handler.close = _close
+
+
+@dataclass
+class _KeyStats:
+    count: int = 0
+    logged: int = 0
+    value_total: float = 0.0
+    unit: str = ""
+    window_start: float = 0.0
+
+
+_current_rollup: contextvars.ContextVar["LogRollup | None"] = contextvars.ContextVar(
+    "agent_log_rollup", default=None
+)
+
+
+class LogRollup:
+    """Per-session rate limit for hot-path log lines, with periodic summaries.
+
+    Per key, the first `burst` lines of each `interval` are logged as usual; the rest are only
+    counted, along with the sum of their `value` (bytes, tokens), and reported as one summary
+    line when the interval ends. Summaries are logged from a task in the session's context,
+    so they carry the job's log context fields (room) like every other line.
+    """
+
+    def __init__(self, *, interval: float = 30.0, burst: int = 1) -> None:
+        self.interval = interval
+        self.burst = burst
+        self._keys: dict[str, _KeyStats] = {}
+        self._task: asyncio.Task | None = None
+        self.suppressed = 0
+
+    @classmethod
+    def from_env(cls) -> "LogRollup | None":
+        """A rollup unless LOG_ROLLUP_INTERVAL is 0 (every hot-path line logged)."""
+        interval = float(os.getenv("LOG_ROLLUP_INTERVAL", "30"))
+        if interval <= 0:
+            return None
+        return cls(interval=interval, burst=int(os.getenv("LOG_ROLLUP_BURST", "1")))
+
+    def activate(self) -> None:
+        """Route `log_sampled` calls from this context (and tasks created from it) here."""
+        _current_rollup.set(self)
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush(force=True)
+
+    def log(
+        self,
+        key: str,
+        msg: str,
+        *args: object,
+        value: float | None = None,
+        unit: str = "",
+    ) -> None:
+        now = time.monotonic()
+        stats = self._keys.get(key)
+        if stats is None:
+            stats = self._keys[key] = _KeyStats(unit=unit, window_start=now)
+        stats.count += 1
+        if value is not None:
+            stats.value_total += value
+        if stats.logged < self.burst:
+            stats.logged += 1
+            logger.info(msg, *args)
+        else:
+            self.suppressed += 1
+
+    def flush(self, *, force: bool = False) -> None:
+        """Summarize keys whose interval is over (all of them with `force`) and start new intervals."""
+        now = time.monotonic()
+        for key, stats in list(self._keys.items()):
+            elapsed = now - stats.window_start
+            if not force and elapsed < self.interval:
+                continue
+            del self._keys[key]
+            if stats.count <= stats.logged:
+                continue
+            avg = (
+                f", avg {stats.value_total / stats.count:.0f} {stats.unit}".rstrip()
+                if stats.value_total
+                else ""
+            )
+            logger.info(
+                "%s: %d in %.0fs (%.2f/s, %d logged)%s",
+                key,
+                stats.count,
+                elapsed,
+                stats.count / max(elapsed, 1e-3),
+                stats.logged,
+                avg,
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval / 4)
+            self.flush()
+
+
+def log_sampled(
+    key: str, msg: str, *args: object, value: float | None = None, unit: str = ""
+) -> None:
+    """INFO log for hot paths: rate-limited per `key` when a session's LogRollup is active."""
+    rollup = _current_rollup.get()
+    if rollup is None:
+        logger.info(msg, *args)
+    else:
+        rollup.log(key, msg, *args, value=value, unit=unit)
@@ -0,0 +1,221 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+
+from livekit.agents import Agent, AgentSession, llm
+from livekit.agents.llm import ChatContext, ChatMessage
+
+logger = logging.getLogger("agent")
+
+# UI side-effect tools: once the frontend has the update their call/output pair is noise
+NOISY_TOOLS = frozenset({"update_prompt", "set_lesson_status"})
+SUMMARY_ID = "chat_history_summary"
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+SUMMARY_INSTRUCTIONS = """You compress a voice conversation between an AI assistant and a user into memory notes for the assistant.
+Keep what the assistant needs to continue naturally: what was covered, the user's answers, preferences and
+names, what they have done on their screen, prompts already suggested, and any open question.
+Write at most 120 words of plain sentences, no lists or formatting."""
+
+
+def history_bytes(chat_ctx: ChatContext) -> int:
+    """Text size of the conversation, excluding system instructions and images (bounded separately)."""
+    total = 0
+    for item in chat_ctx.items:
+        if item.type == "message":
+            if item.role in ("system", "developer") and item.id != SUMMARY_ID:
+                continue
+            total += sum(
+                len(c.encode("utf-8")) for c in item.content if isinstance(c, str)
+            )
+        elif item.type == "function_call":
+            total += len(item.arguments.encode("utf-8"))
+        elif item.type == "function_call_output":
+            total += len(item.output.encode("utf-8"))
+    return total
+
+
+def drop_tool_noise(chat_ctx: ChatContext, tools: frozenset[str] = NOISY_TOOLS) -> int:
+    """Remove completed calls to `tools` that happened before the latest user message.
+
+    Both the call and its output must be there; returns the number of items removed.
+    """
+    items = chat_ctx.items
+    last_user = max(
+        (
+            i
+            for i, item in enumerate(items)
+            if item.type == "message" and item.role == "user"
+        ),
+        default=0,
+    )
+    earlier = items[:last_user]
+    called = {
+        item.call_id
+        for item in earlier
+        if item.type == "function_call" and item.name in tools
+    }
+    answered = {item.call_id for item in earlier if item.type == "function_call_output"}
+    done = called & answered
+    kept = [
+        item
+        for item in items
+        if not (
+            item.type in ("function_call", "function_call_output")
+            and item.call_id in done
+        )
+    ]
+    removed = len(items) - len(kept)
+    items[:] = kept
+    return removed
+
+
+def _instructions_end(items: list[llm.ChatItem]) -> int:
+    end = 0
+    while (
+        end < len(items)
+        and items[end].type == "message"
+        and items[end].role in ("system", "developer")
+        and items[end].id != SUMMARY_ID
+    ):
+        end += 1
+    return end
+
+
+def _transcript(items: list[llm.ChatItem]) -> str:
+    lines = []
+    for item in items:
+        if item.type == "message":
+            text = " ".join(c for c in item.content if isinstance(c, str))
+            if item.id == SUMMARY_ID:
+                lines.append(text)
+            elif item.role in ("user", "assistant") and text:
+                lines.append(f"{item.role}: {text}")
+        elif item.type == "function_call" and item.name not in NOISY_TOOLS:
+            lines.append(f"tool call {item.name}({item.arguments})")
+        elif item.type == "function_call_output" and item.name not in NOISY_TOOLS:
+            lines.append(f"tool result {item.name}: {item.output}")
+    return "\n".join(lines)
+
+
+def _running_session(agent: Agent) -> AgentSession | None:
+    try:
+        return agent.session
+    except RuntimeError:
+        # Not running in a session (e.g. in tests)
+        return None
+
+
+class ChatCompactor:
+    """Rolling summarization of long sessions, off the critical path.
+
+    After a user turn, if the conversation text exceeds `max_bytes`, everything but the
+    instructions and the newest `keep_recent` items is summarized by the LLM in a
+    background task and replaced by one memory message right after the instructions;
+    UI tool calls that already took effect are dropped. Compaction cuts the history well
+    below the budget so it runs rarely and the cached prompt prefix stays put in between.
+    Give it an LLM instance of its own, not the session's: the session reports every
+    request on its LLM as a user turn's latency and prompt-cache metrics. The summary is
+    applied to the session's current agent, which a section handoff may have replaced
+    while it was generated.
+    """
+
+    def __init__(
+        self, llm_client: llm.LLM, *, max_bytes: int = 16_000, keep_recent: int = 8
+    ) -> None:
+        self._llm = llm_client
+        self.max_bytes = max_bytes
+        self.keep_recent = keep_recent
+        self._task: asyncio.Task | None = None
+        self.compactions = 0
+        self.bytes_removed = 0
+
+    @classmethod
+    def from_env(cls, llm_client: llm.LLM) -> "ChatCompactor":
+        return cls(
+            llm_client,
+            max_bytes=int(os.getenv("CHAT_HISTORY_MAX_BYTES", "16000")),
+            keep_recent=int(os.getenv("CHAT_HISTORY_KEEP_RECENT", "8")),
+        )
+
+    def maybe_compact(self, agent: Agent) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        if history_bytes(agent.chat_ctx) <= self.max_bytes:
+            return
+        self._task = asyncio.create_task(self._compact(agent))
+
+    def _older_items(self, chat_ctx: ChatContext) -> list[llm.ChatItem]:
+        items = chat_ctx.items
+        # The previous summary, if any, is rolled into the new one
+        start = _instructions_end(items)
+        # Cut at a user message so the recent window never starts mid tool call
+        cut = len(items) - self.keep_recent
+        while cut > start and not (
+            items[cut].type == "message" and items[cut].role == "user"
+        ):
+            cut -= 1
+        return list(items[start:cut]) if cut > start else []
+
+    async def _summarize(self, items: list[llm.ChatItem]) -> str:
+        summary_ctx = ChatContext.empty()
+        summary_ctx.add_message(role="system", content=[SUMMARY_INSTRUCTIONS])
+        summary_ctx.add_message(role="user", content=[_transcript(items)])
+        parts = []
+        async with self._llm.chat(chat_ctx=summary_ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    parts.append(chunk.delta.content)
+        return "".join(parts).strip()
+
+    async def _compact(self, agent: Agent) -> None:
+        start = time.perf_counter()
+        session = _running_session(agent)
+        try:
+            older = self._older_items(agent.chat_ctx)
+            if not older:
+                return
+            summary = await self._summarize(older)
+            if not summary:
+                return
+            if session is not None:
+                # The handed-off agent took over the history, including what was summarized
+                agent = session.current_agent
+            # The conversation moved on while we summarized; only replace what was summarized
+            chat_ctx = agent.chat_ctx.copy()
+            before = history_bytes(chat_ctx)
+            summarized = {item.id for item in older}
+            items = [item for item in chat_ctx.items if item.id not in summarized]
+            items.insert(
+                _instructions_end(items),
+                ChatMessage(
+                    id=SUMMARY_ID,
+                    role="system",
+                    content=[f"{SUMMARY_PREFIX} {summary}"],
+                ),
+            )
+            chat_ctx.items[:] = items
+            dropped = drop_tool_noise(chat_ctx)
+            await agent.update_chat_ctx(chat_ctx)
+            self.compactions += 1
+            self.bytes_removed += before - history_bytes(chat_ctx)
+            logger.info(
+                "compacted chat history: %d items summarized, %d tool items dropped, %d -> %d bytes in %.2fs",
+                len(older),
+                dropped,
+                before,
+                history_bytes(chat_ctx),
+                time.perf_counter() - start,
+            )
+        except Exception:
+            logger.exception("failed to compact chat history")
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def stats(self) -> dict:
+        return {"compactions": self.compactions, "bytes_removed": self.bytes_removed}
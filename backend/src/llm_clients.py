@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import os
+
+import httpx
+import openai as openai_lib
+from livekit.plugins import openai
+
+logger = logging.getLogger("agent")
+
+
+class PortkeyClientPool:
+    """Worker-wide HTTP connection pool and OpenAI client for the Portkey gateway.
+
+    Created in `prewarm` and shared by every session in the process, so sessions reuse
+    warm TLS connections instead of each building (and leaking) its own client.
+    Gateway-wide headers live on the shared client; per-session metadata is sent as
+    per-request headers by the `openai.LLM` returned from `llm_for_session`.
+    The underlying clients are built on first use inside the job's event loop and kept
+    for the life of the process, so the next job on a reused process finds the TLS
+    connections still open; they are closed when the process shuts its loop down.
+    """
+
+    def __init__(
+        self, *, api_key: str, base_url: str, model: str, headers: dict[str, str]
+    ) -> None:
+        self.base_url = base_url
+        self.model = model
+        self._headers = {**headers, "x-portkey-api-key": api_key}
+        self._http_client: httpx.AsyncClient | None = None
+        self._client: openai_lib.AsyncClient | None = None
+        self._sessions = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closer: asyncio.Task | None = None
+        self._warm_task: asyncio.Task | None = None
+        self._warmed = False
+        self.requests = 0
+        self.connections_opened = 0
+        self.warmup_connections = 0
+
+    @classmethod
+    def from_env(cls) -> "PortkeyClientPool | None":
+        portkey_api_key = os.getenv("PORTKEY_API_KEY")
+        if not portkey_api_key:
+            return None
+        headers = {}
+        provider = os.getenv("PORTKEY_PROVIDER")
+        config_id = os.getenv("PORTKEY_CONFIG")
+        if provider:
+            headers["x-portkey-provider"] = provider
+        if config_id:
+            headers["x-portkey-config"] = config_id
+        upstream_openai = os.getenv("PORTKEY_UPSTREAM_OPENAI_API_KEY")
+        if upstream_openai:
+            headers["x-portkey-openai-api-key"] = upstream_openai
+        # If user provided a virtual key slug, set both accepted headers
+        vkey = os.getenv("PORTKEY_VIRTUAL_KEY")
+        if vkey:
+            headers.setdefault("x-portkey-provider", vkey)
+            headers.setdefault("x-portkey-virtual-key", vkey)
+        pool = cls(
+            api_key=portkey_api_key,
+            base_url=os.getenv("PORTKEY_BASE_URL", "https://api.portkey.ai/v1"),
+            model=os.getenv("PORTKEY_LLM_MODEL", "gpt-4o"),
+            headers=headers,
+        )
+        logger.info(
+            "Portkey enabled: model=%s base_url=%s provider=%s config=%s",
+            pool.model,
+            pool.base_url,
+            bool(provider or vkey),
+            bool(config_id),
+        )
+        return pool
+
+    def _ensure_client(self) -> openai_lib.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is not loop:
+            # Connections belong to the loop that opened them (thread executor jobs each
+            # run their own); that loop's closer releases them
+            self._http_client = self._client = None
+            self._warmed = False
+        if self._client is None:
+            # Portkey expects x-portkey-api-key in headers; do not send as Authorization
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=50,
+                    max_keepalive_connections=50,
+                    keepalive_expiry=120,
+                ),
+                headers=self._headers,
+                event_hooks={"request": [self._on_request]},
+            )
+            self._client = openai_lib.AsyncClient(
+                api_key=None, base_url=self.base_url, http_client=self._http_client
+            )
+            self._loop = loop
+            self._closer = asyncio.create_task(self._close_on_exit(self._http_client))
+        return self._client
+
+    def llm_for_session(self, *, session_id: str, mode: str) -> openai.LLM:
+        """Acquire the shared client for a session; pair with `release` at shutdown."""
+        client = self._ensure_client()
+        self._sessions += 1
+        return openai.LLM(
+            model=self.model,
+            client=client,
+            # Shared per mode: sessions with the same static prompt prefix hit the same cache
+            prompt_cache_key=f"agent-{mode}",
+            # Attach Portkey metadata: include session_id so requests can be grouped per conversation
+            extra_headers={
+                "x-portkey-metadata": json.dumps(
+                    {"session_id": session_id, "mode": mode}
+                ),
+                "x-portkey-trace-id": session_id,
+            },
+        )
+
+    def llm_for_summaries(self, *, session_id: str, mode: str) -> openai.LLM:
+        """A separate LLM on the shared client for a session's background summaries.
+
+        Not attached to the session, so its requests stay out of the session's latency and
+        prompt-cache metrics, and it has its own cache key. Covered by the session's
+        `llm_for_session`/`release` pair.
+        """
+        return openai.LLM(
+            model=self.model,
+            client=self._ensure_client(),
+            prompt_cache_key="agent-summary",
+            extra_headers={
+                "x-portkey-metadata": json.dumps(
+                    {"session_id": session_id, "mode": mode, "purpose": "summary"}
+                ),
+                "x-portkey-trace-id": session_id,
+            },
+        )
+
+    async def release(self) -> None:
+        """A session is done with the pool; the client stays open for the next one."""
+        self._sessions = max(0, self._sessions - 1)
+        logger.info("Portkey connection pool stats: %s", self.stats())
+
+    def warm(self) -> None:
+        """Open a connection to the gateway in the background, once per process.
+
+        Later sessions find that connection (or the ones their predecessors used) in the
+        pool, so they don't send warm-up requests of their own.
+        """
+        if self._warmed:
+            return
+        self._warmed = True
+        self._warm_task = asyncio.create_task(self._warm())
+
+    async def _warm(self) -> None:
+        client = self._ensure_client()
+        try:
+            await client.with_options(max_retries=0).models.list()
+        except Exception:
+            # Any response (even an auth error) leaves a warm, pooled connection behind
+            logger.debug("Portkey warm-up request failed", exc_info=True)
+
+    async def _close_on_exit(self, http_client: httpx.AsyncClient) -> None:
+        # The job process cancels its pending tasks when it shuts its loop down
+        try:
+            await asyncio.Future()
+        finally:
+            await self.aclose(http_client)
+
+    async def aclose(self, http_client: httpx.AsyncClient | None = None) -> None:
+        """Close the pooled client (by default the current one), e.g. at process shutdown."""
+        http_client = http_client or self._http_client
+        if http_client is None:
+            return
+        if http_client is self._http_client:
+            if self._warm_task is not None:
+                self._warm_task.cancel()
+                self._warm_task = None
+            closer, self._closer = self._closer, None
+            if closer is not None and closer is not asyncio.current_task():
+                closer.cancel()
+            self._http_client = self._client = None
+            self._warmed = False
+        await http_client.aclose()
+
+    def _is_warmup(self) -> bool:
+        task = self._warm_task
+        return task is not None and task is asyncio.current_task()
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        # The warm-up request isn't traffic; the connection it opens is reused by real requests
+        if not self._is_warmup():
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            if self._is_warmup():
+                self.warmup_connections += 1
+            else:
+                self.connections_opened += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": self._sessions,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "warmup_connections": self.warmup_connections,
+            "connections_reused": max(0, self.requests - self.connections_opened),
+        }
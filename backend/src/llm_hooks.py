@@ -0,0 +1,67 @@
+import logging
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger("agent")
+
+# Private internals of the openai plugin's LLMStream that the hooks below rely on. Checked
+# against livekit-agents / livekit-plugins-openai 1.8.x, the range pinned in pyproject.toml
+PARSE_CHOICE_ATTR = "_parse_choice"
+TOOL_CALL_ATTRS = ("_tool_call_id", "_fnc_name", "_fnc_raw_arguments")
+
+_warned: set[tuple[str, str]] = set()
+
+
+def _warn_once(stream: Any, purpose: str, missing: str) -> None:
+    key = (type(stream).__qualname__, purpose)
+    if key in _warned:
+        return
+    _warned.add(key)
+    logger.warning(
+        "%s unavailable: %s has no %s (livekit LLM stream internals changed?)",
+        purpose,
+        type(stream).__qualname__,
+        missing,
+    )
+
+
+def tap_parse_choice(
+    stream: Any, on_choice: Callable[[Any, Any], None], *, purpose: str
+) -> bool:
+    """Call `on_choice(choice, chunk)` for every choice `stream` parses, before it is yielded.
+
+    The openai plugin parses tool-call argument deltas without yielding them; this is the
+    only place they can be seen as they arrive. Returns False, and warns once per stream
+    type and `purpose`, when the stream doesn't have the hook point.
+    """
+    parse_choice = getattr(stream, PARSE_CHOICE_ATTR, None)
+    if not callable(parse_choice):
+        _warn_once(stream, purpose, PARSE_CHOICE_ATTR)
+        return False
+
+    def _tapped(chunk_id: str, choice: Any, *args: Any, **kwargs: Any) -> Any:
+        chunk = parse_choice(chunk_id, choice, *args, **kwargs)
+        try:
+            on_choice(choice, chunk)
+        except Exception:
+            # Hooks are best effort; never break the LLM stream over them
+            logger.debug("%s hook failed", purpose, exc_info=True)
+        return chunk
+
+    setattr(stream, PARSE_CHOICE_ATTR, _tapped)
+    return True
+
+
+def pending_tool_call(stream: Any, *, purpose: str) -> tuple[str, str, str] | None:
+    """(call id, function name, raw arguments so far) of the tool call `stream` is assembling.
+
+    Only valid from inside a `tap_parse_choice` callback, once the stream is running. None
+    when no call is in progress, or (warning once) when the stream doesn't expose one.
+    """
+    if not all(hasattr(stream, attr) for attr in TOOL_CALL_ATTRS):
+        _warn_once(stream, purpose, "/".join(TOOL_CALL_ATTRS))
+        return None
+    call_id, name, raw = (getattr(stream, attr) for attr in TOOL_CALL_ATTRS)
+    if not call_id:
+        return None
+    return call_id, name or "", raw or ""
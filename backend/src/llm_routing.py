@@ -0,0 +1,344 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from collections import deque
+from typing import Any, Callable
+
+from livekit.agents import APIConnectionError, llm
+from livekit.agents.types import (
+    DEFAULT_API_CONNECT_OPTIONS,
+    NOT_GIVEN,
+    APIConnectOptions,
+    NotGivenOr,
+)
+
+from llm_hooks import tap_parse_choice
+from perf_metrics import LLM_BACKEND_TTFT, LLM_HEDGES
+
+logger = logging.getLogger("agent")
+
+
+class BackendHealth:
+    """First-token latency history and circuit breaker for one LLM backend.
+
+    A request counts as slow when its first token takes longer than the hedge deadline,
+    it loses a hedge race or it fails. After `trip_after` slow requests in a row the
+    circuit opens for `cooldown` seconds and the backend is only used as the hedge; once
+    the cooldown is over it gets the primary slot back, and a single slow request reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        trip_after: int = 3,
+        cooldown: float = 30.0,
+        window: int = 50,
+    ) -> None:
+        self.name = name
+        self.trip_after = trip_after
+        self.cooldown = cooldown
+        self._ttfts: deque[float] = deque(maxlen=window)
+        self.consecutive_slow = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.wins = 0
+        self.hedges = 0
+        self.errors = 0
+        self.slow = 0
+        self.trips = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def record_ttft(self, ttft: float) -> None:
+        self._ttfts.append(ttft)
+        LLM_BACKEND_TTFT.labels(backend=self.name).observe(ttft)
+
+    def record_fast(self) -> None:
+        self.consecutive_slow = 0
+
+    def record_slow(self, *, error: bool = False) -> None:
+        self.slow += 1
+        self.errors += error
+        self.consecutive_slow += 1
+        if self.consecutive_slow >= self.trip_after and self.available:
+            self.open_until = time.monotonic() + self.cooldown
+            self.trips += 1
+            # Half-open after the cooldown: one more slow request trips it again
+            self.consecutive_slow = self.trip_after - 1
+            logger.warning(
+                "llm backend %s circuit open for %.0fs after %d slow requests",
+                self.name,
+                self.cooldown,
+                self.trip_after,
+            )
+
+    def stats(self) -> dict:
+        ttfts = sorted(self._ttfts)
+        return {
+            "requests": self.requests,
+            "wins": self.wins,
+            "hedges": self.hedges,
+            "slow": self.slow,
+            "errors": self.errors,
+            "circuit_trips": self.trips,
+            "circuit_open": not self.available,
+            "ttft_ms_p50": round(1000 * ttfts[len(ttfts) // 2], 1) if ttfts else None,
+            "ttft_ms_p90": round(1000 * ttfts[int(len(ttfts) * 0.9)], 1)
+            if ttfts
+            else None,
+        }
+
+
+class HedgedLLM(llm.LLM):
+    """Routes each request to the healthiest backend and hedges it if the first token is late.
+
+    Backends are tried in the given order, skipping those with an open circuit. If the
+    primary hasn't produced a first token (text or tool-call arguments) within
+    `hedge_after` seconds, or fails before it, the same request goes to the next backend;
+    whichever starts streaming first is used and the other is cancelled. Failures after
+    the first token are not retried, as with livekit's FallbackAdapter.
+    """
+
+    def __init__(
+        self,
+        backends: list[tuple[str, llm.LLM]],
+        *,
+        hedge_after: float = 1.5,
+        trip_after: int = 3,
+        cooldown: float = 30.0,
+    ) -> None:
+        if not backends:
+            raise ValueError("at least one backend is required")
+        super().__init__()
+        self.hedge_after = hedge_after
+        self._backends = backends
+        self.health = {
+            name: BackendHealth(name, trip_after=trip_after, cooldown=cooldown)
+            for name, _ in backends
+        }
+        for _, backend in backends:
+            backend.on("metrics_collected", self._on_metrics_collected)
+
+    def order(self) -> list[tuple[str, llm.LLM]]:
+        """Backends by preference: configured order, those with an open circuit last."""
+        return sorted(
+            self._backends, key=lambda backend: not self.health[backend[0]].available
+        )
+
+    @property
+    def model(self) -> str:
+        return self.order()[0][1].model
+
+    @property
+    def provider(self) -> str:
+        return self.order()[0][1].provider
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.Tool] | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls: NotGivenOr[bool] = NOT_GIVEN,
+        tool_choice: NotGivenOr[llm.ToolChoice] = NOT_GIVEN,
+        extra_kwargs: NotGivenOr[dict[str, Any]] = NOT_GIVEN,
+    ) -> "HedgedLLMStream":
+        return HedgedLLMStream(
+            self,
+            chat_ctx=chat_ctx,
+            tools=tools or [],
+            conn_options=conn_options,
+            parallel_tool_calls=parallel_tool_calls,
+            tool_choice=tool_choice,
+            extra_kwargs=extra_kwargs,
+        )
+
+    def stats(self) -> dict:
+        return {name: health.stats() for name, health in self.health.items()}
+
+    async def aclose(self) -> None:
+        for _, backend in self._backends:
+            backend.off("metrics_collected", self._on_metrics_collected)
+
+    def _on_metrics_collected(self, *args: Any, **kwargs: Any) -> None:
+        self.emit("metrics_collected", *args, **kwargs)
+
+
+class _Attempt:
+    """One backend's try at a request, buffering its chunks until it wins or is cancelled."""
+
+    def __init__(
+        self, name: str, backend: llm.LLM, chat_kwargs: dict[str, Any]
+    ) -> None:
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.ttft: float | None = None
+        self.error: BaseException | None = None
+        self.stream: llm.LLMStream | None = None
+        self.first_token = asyncio.Event()
+        self.chunks: asyncio.Queue[llm.ChatChunk | None] = asyncio.Queue()
+        self.task = asyncio.create_task(self._run(backend, chat_kwargs))
+
+    def _on_token(self) -> None:
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started_at
+            self.first_token.set()
+
+    def _tap(self, stream: llm.LLMStream) -> None:
+        # The openai plugin parses tool-call arguments without yielding them; count those as
+        # tokens too. Without the hook, first-token time falls back to the first yielded chunk
+        def _on_choice(choice: Any, chunk: Any) -> None:
+            delta = getattr(choice, "delta", None)
+            if delta is not None and (delta.content or delta.tool_calls):
+                self._on_token()
+
+        tap_parse_choice(stream, _on_choice, purpose="hedged LLM first-token timing")
+
+    async def _run(self, backend: llm.LLM, chat_kwargs: dict[str, Any]) -> None:
+        try:
+            async with backend.chat(**chat_kwargs) as stream:
+                self.stream = stream
+                self._tap(stream)
+                async for chunk in stream:
+                    if chunk.delta is not None and (
+                        chunk.delta.content or chunk.delta.tool_calls
+                    ):
+                        self._on_token()
+                    self.chunks.put_nowait(chunk)
+        except Exception as e:
+            self.error = e
+        finally:
+            # Also wakes the race when the attempt ends without a token
+            self.first_token.set()
+            self.chunks.put_nowait(None)
+
+    async def cancel(self) -> None:
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+class HedgedLLMStream(llm.LLMStream):
+    def __init__(
+        self,
+        router: HedgedLLM,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.Tool],
+        conn_options: APIConnectOptions,
+        parallel_tool_calls: NotGivenOr[bool],
+        tool_choice: NotGivenOr[llm.ToolChoice],
+        extra_kwargs: NotGivenOr[dict[str, Any]],
+    ) -> None:
+        super().__init__(
+            router, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options
+        )
+        self._router = router
+        self._chat_kwargs = {
+            "chat_ctx": chat_ctx,
+            "tools": tools,
+            # A failing backend falls through to the other one rather than retrying
+            "conn_options": dataclasses.replace(conn_options, max_retry=0),
+            "parallel_tool_calls": parallel_tool_calls,
+            "tool_choice": tool_choice,
+            "extra_kwargs": extra_kwargs,
+        }
+        self._winner_watchers: list[Callable[[llm.LLMStream], None]] = []
+
+    def add_winner_watcher(self, watcher: Callable[[llm.LLMStream], None]) -> None:
+        """Call `watcher` with the backend stream that wins, e.g. to tap its tool-call arguments."""
+        self._winner_watchers.append(watcher)
+
+    async def _race(self) -> _Attempt | None:
+        router = self._router
+        pending = list(router.order())
+        attempts: list[_Attempt] = []
+
+        def _launch(hedge: bool) -> None:
+            name, backend = pending.pop(0)
+            health = router.health[name]
+            health.requests += 1
+            if hedge:
+                health.hedges += 1
+                LLM_HEDGES.labels(backend=name).inc()
+            attempts.append(_Attempt(name, backend, self._chat_kwargs))
+
+        try:
+            _launch(hedge=False)
+            deadline = time.perf_counter() + router.hedge_after
+            while True:
+                started = next(
+                    (
+                        a
+                        for a in attempts
+                        if a.ttft is not None or (a.task.done() and a.error is None)
+                    ),
+                    None,
+                )
+                live = [a for a in attempts if not a.task.done()]
+                if started is not None:
+                    break
+                # Hedge when the deadline passes or every attempt so far has failed
+                if pending and (not live or time.perf_counter() >= deadline):
+                    logger.info(
+                        "llm first token late or failed on %s; hedging to %s",
+                        attempts[-1].name,
+                        pending[0][0],
+                    )
+                    _launch(hedge=True)
+                    continue
+                if not live:
+                    break
+                waiters = [asyncio.ensure_future(a.first_token.wait()) for a in live]
+                timeout = max(0.0, deadline - time.perf_counter()) if pending else None
+                try:
+                    await asyncio.wait(
+                        waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    for waiter in waiters:
+                        waiter.cancel()
+        except BaseException:
+            # Closed mid-race (e.g. the user interrupted): don't leave requests running
+            await asyncio.gather(*(a.cancel() for a in attempts))
+            raise
+
+        for attempt in attempts:
+            health = router.health[attempt.name]
+            if attempt is started:
+                health.wins += 1
+                if attempt.ttft is not None:
+                    health.record_ttft(attempt.ttft)
+                if attempt.ttft is not None and attempt.ttft > router.hedge_after:
+                    health.record_slow()
+                else:
+                    health.record_fast()
+            else:
+                health.record_slow(error=attempt.error is not None)
+                await attempt.cancel()
+        return started
+
+    async def _run(self) -> None:
+        winner = await self._race()
+        if winner is None:
+            raise APIConnectionError(
+                f"all llm backends failed ({[name for name, _ in self._router.order()]})"
+            )
+        try:
+            if winner.stream is not None:
+                for watcher in self._winner_watchers:
+                    watcher(winner.stream)
+            while (chunk := await winner.chunks.get()) is not None:
+                self._event_ch.send_nowait(chunk)
+            if winner.error is not None:
+                raise winner.error
+        finally:
+            await winner.cancel()
+
+    async def _metrics_monitor_task(self, event_aiter) -> None:
+        # The winning backend's own stream reports the metrics
+        async for _ in event_aiter:
+            pass
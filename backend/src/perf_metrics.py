@@ -0,0 +1,147 @@
+import logging
+
+from livekit.agents import metrics
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger("agent")
+
+# Exposed on the worker's /metrics endpoint (PROMETHEUS_PORT); job processes write to
+# PROMETHEUS_MULTIPROC_DIR so the endpoint aggregates every session the worker runs.
+_LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+EOU_DELAY = Histogram(
+    "agent_eou_delay_seconds",
+    "End-of-utterance delay",
+    ["mode"],
+    buckets=_LATENCY_BUCKETS,
+)
+TRANSCRIPTION_DELAY = Histogram(
+    "agent_transcription_delay_seconds",
+    "Transcript ready after end of speech",
+    ["mode"],
+    buckets=_LATENCY_BUCKETS,
+)
+STT_DURATION = Histogram(
+    "agent_stt_duration_seconds",
+    "STT request duration",
+    ["mode"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_TTFT = Histogram(
+    "agent_llm_ttft_seconds",
+    "LLM time to first token",
+    ["mode"],
+    buckets=_LATENCY_BUCKETS,
+)
+TTS_TTFB = Histogram(
+    "agent_tts_ttfb_seconds",
+    "TTS time to first byte",
+    ["mode"],
+    buckets=_LATENCY_BUCKETS,
+)
+RESPONSE_LATENCY = Histogram(
+    "agent_response_latency_seconds",
+    "End of user speech to first agent audio (EOU delay + LLM TTFT + TTS TTFB)",
+    ["mode"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_TTFT_BY_CACHE = Histogram(
+    "agent_llm_ttft_by_cache_seconds",
+    "LLM time to first token, split by whether the provider's prompt cache was hit",
+    ["mode", "cache"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Counter("agent_llm_prompt_tokens", "LLM prompt tokens", ["mode"])
+LLM_PROMPT_CACHED_TOKENS = Counter(
+    "agent_llm_prompt_cached_tokens",
+    "LLM prompt tokens served from the provider's prompt cache",
+    ["mode"],
+)
+SCREEN_ENCODE_TIME = Histogram(
+    "agent_screen_encode_seconds",
+    "Screen frame resize + JPEG encode time",
+    buckets=(0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0),
+)
+LLM_BACKEND_TTFT = Histogram(
+    "agent_llm_backend_ttft_seconds",
+    "First token latency of the LLM backend that won the request",
+    ["backend"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_HEDGES = Counter(
+    "agent_llm_hedges",
+    "LLM requests re-sent to another backend after a late or failed first token",
+    ["backend"],
+)
+IDLE_SESSIONS_REAPED = Counter(
+    "agent_idle_sessions_reaped", "Sessions ended early by the idle reaper", ["mode"]
+)
+IDLE_RECLAIMED_SECONDS = Counter(
+    "agent_idle_reclaimed_worker_seconds",
+    "Worker-seconds freed by ending idle sessions before the hard conversation timeout",
+    ["mode"],
+)
+UI_PUBLISH_LATENCY = Histogram(
+    "agent_ui_publish_latency_seconds",
+    "Data-channel UI update latency, from the tool queuing it to the publish completing",
+    ["topic"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+SCREEN_IMAGE_BYTES = Histogram(
+    "agent_screen_image_bytes",
+    "Size of the screenshot attached to a user turn",
+    ["mode"],
+    buckets=(25_000, 50_000, 100_000, 150_000, 200_000, 300_000, 500_000, 1_000_000),
+)
+
+
+class SessionMetrics:
+    """Feeds one session's pipeline metrics into the worker-wide histograms, labelled by mode."""
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        # speech_id -> partial response latency, completed once EOU, LLM and TTS have reported
+        self._pending: dict[str, dict[str, float]] = {}
+
+    def collect(self, m: metrics.AgentMetrics) -> None:
+        if isinstance(m, metrics.EOUMetrics):
+            EOU_DELAY.labels(self.mode).observe(m.end_of_utterance_delay)
+            TRANSCRIPTION_DELAY.labels(self.mode).observe(m.transcription_delay)
+            self._add_part(m.speech_id, "eou", m.end_of_utterance_delay)
+        elif isinstance(m, metrics.STTMetrics):
+            STT_DURATION.labels(self.mode).observe(m.duration)
+        elif isinstance(m, metrics.LLMMetrics):
+            if not m.cancelled:
+                LLM_TTFT.labels(self.mode).observe(m.ttft)
+                self._add_part(m.speech_id, "llm", m.ttft)
+                LLM_TTFT_BY_CACHE.labels(
+                    self.mode, "hit" if m.prompt_cached_tokens else "miss"
+                ).observe(m.ttft)
+            LLM_PROMPT_TOKENS.labels(self.mode).inc(m.prompt_tokens)
+            LLM_PROMPT_CACHED_TOKENS.labels(self.mode).inc(m.prompt_cached_tokens)
+            logger.info(
+                "llm prompt cache: %d/%d prompt tokens cached, ttft=%.3fs",
+                m.prompt_cached_tokens,
+                m.prompt_tokens,
+                m.ttft,
+            )
+        elif isinstance(m, metrics.TTSMetrics):
+            if not m.cancelled:
+                TTS_TTFB.labels(self.mode).observe(m.ttfb)
+                self._add_part(m.speech_id, "tts", m.ttfb)
+
+    def _add_part(self, speech_id: str | None, part: str, value: float) -> None:
+        if not speech_id:
+            return
+        parts = self._pending.setdefault(speech_id, {})
+        # Tool calls can produce several LLM/TTS rounds per speech; the first one is what the user waits on
+        parts.setdefault(part, value)
+        if len(parts) == 3:
+            RESPONSE_LATENCY.labels(self.mode).observe(sum(parts.values()))
+            self._pending.pop(speech_id, None)
+        # Speeches that never complete (e.g. interrupted before TTS) must not accumulate
+        while len(self._pending) > 32:
+            self._pending.pop(next(iter(self._pending)))
+
+    def observe_screen_image(self, size_bytes: int) -> None:
+        SCREEN_IMAGE_BYTES.labels(self.mode).observe(size_bytes)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any
+
+from livekit import rtc
+
+from llm_hooks import pending_tool_call, tap_parse_choice
+
+logger = logging.getLogger("agent")
+
+PROMPT_TOPIC = "prompt-update"
+PROMPT_TOOL = "update_prompt"
+
+
+def partial_json_string(raw: str, key: str) -> str | None:
+    """Decoded value of string field `key` from a JSON object that may still be streaming.
+
+    Returns the longest prefix that is known for sure (an escape sequence cut in half is
+    left out until it completes), or None until the value has started.
+    """
+    marker = f'"{key}"'
+    pos = raw.find(marker)
+    if pos < 0:
+        return None
+    pos = raw.find(":", pos + len(marker))
+    if pos < 0:
+        return None
+    pos = raw.find('"', pos + 1)
+    if pos < 0:
+        return None
+    body = raw[pos + 1 :]
+    try:
+        return json.loads(f'"{body[: _decodable_end(body)]}"', strict=False)
+    except ValueError:
+        return None
+
+
+def _decodable_end(body: str) -> int:
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == "\\":
+            width = 6 if body[i + 1 : i + 2] == "u" else 2
+            if i + width > len(body):
+                return i
+            # A high surrogate is only decodable together with its low half
+            if (
+                width == 6
+                and 0xD800 <= int(body[i + 2 : i + 6], 16) < 0xDC00
+                and i + 12 > len(body)
+            ):
+                return i
+            i += width
+        elif char == '"':
+            return i
+        else:
+            i += 1
+    return len(body)
+
+
+class _PromptStream:
+    def __init__(self, call_id: str) -> None:
+        self.call_id = call_id
+        self.sent = ""
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue()
+        self.started_at = time.perf_counter()
+        self.first_chunk_at: float | None = None
+        self.task: asyncio.Task | None = None
+
+
+class PromptStreamer:
+    """Streams the `update_prompt` tool's text to the frontend while the LLM generates it.
+
+    `watch` taps an LLM stream: as the tool call's arguments arrive, the decoded prefix of
+    `text` is forwarded as chunks of a LiveKit text stream on PROMPT_TOPIC, tagged with the
+    tool call id. The frontend renders it progressively; the tool's own `prompt_update`
+    data message (same call id) then commits the final text.
+    """
+
+    def __init__(self, room: rtc.Room, *, min_chunk_chars: int = 12) -> None:
+        self._room = room
+        # Fewer, larger chunks; the rest is flushed when the call completes
+        self.min_chunk_chars = min_chunk_chars
+        self._streams: dict[str, _PromptStream] = {}
+        self.streams = 0
+        self.chunks = 0
+        self.chars = 0
+        self._first_chunk_total = 0.0
+
+    def watch(self, stream: Any) -> bool:
+        """Tap `stream` for update_prompt arguments.
+
+        Returns False (and warns once) when the stream doesn't expose the parsed tool-call
+        deltas; the prompt then only reaches the UI when the tool runs.
+        """
+        if hasattr(stream, "add_winner_watcher"):
+            # Hedged requests: tap whichever backend's stream ends up answering
+            stream.add_winner_watcher(self.watch)
+            return True
+
+        def _on_choice(choice: Any, chunk: Any) -> None:
+            # Calls completed by this chunk are in it; the one still streaming is on the stream
+            completed = (
+                chunk.delta.tool_calls
+                if chunk is not None and chunk.delta is not None
+                else None
+            ) or []
+            for call in completed:
+                if call.name == PROMPT_TOOL:
+                    self._on_arguments(call.call_id, call.arguments, final=True)
+            pending = pending_tool_call(stream, purpose="prompt streaming")
+            if pending is not None and pending[1] == PROMPT_TOOL:
+                self._on_arguments(pending[0], pending[2], final=False)
+
+        return tap_parse_choice(stream, _on_choice, purpose="prompt streaming")
+
+    def _on_arguments(self, call_id: str, raw: str, *, final: bool) -> None:
+        text = partial_json_string(raw, "text")
+        prompt = self._streams.get(call_id)
+        if prompt is None:
+            if text is None:
+                return
+            prompt = self._streams[call_id] = _PromptStream(call_id)
+            prompt.task = asyncio.create_task(self._forward(prompt))
+            self.streams += 1
+        if text is not None and text.startswith(prompt.sent):
+            delta = text[len(prompt.sent) :]
+            if delta and (final or len(delta) >= self.min_chunk_chars):
+                prompt.sent = text
+                prompt.queue.put_nowait(delta)
+        if final:
+            prompt.queue.put_nowait(None)
+
+    async def _forward(self, prompt: _PromptStream) -> None:
+        writer = None
+        try:
+            writer = await self._room.local_participant.stream_text(
+                topic=PROMPT_TOPIC,
+                attributes={"type": "prompt_delta", "call_id": prompt.call_id},
+            )
+            while (chunk := await prompt.queue.get()) is not None:
+                await writer.write(chunk)
+                if prompt.first_chunk_at is None:
+                    prompt.first_chunk_at = time.perf_counter()
+                    self._first_chunk_total += prompt.first_chunk_at - prompt.started_at
+                self.chunks += 1
+                self.chars += len(chunk)
+        except Exception:
+            logger.exception("failed to stream prompt update")
+        finally:
+            if writer is not None:
+                try:
+                    await writer.aclose()
+                except Exception:
+                    logger.debug("failed to close prompt text stream", exc_info=True)
+            self._streams.pop(prompt.call_id, None)
+
+    def finish_all(self) -> None:
+        """End streams whose tool call never completed (e.g. the generation was interrupted)."""
+        for prompt in list(self._streams.values()):
+            prompt.queue.put_nowait(None)
+
+    async def aclose(self) -> None:
+        self.finish_all()
+        tasks = [
+            prompt.task for prompt in self._streams.values() if prompt.task is not None
+        ]
+        if tasks:
+            await asyncio.wait(tasks, timeout=2.0)
+
+    def stats(self) -> dict:
+        return {
+            "prompt_streams": self.streams,
+            "prompt_chunks": self.chunks,
+            "prompt_chars": self.chars,
+            "first_chunk_ms_avg": round(
+                1000 * self._first_chunk_total / self.streams, 2
+            )
+            if self.streams
+            else 0.0,
+        }
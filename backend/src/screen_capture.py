@@ -0,0 +1,883 @@
+import asyncio
+import base64
+import contextlib
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable
+
+import numpy as np
+from livekit import rtc
+from livekit.agents.utils.images import EncodeOptions as LKEncodeOptions
+from livekit.agents.utils.images import ResizeOptions as LKResizeOptions
+from livekit.agents.utils.images import encode as lk_encode
+from PIL import Image
+
+from agent_logging import log_sampled
+from perf_metrics import SCREEN_ENCODE_TIME
+
+logger = logging.getLogger("agent")
+
+# Resize to 1024x1024 (fit) to improve OCR/vision robustness
+SCREEN_ENCODE_OPTIONS = LKEncodeOptions(
+    format="JPEG",
+    resize_options=LKResizeOptions(
+        width=1024, height=1024, strategy="scale_aspect_fit"
+    ),
+)
+
+# Change detection compares a SIGNATURE_GRID x SIGNATURE_GRID grid of block-averaged luma;
+# a cell counts as changed when its mean moves by more than SIGNATURE_CELL_TOLERANCE levels
+SIGNATURE_GRID = 64
+SIGNATURE_CELL_TOLERANCE = 4.0
+
+# Longest side of the low-detail full-screen thumbnail sent alongside a region crop
+SCREEN_REGION_THUMBNAIL_SIDE = 512
+
+_YUV_TYPES = (
+    rtc.VideoBufferType.I420,
+    rtc.VideoBufferType.I420A,
+    rtc.VideoBufferType.I422,
+    rtc.VideoBufferType.I444,
+    rtc.VideoBufferType.NV12,
+)
+
+# Chroma subsampling (x, y) of the planar YUV layouts that are encoded straight from their planes
+_PLANAR_YUV = {
+    rtc.VideoBufferType.I420: (2, 2),
+    rtc.VideoBufferType.I420A: (2, 2),
+    rtc.VideoBufferType.I422: (2, 1),
+    rtc.VideoBufferType.I444: (1, 1),
+}
+# WebRTC video is limited range (luma 16-235, chroma 16-240); JPEG's YCbCr is full range
+_LUMA_TO_FULL = [min(255, max(0, round((v - 16) * 255 / 219))) for v in range(256)]
+_CHROMA_TO_FULL = [
+    min(255, max(0, round((v - 128) * 255 / 224 + 128))) for v in range(256)
+]
+_YCBCR_TO_FULL = _LUMA_TO_FULL + _CHROMA_TO_FULL + _CHROMA_TO_FULL
+
+# One JPEG output buffer per executor thread, reused across encodes
+_jpeg_buffers = threading.local()
+
+
+def frame_signature(frame: rtc.VideoFrame, grid: int = SIGNATURE_GRID) -> np.ndarray:
+    """Downsample a frame to a small grid of mean luma values for cheap change detection."""
+    width, height = frame.width, frame.height
+    if frame.type in _YUV_TYPES:
+        # The Y plane is already luma, no color conversion needed
+        luma = np.frombuffer(
+            frame.get_plane(0), dtype=np.uint8, count=width * height
+        ).reshape(height, width)
+    else:
+        rgba = (
+            frame
+            if frame.type == rtc.VideoBufferType.RGBA
+            else frame.convert(rtc.VideoBufferType.RGBA)
+        )
+        luma = np.frombuffer(rgba.data, dtype=np.uint8).reshape(height, width, 4)[
+            :, :, :3
+        ]
+    grid = max(1, min(grid, width, height))
+    cell_h, cell_w = height // grid, width // grid
+    # Reduced straight from a view of the frame; no full-size float copy
+    cells = luma[: cell_h * grid, : cell_w * grid].reshape(
+        grid, cell_h, grid, cell_w, *luma.shape[2:]
+    )
+    return cells.mean(axis=(1, 3, *range(4, cells.ndim)), dtype=np.float32)
+
+
+def signature_diff(
+    a: np.ndarray, b: np.ndarray, cell_tolerance: float = SIGNATURE_CELL_TOLERANCE
+) -> float:
+    """Fraction of grid cells that changed between two signatures (1.0 if not comparable)."""
+    if a.shape != b.shape:
+        return 1.0
+    return float(np.count_nonzero(np.abs(a - b) > cell_tolerance)) / a.size
+
+
+def changed_cells(
+    a: np.ndarray, b: np.ndarray, cell_tolerance: float = SIGNATURE_CELL_TOLERANCE
+) -> tuple[int, int, int, int] | None:
+    """Bounding box (row0, col0, row1, col1), end exclusive, of the grid cells that changed."""
+    if a.shape != b.shape:
+        return None
+    rows, cols = np.nonzero(np.abs(a - b) > cell_tolerance)
+    if rows.size == 0:
+        return None
+    return int(rows.min()), int(cols.min()), int(rows.max()) + 1, int(cols.max()) + 1
+
+
+def cells_to_box(
+    cells: tuple[int, int, int, int],
+    grid_shape: tuple[int, ...],
+    width: int,
+    height: int,
+    padding: int,
+) -> tuple[int, int, int, int]:
+    """Map a signature cell box to a padded pixel box (x0, y0, x1, y1) in a width x height frame."""
+    grid_rows, grid_cols = grid_shape
+    cell_h, cell_w = height // grid_rows, width // grid_cols
+    row0, col0, row1, col1 = cells
+    # The signature ignores the remainder pixels, which belong to the last row/column of cells
+    y1 = height if row1 == grid_rows else row1 * cell_h
+    x1 = width if col1 == grid_cols else col1 * cell_w
+    return (
+        max(0, col0 * cell_w - padding),
+        max(0, row0 * cell_h - padding),
+        min(width, x1 + padding),
+        min(height, y1 + padding),
+    )
+
+
+def _resized_image(
+    frame: rtc.VideoFrame,
+    size: tuple[int, int],
+    box: tuple[int, int, int, int] | None = None,
+) -> Image.Image:
+    """`frame`, or the pixel `box` of it, resized to `size`, read through views of the frame's buffer.
+
+    Planar YUV is resized plane by plane and merged as YCbCr, which is what JPEG stores, so
+    no full-size RGB copy is ever made. Other layouts are converted to RGBA once; RGBA frames
+    are used as they are.
+    """
+    width, height = frame.width, frame.height
+    box = box or (0, 0, width, height)
+    subsampling = _PLANAR_YUV.get(frame.type)
+    if subsampling is None:
+        rgba = (
+            frame
+            if frame.type == rtc.VideoBufferType.RGBA
+            else frame.convert(rtc.VideoBufferType.RGBA)
+        )
+        image = Image.frombuffer(
+            "RGBA", (width, height), rgba.data, "raw", "RGBA", 0, 1
+        )
+        return image.resize(size, box=box).convert("RGB")
+    planes = []
+    for i, (dx, dy) in enumerate(((1, 1), subsampling, subsampling)):
+        plane_size = (-(-width // dx), -(-height // dy))
+        plane = Image.frombuffer("L", plane_size, frame.get_plane(i), "raw", "L", 0, 1)
+        planes.append(
+            plane.resize(size, box=(box[0] / dx, box[1] / dy, box[2] / dx, box[3] / dy))
+        )
+    return Image.merge("YCbCr", planes).point(_YCBCR_TO_FULL)
+
+
+def _save_jpeg(image: Image.Image, quality: int) -> bytes:
+    out = getattr(_jpeg_buffers, "out", None)
+    if out is None:
+        out = _jpeg_buffers.out = io.BytesIO()
+    # Overwrite from the start: truncating would give the buffer's memory back every time
+    out.seek(0)
+    image.save(out, format="JPEG", quality=quality)
+    with out.getbuffer() as view:
+        return bytes(view[: out.tell()])
+
+
+def encode_frame_jpeg(
+    frame: rtc.VideoFrame, options: LKEncodeOptions
+) -> tuple[bytes, int, int]:
+    """`lk_encode` for JPEG "scale_aspect_fit" without its full-size intermediate copies."""
+    resize = options.resize_options
+    width, height = (
+        fitted_size(frame.width, frame.height, resize.width, resize.height)
+        if resize is not None
+        else (frame.width, frame.height)
+    )
+    if options.format != "JPEG" or (
+        resize is not None and resize.strategy != "scale_aspect_fit"
+    ):
+        return lk_encode(frame, options), width, height
+    image = _resized_image(frame, (width, height))
+    return _save_jpeg(image, options.quality or 75), width, height
+
+
+def crop_frame_jpeg(
+    frame: rtc.VideoFrame,
+    box: tuple[int, int, int, int],
+    max_side: int = 2048,
+    quality: int = 85,
+) -> tuple[bytes, int, int]:
+    """JPEG of `box` cut from the raw frame at native resolution (shrunk only past `max_side`)."""
+    x0, y0, x1, y1 = box
+    width, height = x1 - x0, y1 - y0
+    if max(width, height) > max_side:
+        width, height = fitted_size(width, height, max_side, max_side)
+    image = _resized_image(frame, (width, height), box)
+    return _save_jpeg(image, quality), image.width, image.height
+
+
+@dataclass
+class EncodedFrame:
+    seq: int
+    jpeg: bytes
+    signature: np.ndarray
+    # Size of the encoded image
+    width: int = 0
+    height: int = 0
+    # Pixel box (x0, y0, x1, y1) of the source frame when this is a crop
+    region: tuple[int, int, int, int] | None = None
+
+    @cached_property
+    def data_url(self) -> str:
+        """The JPEG as a data URL, built once however many turns attach this frame."""
+        return "data:image/jpeg;base64," + base64.b64encode(self.jpeg).decode("ascii")
+
+
+def fitted_size(
+    width: int, height: int, max_width: int, max_height: int
+) -> tuple[int, int]:
+    """Output size of a "scale_aspect_fit" resize."""
+    if width <= 0 or height <= 0:
+        return 0, 0
+    new_width, new_height = max_width, int(height * (max_width / width))
+    if new_height > max_height:
+        new_width, new_height = int(width * (max_height / height)), max_height
+    return new_width, new_height
+
+
+def downscale_jpeg(
+    jpeg: bytes, max_side: int, quality: int = 75
+) -> tuple[bytes, int, int]:
+    """Shrink an encoded JPEG to fit in `max_side` x `max_side`; returns the bytes and new size."""
+    with Image.open(io.BytesIO(jpeg)) as image:
+        image.thumbnail((max_side, max_side))
+        return _save_jpeg(image, quality), image.width, image.height
+
+
+class ScreenChangeDetector:
+    """Decides whether an encoded frame differs enough from the last attached one.
+
+    `threshold` is the fraction of signature cells that must change; 0 attaches on any
+    visible change. Frames that are unchanged are counted in `attachments_avoided`. A
+    changed frame only becomes the new baseline through `mark_attached`, once an image of
+    it was actually attached; one that is skipped (budget, OCR) leaves the baseline as is.
+    """
+
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self._attached: EncodedFrame | None = None
+        self.attachments = 0
+        self.attachments_avoided = 0
+        self.last_diff: float | None = None
+        # Signature cells that changed against the previously attached frame (None for the first)
+        self.last_changed_cells: tuple[int, int, int, int] | None = None
+
+    def should_attach(self, encoded: EncodedFrame) -> bool:
+        self.last_changed_cells = None
+        if self._attached is None:
+            changed = True
+            self.last_diff = None
+        elif encoded.seq == self._attached.seq:
+            changed = False
+            self.last_diff = 0.0
+        else:
+            self.last_diff = signature_diff(encoded.signature, self._attached.signature)
+            changed = self.last_diff > self.threshold
+            if changed:
+                self.last_changed_cells = changed_cells(
+                    encoded.signature, self._attached.signature
+                )
+        if not changed:
+            self.attachments_avoided += 1
+        return changed
+
+    def mark_attached(self, encoded: EncodedFrame) -> None:
+        """Record that an image of `encoded` went to the model; later frames are compared to it."""
+        self._attached = encoded
+        self.attachments += 1
+
+    def stats(self) -> dict:
+        return {
+            "attachments": self.attachments,
+            "attachments_avoided": self.attachments_avoided,
+        }
+
+
+class _PendingJob:
+    def __init__(self, fn: Callable[..., Any], args: tuple) -> None:
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+
+
+class EncodeExecutor:
+    """Bounded thread pool that runs frame encodes off the asyncio event loop.
+
+    Jobs are keyed by their source (one key per capture session). At most one job per
+    key waits in the queue: submitting again before it starts replaces the queued
+    job's arguments (drop-oldest), and every waiter receives the newest result.
+    PIL and the FFI frame conversion release the GIL, so threads scale well enough
+    without pickling frames to a process pool.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="screen-encode"
+        )
+        self._lock = threading.Lock()
+        self._pending: dict[Any, _PendingJob] = {}
+        self._running = 0
+        self.max_workers = max_workers
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self._encode_time_total = 0.0
+        self._encode_time_max = 0.0
+
+    async def run_latest(self, key: Any, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            self.submitted += 1
+            job = self._pending.get(key)
+            if job is not None:
+                # Not started yet: swap in the newer arguments, the older ones are dropped
+                job.fn, job.args = fn, args
+                self.dropped += 1
+            else:
+                job = _PendingJob(fn, args)
+                self._pending[key] = job
+                self._pool.submit(self._run, key, job)
+                self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        return await asyncio.wrap_future(job.future)
+
+    def _run(self, key: Any, job: _PendingJob) -> None:
+        with self._lock:
+            if self._pending.get(key) is job:
+                del self._pending[key]
+            fn, args = job.fn, job.args
+            self._running += 1
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            job.future.set_exception(e)
+            return
+        else:
+            job.future.set_result(result)
+        finally:
+            elapsed = time.perf_counter() - start
+            SCREEN_ENCODE_TIME.observe(elapsed)
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._encode_time_total += elapsed
+                self._encode_time_max = max(self._encode_time_max, elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self._running,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "completed": self.completed,
+                "encode_ms_avg": round(
+                    1000 * self._encode_time_total / self.completed, 2
+                )
+                if self.completed
+                else 0.0,
+                "encode_ms_max": round(1000 * self._encode_time_max, 2),
+            }
+
+
+_encode_executor: EncodeExecutor | None = None
+
+
+def get_encode_executor() -> EncodeExecutor:
+    """Return the process-wide encode executor, created on first use (normally in prewarm)."""
+    global _encode_executor
+    if _encode_executor is None:
+        _encode_executor = EncodeExecutor(
+            max_workers=int(os.getenv("SCREEN_ENCODE_WORKERS", "2"))
+        )
+    return _encode_executor
+
+
+class LazyFrameEncoder:
+    """Keeps a reference to the newest raw screen frame and JPEG-encodes it on demand.
+
+    The capture loop calls `push` for every frame the stream delivers, which is cheap.
+    The expensive resize + JPEG encode only happens in `get_encoded`, at most once per
+    distinct frame, on the shared `EncodeExecutor`; the result is cached until a newer
+    frame arrives.
+    """
+
+    def __init__(
+        self,
+        options: LKEncodeOptions = SCREEN_ENCODE_OPTIONS,
+        executor: EncodeExecutor | None = None,
+    ) -> None:
+        self._options = options
+        self._executor = executor or get_encode_executor()
+        self._frame: rtc.VideoFrame | None = None
+        self._frame_seq = 0
+        self._encoded: EncodedFrame | None = None
+        self._downscaled: tuple[int, int, EncodedFrame] | None = None
+        # Bumped by `clear`: results of encodes started before it are dropped
+        self._generation = 0
+        self._tasks: set[asyncio.Task] = set()
+        self.frames_received = 0
+        self.frames_encoded = 0
+
+    def push(self, frame: rtc.VideoFrame) -> None:
+        self._frame = frame
+        self._frame_seq += 1
+        self.frames_received += 1
+
+    def clear(self) -> None:
+        """Forget the current frame, e.g. when the captured track goes away."""
+        self._frame = None
+        self._encoded = None
+        self._downscaled = None
+        self._generation += 1
+
+    def _encode(self, frame: rtc.VideoFrame, seq: int) -> EncodedFrame | None:
+        # Runs on an executor thread
+        try:
+            jpeg_bytes, width, height = encode_frame_jpeg(frame, self._options)
+            if not jpeg_bytes:
+                return None
+            return EncodedFrame(
+                seq=seq,
+                jpeg=jpeg_bytes,
+                signature=frame_signature(frame),
+                width=width,
+                height=height,
+            )
+        except Exception:
+            logger.debug("images.encode failed", exc_info=True)
+            return None
+
+    async def get_encoded(self) -> EncodedFrame | None:
+        if self._frame is None:
+            return None
+        if self._encoded is None or self._encoded.seq != self._frame_seq:
+            generation = self._generation
+            encoded = await self._executor.run_latest(
+                self, self._encode, self._frame, self._frame_seq
+            )
+            if generation != self._generation:
+                # Cleared while encoding (e.g. a track switch): the frame is the old track's
+                logger.debug("screen capture cleared during encode; dropping the frame")
+                return None
+            if encoded is None:
+                logger.debug(
+                    "frame conversion produced no bytes; keeping previous frame"
+                )
+            elif self._encoded is None or encoded.seq > self._encoded.seq:
+                self._encoded = encoded
+                self.frames_encoded += 1
+                log_sampled(
+                    "screen frames encoded",
+                    "encoded screen frame: %d bytes",
+                    len(encoded.jpeg),
+                    value=len(encoded.jpeg),
+                    unit="bytes",
+                )
+        return self._encoded
+
+    async def get_downscaled(
+        self, encoded: EncodedFrame, max_side: int
+    ) -> EncodedFrame:
+        """`encoded` shrunk to fit in `max_side`, for turns that don't need full resolution."""
+        if max(encoded.width, encoded.height) <= max_side:
+            return encoded
+        if self._downscaled is not None and self._downscaled[:2] == (
+            encoded.seq,
+            max_side,
+        ):
+            return self._downscaled[2]
+        generation = self._generation
+        try:
+            jpeg, width, height = await self._executor.run_latest(
+                (self, "downscale"), downscale_jpeg, encoded.jpeg, max_side
+            )
+        except Exception:
+            logger.debug("jpeg downscale failed; keeping full size", exc_info=True)
+            return encoded
+        smaller = EncodedFrame(
+            seq=encoded.seq,
+            jpeg=jpeg,
+            signature=encoded.signature,
+            width=width,
+            height=height,
+        )
+        if generation == self._generation:
+            self._downscaled = (encoded.seq, max_side, smaller)
+        return smaller
+
+    def changed_region(
+        self,
+        encoded: EncodedFrame,
+        cells: tuple[int, int, int, int],
+        padding: int,
+        max_area: float,
+    ) -> tuple[int, int, int, int] | None:
+        """Pixel box around `cells` in `encoded`'s raw frame, or None when it is too large to be worth cropping.
+
+        Needs the raw frame, so returns None once a newer frame has replaced it.
+        """
+        frame = self._frame
+        if frame is None or encoded.seq != self._frame_seq:
+            return None
+        box = cells_to_box(
+            cells, encoded.signature.shape, frame.width, frame.height, padding
+        )
+        if (box[2] - box[0]) * (
+            box[3] - box[1]
+        ) > max_area * frame.width * frame.height:
+            return None
+        return box
+
+    async def get_region(
+        self, encoded: EncodedFrame, box: tuple[int, int, int, int]
+    ) -> EncodedFrame | None:
+        """Native-resolution crop of `encoded`'s raw frame, or None if that frame is gone."""
+        frame = self._frame
+        if frame is None or encoded.seq != self._frame_seq:
+            return None
+        try:
+            jpeg, width, height = await self._executor.run_latest(
+                (self, "region"), crop_frame_jpeg, frame, box
+            )
+        except Exception:
+            logger.debug("screen region crop failed", exc_info=True)
+            return None
+        return EncodedFrame(
+            seq=encoded.seq,
+            jpeg=jpeg,
+            signature=encoded.signature,
+            width=width,
+            height=height,
+            region=box,
+        )
+
+    async def get_signature(self) -> tuple[int, np.ndarray] | None:
+        """(seq, luma signature) of the newest raw frame, without a JPEG encode."""
+        frame = self._frame
+        if frame is None:
+            return None
+        seq = self._frame_seq
+        if self._encoded is not None and self._encoded.seq == seq:
+            return seq, self._encoded.signature
+        try:
+            return seq, await self._executor.run_latest(
+                (self, "signature"), frame_signature, frame
+            )
+        except Exception:
+            logger.debug("frame signature failed", exc_info=True)
+            return None
+
+    def encode_in_background(self) -> None:
+        """Schedule an encode of the newest frame without waiting for it."""
+        task = asyncio.create_task(self.get_encoded())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            "frames_received": self.frames_received,
+            "frames_encoded": self.frames_encoded,
+        }
+
+
+# Simulcast layers for ScreenCapture's `source_quality`
+_SOURCE_QUALITY = {
+    "low": rtc.VideoQuality.VIDEO_QUALITY_LOW,
+    "medium": rtc.VideoQuality.VIDEO_QUALITY_MEDIUM,
+    "high": rtc.VideoQuality.VIDEO_QUALITY_HIGH,
+}
+
+# Lower is preferred when several remote video tracks are available
+_SOURCE_PRIORITY = {
+    rtc.TrackSource.SOURCE_SCREENSHARE: 0,
+    rtc.TrackSource.SOURCE_UNKNOWN: 1,
+    rtc.TrackSource.SOURCE_CAMERA: 2,
+}
+
+
+def preferred_video_publication(
+    publications: list[rtc.RemoteTrackPublication],
+) -> rtc.RemoteTrackPublication | None:
+    """Pick the publication to capture: screen share over unknown sources over camera.
+
+    Ties go to the most recently subscribed publication (last in the list).
+    """
+    best = None
+    for pub in publications:
+        if best is None or _SOURCE_PRIORITY.get(pub.source, 3) <= _SOURCE_PRIORITY.get(
+            best.source, 3
+        ):
+            best = pub
+    return best
+
+
+class ScreenCapture:
+    """Session-scoped screen capture for one room.
+
+    Tracks every subscribed remote video track, captures frames from the preferred one
+    (see `preferred_video_publication`) and switches tracks as they are unpublished or
+    resubscribed. Owns the capture task; call `aclose` from a shutdown callback.
+    """
+
+    def __init__(
+        self,
+        room: rtc.Room,
+        *,
+        capture_mode: str = "lazy",
+        change_threshold: float = 0.002,
+        attach_mode: str = "full",
+        region_padding: int = 32,
+        region_max_area: float = 0.5,
+        region_thumbnail: bool = False,
+        max_fps: float = 0.0,
+        source_quality: str = "high",
+        stream_capacity: int = 1,
+    ) -> None:
+        # "lazy" keeps only the newest raw frame and encodes it when a user turn completes;
+        # "eager" encodes every frame as it arrives
+        self._room = room
+        self._capture_mode = capture_mode
+        # Frames above `max_fps` (0 = no cap) are dropped before they reach the encoder; the
+        # newest dropped one is still taken at the next slot, so the last change is never lost
+        self.max_fps = max_fps
+        # Simulcast layer requested from the publisher ("low", "medium" or "high")
+        self.source_quality = source_quality
+        # Frames the video stream buffers before dropping the oldest (0 = unbounded)
+        self.stream_capacity = stream_capacity
+        # "region" attaches a native-resolution crop of the changed area instead of the whole
+        # screen when the change covers at most `region_max_area` of it
+        self.attach_mode = attach_mode
+        self.region_padding = region_padding
+        self.region_max_area = region_max_area
+        self.region_thumbnail = region_thumbnail
+        self.encoder = LazyFrameEncoder()
+        self.change_detector = ScreenChangeDetector(threshold=change_threshold)
+        self._candidates: dict[
+            str, tuple[rtc.RemoteVideoTrack, rtc.RemoteTrackPublication]
+        ] = {}
+        self._active_sid: str | None = None
+        self._task: asyncio.Task | None = None
+        self._diag_logged = False
+        self._closed = False
+        self.track_switches = 0
+        self._next_frame_at = 0.0
+        self._held_frame: rtc.VideoFrame | None = None
+        self._held_timer: asyncio.TimerHandle | None = None
+        self.frames_delivered = 0
+        self.frames_skipped = 0
+        self.frames_processed = 0
+        # Last frame seen by `poll_activity`
+        self._activity_probe: tuple[int, np.ndarray] | None = None
+
+    def start(self) -> None:
+        self._room.on("track_subscribed", self._on_track_subscribed)
+        self._room.on("track_unsubscribed", self._on_track_unsubscribed)
+        # Pick up tracks that were subscribed before we started listening
+        for participant in self._room.remote_participants.values():
+            for publication in participant.track_publications.values():
+                if isinstance(publication.track, rtc.RemoteVideoTrack):
+                    self._candidates[publication.sid] = (publication.track, publication)
+        self._select_track()
+
+    async def aclose(self) -> None:
+        self._closed = True
+        self._room.off("track_subscribed", self._on_track_subscribed)
+        self._room.off("track_unsubscribed", self._on_track_unsubscribed)
+        self._candidates.clear()
+        await self._stop_capture()
+        self._drop_held_frame()
+        self.encoder.clear()
+
+    def _on_track_subscribed(
+        self,
+        track: rtc.RemoteTrack,
+        publication: rtc.RemoteTrackPublication,
+        participant: rtc.RemoteParticipant,
+    ) -> None:
+        if not isinstance(track, rtc.RemoteVideoTrack):
+            return
+        logger.info(
+            "video track subscribed: sid=%s source=%s",
+            publication.sid,
+            publication.source,
+        )
+        self._candidates.pop(publication.sid, None)
+        self._candidates[publication.sid] = (track, publication)
+        self._select_track()
+
+    def _on_track_unsubscribed(
+        self,
+        track: rtc.RemoteTrack,
+        publication: rtc.RemoteTrackPublication,
+        participant: rtc.RemoteParticipant,
+    ) -> None:
+        if self._candidates.pop(publication.sid, None) is not None:
+            logger.info("video track unsubscribed: sid=%s", publication.sid)
+            self._select_track()
+
+    def _select_track(self) -> None:
+        if self._closed:
+            return
+        best = preferred_video_publication(
+            [pub for _, pub in self._candidates.values()]
+        )
+        best_sid = best.sid if best else None
+        if best_sid == self._active_sid:
+            return
+        previous_task = self._task
+        self._task = None
+        self._active_sid = best_sid
+        # Don't let a frame from the previous track (or previous user) leak into the next turn
+        self._drop_held_frame()
+        self.encoder.clear()
+        if previous_task is not None:
+            previous_task.cancel()
+        if best is None:
+            logger.info("no remote video track left; screen capture paused")
+            return
+        track, publication = self._candidates[best.sid]
+        self.track_switches += 1
+        quality = _SOURCE_QUALITY.get(self.source_quality)
+        if quality is not None and quality != rtc.VideoQuality.VIDEO_QUALITY_HIGH:
+            # Only simulcast publishers have lower layers; others keep sending full resolution
+            publication.set_video_quality(quality)
+        logger.info(
+            "capturing video track sid=%s source=%s quality=%s",
+            best.sid,
+            best.source,
+            self.source_quality,
+        )
+        self._task = asyncio.create_task(self._capture(track))
+
+    async def _stop_capture(self) -> None:
+        task, self._task = self._task, None
+        self._active_sid = None
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _capture(self, video_track: rtc.RemoteVideoTrack) -> None:
+        # A small buffer so a slow consumer drops stale frames instead of queueing them
+        stream = rtc.VideoStream(video_track, capacity=self.stream_capacity)
+        try:
+            async for frame in stream:
+                try:
+                    # One-time diagnostics on first frame
+                    if not self._diag_logged:
+                        self._diag_logged = True
+                        frame_obj = getattr(frame, "frame", frame)
+                        caps = {
+                            "event_type": type(frame).__name__,
+                            "frame_type": type(frame_obj).__name__,
+                            "capture_mode": self._capture_mode,
+                            "max_fps": self.max_fps,
+                            "width": frame_obj.width,
+                            "height": frame_obj.height,
+                        }
+                        logger.info("video frame capabilities: %s", caps)
+
+                    # Unwrap frame if this is an event wrapper
+                    self.offer_frame(getattr(frame, "frame", frame))
+                except Exception:
+                    logger.exception("failed to capture video frame")
+        finally:
+            await stream.aclose()
+
+    def changed_region(self, encoded: EncodedFrame) -> tuple[int, int, int, int] | None:
+        """Box to crop `encoded` to in "region" attach mode, right after the change detector accepted it."""
+        cells = self.change_detector.last_changed_cells
+        if self.attach_mode != "region" or cells is None:
+            return None
+        return self.encoder.changed_region(
+            encoded, cells, self.region_padding, self.region_max_area
+        )
+
+    async def poll_activity(self) -> bool:
+        """Whether the shared screen changed since the previous poll (False on the first one).
+
+        Used by the idle reaper: compares luma signatures only, so polling never encodes a JPEG.
+        """
+        probe = await self.encoder.get_signature()
+        if probe is None:
+            return False
+        previous, self._activity_probe = self._activity_probe, probe
+        if previous is None or previous[0] == probe[0]:
+            return False
+        return signature_diff(probe[1], previous[1]) > self.change_detector.threshold
+
+    @property
+    def capturing(self) -> bool:
+        return self._active_sid is not None
+
+    def offer_frame(self, frame: rtc.VideoFrame) -> None:
+        """Take a frame from the stream, subject to `max_fps`."""
+        self.frames_delivered += 1
+        if self.max_fps <= 0:
+            self._accept_frame(frame)
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if now >= self._next_frame_at:
+            self._drop_held_frame()
+            self._accept_frame(frame)
+            return
+        # Over the rate: hold only a reference (no conversion); a newer frame replaces it
+        if self._held_frame is not None:
+            self.frames_skipped += 1
+        self._held_frame = frame
+        if self._held_timer is None:
+            self._held_timer = loop.call_at(
+                self._next_frame_at, self._release_held_frame
+            )
+
+    def _accept_frame(self, frame: rtc.VideoFrame) -> None:
+        if self.max_fps > 0:
+            self._next_frame_at = asyncio.get_running_loop().time() + 1 / self.max_fps
+        self.frames_processed += 1
+        log_sampled(
+            "screen frames captured",
+            "captured screen frame: %dx%d",
+            frame.width,
+            frame.height,
+        )
+        self.push_frame(frame)
+
+    def _release_held_frame(self) -> None:
+        self._held_timer = None
+        frame, self._held_frame = self._held_frame, None
+        if frame is not None and not self._closed:
+            self._accept_frame(frame)
+
+    def _drop_held_frame(self) -> None:
+        if self._held_timer is not None:
+            self._held_timer.cancel()
+            self._held_timer = None
+        if self._held_frame is not None:
+            self._held_frame = None
+            self.frames_skipped += 1
+
+    def push_frame(self, frame: rtc.VideoFrame) -> None:
+        """Hand a received frame to the encoder (also used by load tests to simulate a track)."""
+        self.encoder.push(frame)
+        if self._capture_mode == "eager":
+            # Encoded on the shared executor; bursts collapse to the newest frame
+            self.encoder.encode_in_background()
+
+    def stats(self) -> dict:
+        return {
+            **self.encoder.stats(),
+            **self.change_detector.stats(),
+            "frames_delivered": self.frames_delivered,
+            "frames_skipped": self.frames_skipped,
+            "frames_processed": self.frames_processed,
+            "track_switches": self.track_switches,
+        }
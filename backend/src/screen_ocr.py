@@ -0,0 +1,158 @@
+import hashlib
+import io
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+from screen_capture import EncodedFrame, EncodeExecutor, get_encode_executor
+
+logger = logging.getLogger("agent")
+
+SCREEN_TEXT_HEADER = "Text on the user's shared screen (OCR, layout not preserved):"
+
+
+@dataclass
+class OcrResult:
+    text: str
+    # Mean word confidence, 0..1
+    confidence: float
+    words: int
+
+
+def tesseract_ocr(jpeg: bytes) -> OcrResult:
+    """Run Tesseract on a JPEG; lines are rebuilt from its word boxes."""
+    # Optional dependency: pip install ".[ocr]" plus the tesseract binary
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(io.BytesIO(jpeg)) as image:
+        data = pytesseract.image_to_data(
+            image.convert("L"), output_type=pytesseract.Output.DICT
+        )
+    lines: dict[tuple[int, int, int], list[str]] = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        conf = float(data["conf"][i])
+        if not word or conf < 0:
+            continue
+        lines.setdefault(
+            (data["block_num"][i], data["par_num"][i], data["line_num"][i]), []
+        ).append(word)
+        confidences.append(conf / 100)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return OcrResult(
+        text=text,
+        confidence=sum(confidences) / len(confidences) if confidences else 0.0,
+        words=len(confidences),
+    )
+
+
+def ocr_available() -> bool:
+    try:
+        import pytesseract
+
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return True
+
+
+class ScreenTextReader:
+    """OCR of encoded screen frames, as a cheaper text alternative to attaching the image.
+
+    OCR runs on the shared encode executor, never on the event loop. Results are cached
+    by a hash of the frame's JPEG, so a frame that comes back unchanged is never read
+    twice. `usable` tells whether a result is good enough to stand in for the image.
+    """
+
+    def __init__(
+        self,
+        engine: Callable[[bytes], OcrResult] = tesseract_ocr,
+        *,
+        executor: EncodeExecutor | None = None,
+        min_confidence: float = 0.6,
+        min_words: int = 3,
+        max_chars: int = 4000,
+        cache_size: int = 16,
+    ) -> None:
+        self._engine = engine
+        self._executor = executor or get_encode_executor()
+        self.min_confidence = min_confidence
+        self.min_words = min_words
+        self.max_chars = max_chars
+        self._cache_size = cache_size
+        self._cache: OrderedDict[bytes, OcrResult] = OrderedDict()
+        self.runs = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.low_confidence = 0
+        self._ocr_time_total = 0.0
+
+    @classmethod
+    def from_env(cls) -> "ScreenTextReader | None":
+        """A reader when SCREEN_CONTEXT_MODE=ocr and Tesseract is installed, else None (images only)."""
+        if os.getenv("SCREEN_CONTEXT_MODE", "image") != "ocr":
+            return None
+        if not ocr_available():
+            logger.warning(
+                "SCREEN_CONTEXT_MODE=ocr but pytesseract/tesseract is not installed; attaching images"
+            )
+            return None
+        return cls(
+            min_confidence=float(os.getenv("SCREEN_OCR_MIN_CONFIDENCE", "0.6")),
+            max_chars=int(os.getenv("SCREEN_OCR_MAX_CHARS", "4000")),
+        )
+
+    async def read(self, encoded: EncodedFrame) -> OcrResult | None:
+        key = hashlib.blake2b(encoded.jpeg, digest_size=16).digest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+        start = time.perf_counter()
+        try:
+            result = await self._executor.run_latest(
+                (self, "ocr"), self._engine, encoded.jpeg
+            )
+        except Exception:
+            self.failures += 1
+            logger.exception("screen OCR failed")
+            return None
+        self.runs += 1
+        self._ocr_time_total += time.perf_counter() - start
+        if len(result.text) > self.max_chars:
+            result = OcrResult(
+                text=result.text[: self.max_chars],
+                confidence=result.confidence,
+                words=result.words,
+            )
+        self._cache[key] = result
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def usable(self, result: OcrResult | None) -> bool:
+        ok = (
+            result is not None
+            and result.words >= self.min_words
+            and result.confidence >= self.min_confidence
+        )
+        if result is not None and not ok:
+            self.low_confidence += 1
+        return ok
+
+    def stats(self) -> dict:
+        return {
+            "ocr_runs": self.runs,
+            "ocr_cache_hits": self.cache_hits,
+            "ocr_failures": self.failures,
+            "ocr_low_confidence": self.low_confidence,
+            "ocr_ms_avg": round(1000 * self._ocr_time_total / self.runs, 2)
+            if self.runs
+            else 0.0,
+        }
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from perf_metrics import IDLE_RECLAIMED_SECONDS, IDLE_SESSIONS_REAPED
+
+logger = logging.getLogger("agent")
+
+# Agent states during which the session is busy even if the user is silent
+_BUSY_AGENT_STATES = ("thinking", "speaking")
+
+
+class IdleReaper:
+    """Ends a session early once the user has gone quiet, freeing the worker for others.
+
+    Activity is user speech (VAD-driven user state changes and transcripts) and changes
+    on the shared screen, polled every `screen_poll` seconds while idle. The idle clock
+    is paused while the user speaks or the agent thinks or speaks. After `prompt_after`
+    idle seconds the user is asked whether they are still there; `shutdown_after` more
+    idle seconds without an answer and the session is shut down. The hard conversation
+    timeout stays in place as the upper bound, and the time left until it when the
+    reaper fires is counted as reclaimed worker-seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        hard_timeout: float,
+        on_prompt: Callable[[], Awaitable[Any]],
+        on_shutdown: Callable[[str], Awaitable[Any]],
+        screen_probe: Callable[[], Awaitable[bool]] | None = None,
+        prompt_after: float = 60.0,
+        shutdown_after: float = 30.0,
+        screen_poll: float = 5.0,
+        mode: str = "unknown",
+    ) -> None:
+        self.hard_timeout = hard_timeout
+        self.prompt_after = prompt_after
+        self.shutdown_after = shutdown_after
+        self.screen_poll = screen_poll
+        self.mode = mode
+        self._on_prompt = on_prompt
+        self._on_shutdown = on_shutdown
+        self._screen_probe = screen_probe
+        self._started_at = time.monotonic()
+        self._last_activity = self._started_at
+        self._user_busy = False
+        self._agent_busy = False
+        self._prompted = False
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.activity: dict[str, int] = {}
+        self.prompts = 0
+        self.resumed = 0
+        self.reaped = False
+        self.reclaimed_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "IdleReaper | None":
+        """A reaper unless IDLE_PROMPT_SECONDS is 0 (only the hard timeout then)."""
+        prompt_after = float(os.getenv("IDLE_PROMPT_SECONDS", "60"))
+        if prompt_after <= 0:
+            return None
+        return cls(
+            prompt_after=prompt_after,
+            shutdown_after=float(os.getenv("IDLE_SHUTDOWN_SECONDS", "30")),
+            screen_poll=float(os.getenv("IDLE_SCREEN_POLL_SECONDS", "5")),
+            **kwargs,
+        )
+
+    def watch_session(self, session: Any) -> None:
+        session.on("user_state_changed", self._on_user_state_changed)
+        session.on("agent_state_changed", self._on_agent_state_changed)
+        session.on("user_input_transcribed", self._on_user_input_transcribed)
+
+    def start(self) -> None:
+        self._started_at = self._last_activity = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        task, self._task = self._task, None
+        # The reaper's own shutdown runs the callbacks too; never cancel the task from inside it
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def record_activity(self, source: str) -> None:
+        """User activity: restarts the idle clock and withdraws a pending prompt."""
+        self.activity[source] = self.activity.get(source, 0) + 1
+        self._last_activity = time.monotonic()
+        if self._prompted:
+            self._prompted = False
+            self.resumed += 1
+            logger.info("user active again after idle prompt (%s)", source)
+        self._changed.set()
+
+    def _on_user_state_changed(self, ev: Any) -> None:
+        self._user_busy = ev.new_state == "speaking"
+        if self._user_busy:
+            self.record_activity("speech")
+
+    def _on_agent_state_changed(self, ev: Any) -> None:
+        busy = ev.new_state in _BUSY_AGENT_STATES
+        if self._agent_busy and not busy:
+            # Silence is counted from the end of the agent's turn, without counting as user activity
+            self._last_activity = time.monotonic()
+        self._agent_busy = busy
+        self._changed.set()
+
+    def _on_user_input_transcribed(self, ev: Any) -> None:
+        self.record_activity("transcript")
+
+    async def _wait(self, timeout: float | None) -> bool:
+        """Wait for a state change; False on timeout."""
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _run(self) -> None:
+        next_poll = time.monotonic() + self.screen_poll
+        while True:
+            if self._user_busy or self._agent_busy:
+                await self._wait(None)
+                continue
+            now = time.monotonic()
+            deadline = self._last_activity + (
+                self.shutdown_after if self._prompted else self.prompt_after
+            )
+            wake_at = min(deadline, next_poll) if self._screen_probe else deadline
+            if now < wake_at:
+                if await self._wait(wake_at - now):
+                    continue
+                now = time.monotonic()
+            if self._screen_probe and now >= next_poll:
+                next_poll = now + self.screen_poll
+                try:
+                    if await self._screen_probe():
+                        self.record_activity("screen")
+                        continue
+                except Exception:
+                    logger.debug("screen activity probe failed", exc_info=True)
+            if now < deadline:
+                continue
+            if not self._prompted:
+                self._prompted = True
+                self.prompts += 1
+                logger.info(
+                    "session idle for %.0fs; prompting the user",
+                    now - self._last_activity,
+                )
+                try:
+                    await self._on_prompt()
+                except Exception:
+                    logger.exception("failed to deliver idle prompt")
+                if self._prompted:
+                    self._last_activity = time.monotonic()
+                continue
+            await self._reap(now)
+            return
+
+    async def _reap(self, now: float) -> None:
+        self.reaped = True
+        self.reclaimed_seconds = max(0.0, self._started_at + self.hard_timeout - now)
+        IDLE_SESSIONS_REAPED.labels(self.mode).inc()
+        IDLE_RECLAIMED_SECONDS.labels(self.mode).inc(self.reclaimed_seconds)
+        logger.info(
+            "idle session reaped; reclaimed %.0f worker-seconds before the hard timeout",
+            self.reclaimed_seconds,
+        )
+        await self._on_shutdown(
+            f"idle ({int(self.prompt_after + self.shutdown_after)}s)"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "activity": dict(self.activity),
+            "idle_prompts": self.prompts,
+            "resumed_after_prompt": self.resumed,
+            "reaped": self.reaped,
+            "reclaimed_worker_seconds": round(self.reclaimed_seconds, 1),
+        }
@@ -0,0 +1,237 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+import wave
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from livekit import rtc
+from livekit.agents import AgentSession, tts
+from livekit.agents.voice import SpeechHandle
+
+logger = logging.getLogger("agent")
+
+# Pre-rendered audio is played back in 100ms frames so interruptions stay responsive
+PLAYBACK_FRAME_MS = 100
+
+
+@dataclass
+class PhraseAudio:
+    sample_rate: int
+    num_channels: int
+    pcm: bytes  # 16-bit signed little-endian PCM
+
+    def frames(self) -> list[rtc.AudioFrame]:
+        samples_per_frame = self.sample_rate * PLAYBACK_FRAME_MS // 1000
+        bytes_per_frame = samples_per_frame * self.num_channels * 2
+        return [
+            rtc.AudioFrame(
+                data=self.pcm[i : i + bytes_per_frame],
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(self.pcm[i : i + bytes_per_frame])
+                // (self.num_channels * 2),
+            )
+            for i in range(0, len(self.pcm), bytes_per_frame)
+        ]
+
+
+class PhraseAudioCache:
+    """Cache of synthesized audio for fixed phrases (greetings, the timeout message).
+
+    Entries are keyed by (text, voice, model). An in-memory LRU of `max_entries` sits in
+    front of an optional on-disk WAV cache (at most `max_disk_entries` files, oldest
+    evicted first), so a fresh job process can play its greeting without a TTS round trip.
+    Misses are synthesized once and stored in both tiers. Inside a session only memory is
+    looked up; WAV reads, writes and eviction run in a thread (`preload` reads directly, for
+    prewarm). Callers pass the voice the engine was built with; TTS engines don't expose it
+    publicly.
+    """
+
+    def __init__(
+        self, cache_dir: str | None, max_entries: int = 16, max_disk_entries: int = 64
+    ) -> None:
+        self._cache_dir = cache_dir
+        self._max_entries = max_entries
+        self._max_disk_entries = max_disk_entries
+        self._entries: OrderedDict[str, PhraseAudio] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "PhraseAudioCache":
+        cache_dir = os.getenv(
+            "TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "agent-tts-cache")
+        )
+        return cls(
+            cache_dir=cache_dir or None,
+            max_entries=int(os.getenv("TTS_CACHE_MAX_ENTRIES", "16")),
+            max_disk_entries=int(os.getenv("TTS_CACHE_MAX_DISK_ENTRIES", "64")),
+        )
+
+    @staticmethod
+    def key(text: str, voice: str, model: str) -> str:
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str | None:
+        return os.path.join(self._cache_dir, f"{key}.wav") if self._cache_dir else None
+
+    def _remember(self, key: str, audio: PhraseAudio) -> None:
+        self._entries[key] = audio
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> PhraseAudio | None:
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with wave.open(path, "rb") as wav:
+                audio = PhraseAudio(
+                    sample_rate=wav.getframerate(),
+                    num_channels=wav.getnchannels(),
+                    pcm=wav.readframes(wav.getnframes()),
+                )
+            os.utime(path)
+            return audio
+        except Exception:
+            logger.warning("failed to read cached phrase audio %s", path, exc_info=True)
+            return None
+
+    def _store(self, key: str, audio: PhraseAudio) -> None:
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with wave.open(tmp_path, "wb") as wav:
+                wav.setnchannels(audio.num_channels)
+                wav.setsampwidth(2)
+                wav.setframerate(audio.sample_rate)
+                wav.writeframes(audio.pcm)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except Exception:
+            logger.warning(
+                "failed to write cached phrase audio %s", path, exc_info=True
+            )
+
+    def _evict_disk(self) -> None:
+        files = [
+            os.path.join(self._cache_dir, name)
+            for name in os.listdir(self._cache_dir)
+            if name.endswith(".wav")
+        ]
+        if len(files) <= self._max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[: len(files) - self._max_disk_entries]:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+    def preload(self, text: str, voice: str, model: str) -> bool:
+        """Load a phrase from disk into memory (no synthesis); safe to call from prewarm."""
+        key = self.key(text, voice, model)
+        audio = self._entries.get(key) or self._load(key)
+        if audio is not None:
+            self._remember(key, audio)
+        return audio is not None
+
+    def lookup(
+        self, tts_engine: tts.TTS, text: str, *, voice: str
+    ) -> PhraseAudio | None:
+        """The phrase's audio if it is in memory; never touches the disk."""
+        key = self.key(text, voice, tts_engine.model)
+        audio = self._entries.get(key)
+        if audio is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, audio)
+        return audio
+
+    async def fill(self, tts_engine: tts.TTS, text: str, *, voice: str) -> PhraseAudio:
+        """Synthesize a phrase and store it; concurrent fills of the same phrase share one request."""
+        key = self.key(text, voice, tts_engine.model)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._synthesize(key, tts_engine, text))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def prefetch(self, tts_engine: tts.TTS, text: str, *, voice: str) -> None:
+        """Load a phrase from disk, or synthesize it, in the background if it isn't in memory yet."""
+        key = self.key(text, voice, tts_engine.model)
+        if key in self._entries or key in self._inflight:
+            return
+        task = asyncio.create_task(self._prefetch(key, tts_engine, text, voice))
+        task.add_done_callback(_log_fill_error)
+
+    async def _prefetch(
+        self, key: str, tts_engine: tts.TTS, text: str, voice: str
+    ) -> None:
+        audio = await asyncio.to_thread(self._load, key)
+        if audio is not None:
+            self._remember(key, audio)
+        elif key not in self._entries:
+            await self.fill(tts_engine, text, voice=voice)
+
+    async def _synthesize(
+        self, key: str, tts_engine: tts.TTS, text: str
+    ) -> PhraseAudio:
+        async with tts_engine.synthesize(text) as stream:
+            frame = await stream.collect()
+        audio = PhraseAudio(
+            sample_rate=frame.sample_rate,
+            num_channels=frame.num_channels,
+            pcm=bytes(frame.data),
+        )
+        self._remember(key, audio)
+        await asyncio.to_thread(self._store, key, audio)
+        return audio
+
+    def say(
+        self,
+        session: AgentSession,
+        tts_engine: tts.TTS,
+        text: str,
+        *,
+        voice: str,
+        **kwargs,
+    ) -> SpeechHandle:
+        """`session.say` with pre-rendered audio when cached.
+
+        On a miss the phrase is spoken with live TTS (which streams, so it starts sooner than
+        a full synthesis would) and the cache is filled in the background for later sessions.
+        That is a deliberate tradeoff: a first-time phrase is synthesized twice, once live
+        and once for the cache, rather than making the user wait for a full synthesis.
+        It is paid once per phrase per cache directory, since the disk tier outlives the
+        process; `prefetch` at session start avoids it for phrases spoken later on.
+        """
+        audio = self.lookup(tts_engine, text, voice=voice)
+        if audio is None:
+            self.prefetch(tts_engine, text, voice=voice)
+            return session.say(text, **kwargs)
+        return session.say(text, audio=_play(audio.frames()), **kwargs)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def _log_fill_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("failed to pre-render phrase audio", exc_info=task.exception())
+
+
+async def _play(frames: list[rtc.AudioFrame]) -> AsyncIterator[rtc.AudioFrame]:
+    for frame in frames:
+        yield frame
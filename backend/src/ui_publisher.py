@@ -0,0 +1,134 @@
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from livekit import rtc
+
+from perf_metrics import UI_PUBLISH_LATENCY
+
+logger = logging.getLogger("agent")
+
+
+@dataclass
+class _Update:
+    topic: str
+    payload: dict[str, Any]
+    coalesce_key: str | None
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class UiPublisher:
+    """Session-scoped, ordered data-channel publisher for UI updates.
+
+    `publish` only queues, so tools return without waiting on the network. One task sends
+    updates in the order they were queued, with retries, so lesson-status transitions
+    arrive in order. Updates with a `coalesce_key` (e.g. the suggested prompt) replace a
+    queued, not yet sent update with the same key: a burst sends only the latest value.
+    """
+
+    def __init__(
+        self, room: rtc.Room, *, retries: int = 3, retry_delay: float = 0.2
+    ) -> None:
+        self._room = room
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue: list[_Update] = []
+        self._wakeup = asyncio.Event()
+        self._sending: _Update | None = None
+        self._task: asyncio.Task | None = None
+        self.published = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def publish(
+        self, topic: str, payload: dict[str, Any], *, coalesce_key: str | None = None
+    ) -> None:
+        if coalesce_key is not None:
+            for update in self._queue:
+                if update.coalesce_key == coalesce_key:
+                    # Keeps its place in the queue and its queue time, so latency covers the wait
+                    update.payload = payload
+                    self.coalesced += 1
+                    return
+        self._queue.append(_Update(topic, payload, coalesce_key))
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                # Off the queue before sending: a newer value must not be folded into one already on the wire
+                self._sending = self._queue.pop(0)
+                await self._send(self._sending)
+                self._sending = None
+
+    async def _send(self, update: _Update) -> None:
+        data = json.dumps(update.payload).encode("utf-8")
+        for attempt in range(self.retries + 1):
+            try:
+                await self._room.local_participant.publish_data(
+                    data, reliable=True, topic=update.topic
+                )
+            except Exception:
+                if attempt == self.retries:
+                    self.failed += 1
+                    logger.exception(
+                        "failed to publish %s after %d attempts",
+                        update.topic,
+                        attempt + 1,
+                    )
+                    return
+                self.retried += 1
+                await asyncio.sleep(self.retry_delay * 2**attempt)
+                continue
+            latency = time.perf_counter() - update.queued_at
+            UI_PUBLISH_LATENCY.labels(topic=update.topic).observe(latency)
+            self.published += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+            # Payloads carry learner-facing text (the suggested prompt); log only their size
+            logger.info(
+                "published %s: %d bytes (%.1f ms)",
+                update.topic,
+                len(data),
+                1000 * latency,
+            )
+            return
+
+    async def aclose(self, timeout: float = 2.0) -> None:
+        """Flush what's queued (bounded by `timeout`), then stop."""
+        if self._task is None:
+            return
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._drained(), timeout)
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+    async def _drained(self) -> None:
+        while self._queue or self._sending is not None:
+            await asyncio.sleep(0.01)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "failed": self.failed,
+            "pending": len(self._queue) + (self._sending is not None),
+            "latency_ms_avg": round(1000 * self._latency_total / self.published, 2)
+            if self.published
+            else 0.0,
+            "latency_ms_max": round(1000 * self._latency_max, 2),
+        }
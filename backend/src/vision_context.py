@@ -0,0 +1,113 @@
+import logging
+
+from livekit.agents.llm import ChatContext, ImageContent
+
+logger = logging.getLogger("agent")
+
+# Also marks where a screenshot was taken once it moves to the end of the request, so a
+# message reads the same before and after its screenshot is pruned
+SCREENSHOT_PLACEHOLDER = "[screenshot]"
+SCREENSHOTS_HEADER = "Screenshots of the user's shared screen, oldest first; each [screenshot] above marks where one was taken."
+
+
+def prune_screenshots(
+    chat_ctx: ChatContext, keep: int, policy: str = "placeholder"
+) -> int:
+    """Keep only the newest `keep` images in `chat_ctx` at their original detail.
+
+    Older images are replaced with a short text placeholder ("placeholder") or downgraded
+    to low inference detail ("low"). Messages are replaced with edited copies rather than
+    mutated, since chat contexts share message objects. Returns the number of images pruned.
+    """
+    pruned = 0
+    seen = 0
+    items = chat_ctx.items
+    for idx in range(len(items) - 1, -1, -1):
+        item = items[idx]
+        if item.type != "message" or not any(
+            isinstance(c, ImageContent) for c in item.content
+        ):
+            continue
+        new_content = []
+        changed = False
+        for content in reversed(item.content):
+            if isinstance(content, ImageContent):
+                seen += 1
+                if seen > keep:
+                    if policy == "low":
+                        if content.inference_detail != "low":
+                            content = content.model_copy(
+                                update={"inference_detail": "low"}
+                            )
+                            changed = True
+                            pruned += 1
+                    else:
+                        content = SCREENSHOT_PLACEHOLDER
+                        changed = True
+                        pruned += 1
+            new_content.append(content)
+        if changed:
+            new_content.reverse()
+            items[idx] = item.model_copy(update={"content": new_content})
+    return pruned
+
+
+def screenshots_last(chat_ctx: ChatContext) -> ChatContext:
+    """Request layout for provider prompt caching: history as byte-stable text, images last.
+
+    Providers cache the longest previously seen prompt prefix. Screenshots inside the
+    history would change it every turn as they are attached and later pruned, so each one
+    is replaced in place by SCREENSHOT_PLACEHOLDER and the remaining images are sent
+    together at the end of the latest user message; no turn the user didn't speak is
+    added, and tool calls and outputs after that message stay where they are. Returns a
+    new context; `chat_ctx` is unchanged.
+    """
+    request_ctx = chat_ctx.copy()
+    items = request_ctx.items
+    last_user = next(
+        (
+            idx
+            for idx in range(len(items) - 1, -1, -1)
+            if items[idx].type == "message" and items[idx].role == "user"
+        ),
+        None,
+    )
+    if last_user is None:
+        return request_ctx
+    images: list[ImageContent] = []
+    for idx, item in enumerate(items):
+        if item.type != "message" or not any(
+            isinstance(c, ImageContent) for c in item.content
+        ):
+            continue
+        images.extend(c for c in item.content if isinstance(c, ImageContent))
+        content = [
+            SCREENSHOT_PLACEHOLDER if isinstance(c, ImageContent) else c
+            for c in item.content
+        ]
+        items[idx] = item.model_copy(update={"content": content})
+    if images:
+        latest = items[last_user]
+        items[last_user] = latest.model_copy(
+            update={"content": [*latest.content, SCREENSHOTS_HEADER, *images]}
+        )
+    return request_ctx
+
+
+def estimate_request_bytes(chat_ctx: ChatContext) -> int:
+    """Rough size of the chat context as sent to the LLM (text plus inline image data)."""
+    total = 0
+    for item in chat_ctx.items:
+        if item.type == "message":
+            for content in item.content:
+                if isinstance(content, str):
+                    total += len(content.encode("utf-8"))
+                elif isinstance(content, ImageContent) and isinstance(
+                    content.image, str
+                ):
+                    total += len(content.image)
+        elif item.type == "function_call":
+            total += len(item.arguments.encode("utf-8"))
+        elif item.type == "function_call_output":
+            total += len(item.output.encode("utf-8"))
+    return total
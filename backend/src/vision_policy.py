@@ -0,0 +1,172 @@
+import math
+import os
+import re
+from dataclasses import dataclass
+
+from agent_logging import log_sampled
+
+# Words that point at the screen itself. Deictic words (this, that, here, where) and seeing
+# verbs are left out: nearly every spoken sentence has one, which made every turn high detail
+SCREEN_REFERENCE = re.compile(
+    r"\b(screens?|screenshots?|buttons?|menus?|icons?|click(s|ed|ing)?|windows?|tabs?"
+    r"|errors?|pages?|links?|dialogs?|pop-?ups?|dropdowns?|toolbars?|sidebars?|cursor"
+    r"|scroll(ed|ing)?|fields?|checkbox(es)?|(can|do) you see)\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_image_tokens(width: int, height: int, detail: str) -> int:
+    """OpenAI vision token cost: 85 for low detail, plus 170 per 512px tile at high detail."""
+    if detail == "low":
+        return 85
+    # High detail images are fit in 2048x2048, then scaled down so the short side is at most 768
+    scale = min(1.0, 2048 / max(width, height, 1))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / max(min(width, height), 1))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+@dataclass
+class VisionDecision:
+    attach: bool
+    detail: str
+    max_side: int
+    reason: str
+    tokens: int = 0
+    # Attach the crop of the changed region instead of the full screenshot
+    crop: bool = False
+    # Tokens saved against the full screenshot at high detail
+    saved: int = 0
+
+
+class VisionPolicy:
+    """Per-turn choice of whether to attach the screen, at what detail and resolution.
+
+    High detail at full resolution when the user refers to the screen or it changed a lot
+    (e.g. a new page), or for a crop of the changed region; low detail at `low_max_side`
+    for small changes while chatting.
+    A per-session image-token budget downgrades to low detail and, once spent, stops
+    attaching. Policy "high" keeps the old always-high behaviour but still tracks tokens.
+    """
+
+    def __init__(
+        self,
+        *,
+        policy: str = "adaptive",
+        token_budget: int = 15_000,
+        high_detail_diff: float = 0.1,
+        high_max_side: int = 1024,
+        low_max_side: int = 512,
+    ) -> None:
+        self.policy = policy
+        self.token_budget = token_budget
+        self.high_detail_diff = high_detail_diff
+        self.high_max_side = high_max_side
+        self.low_max_side = low_max_side
+        self.tokens_used = 0
+        self.tokens_saved = 0
+        self.decisions: dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "VisionPolicy":
+        return cls(
+            policy=os.getenv("VISION_DETAIL_POLICY", "adaptive"),
+            token_budget=int(os.getenv("VISION_IMAGE_TOKEN_BUDGET", "15000")),
+            high_detail_diff=float(os.getenv("VISION_HIGH_DETAIL_DIFF", "0.1")),
+        )
+
+    def decide(
+        self,
+        *,
+        diff: float | None,
+        transcript: str,
+        width: int,
+        height: int,
+        region: tuple[int, int] | None = None,
+        thumbnail: bool = False,
+    ) -> VisionDecision:
+        """`diff` is the changed fraction since the last attached screenshot (None for the first).
+
+        `width` x `height` is the full screenshot. `region` is the size of a crop of the changed
+        area that can go instead, at high detail and native size, plus a low-detail full screen
+        `thumbnail` if requested. When the user refers to the screen they may mean anything on
+        it, so that turn still gets the full screenshot.
+        """
+        # Savings are measured against the old behaviour: the full screenshot at high detail
+        high_cost = full_cost = estimate_image_tokens(width, height, "high")
+        low_cost = estimate_image_tokens(width, height, "low")
+        remaining = self.token_budget - self.tokens_used
+        refers_to_screen = bool(SCREEN_REFERENCE.search(transcript))
+
+        if self.policy == "high":
+            detail, reason = "high", "policy"
+        elif refers_to_screen:
+            detail, reason = "high", "screen referenced"
+        elif region is not None:
+            detail, reason = "high", "changed region"
+            high_cost = estimate_image_tokens(*region, "high") + (
+                low_cost if thumbnail else 0
+            )
+        elif diff is None or diff >= self.high_detail_diff:
+            detail, reason = (
+                "high",
+                "first screenshot" if diff is None else "large change",
+            )
+        else:
+            detail, reason = "low", "small change"
+
+        if detail == "high" and remaining < high_cost:
+            detail, reason = "low", f"{reason}, over budget"
+        if remaining < low_cost:
+            decision = VisionDecision(
+                attach=False, detail="low", max_side=0, reason="image budget spent"
+            )
+        elif detail == "high":
+            crop = reason == "changed region"
+            max_side = max(region) if crop else self.high_max_side
+            decision = VisionDecision(
+                True, "high", max_side, reason, high_cost, crop=crop
+            )
+        else:
+            decision = VisionDecision(True, "low", self.low_max_side, reason, low_cost)
+
+        decision.saved = full_cost - decision.tokens
+        self.tokens_used += decision.tokens
+        self.tokens_saved += decision.saved
+        key = self._key(decision)
+        self.decisions[key] = self.decisions.get(key, 0) + 1
+        log_sampled(
+            "vision decision",
+            "vision decision: attach=%s detail=%s crop=%s max_side=%d reason=%s diff=%s screen_ref=%s tokens=%d saved=%d budget_left=%d",
+            decision.attach,
+            decision.detail,
+            decision.crop,
+            decision.max_side,
+            decision.reason,
+            None if diff is None else round(diff, 4),
+            refers_to_screen,
+            decision.tokens,
+            decision.saved,
+            self.token_budget - self.tokens_used,
+            value=decision.tokens,
+            unit="tokens",
+        )
+        return decision
+
+    def refund(self, decision: VisionDecision) -> None:
+        """Take back a decision that couldn't be carried out, e.g. a crop of a frame that is gone."""
+        self.tokens_used -= decision.tokens
+        self.tokens_saved -= decision.saved
+        self.decisions[self._key(decision)] -= 1
+
+    @staticmethod
+    def _key(decision: VisionDecision) -> str:
+        return decision.detail if decision.attach else "skipped"
+
+    def stats(self) -> dict:
+        return {
+            "image_tokens_used": self.tokens_used,
+            "image_tokens_saved": self.tokens_saved,
+            **self.decisions,
+        }
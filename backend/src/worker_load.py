@@ -0,0 +1,273 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from livekit.agents import JobRequest
+from livekit.agents.utils.hw import get_cpu_monitor
+
+logger = logging.getLogger("agent")
+
+
+def mode_for_room(room_name: str) -> str:
+    return "copilot" if room_name.startswith("copilot_") else "lesson"
+
+
+@dataclass
+class JobCostModel:
+    """Estimated share of a worker one job uses, built from what the job is doing right now."""
+
+    # A voice-only lesson vs a copilot session that expects a screen share
+    base: dict[str, float] = field(
+        default_factory=lambda: {"lesson": 0.06, "copilot": 0.09}
+    )
+    capture_active: float = 0.04
+    per_encode_per_second: float = 0.03
+    per_llm_stream: float = 0.02
+    # Event-loop lag above the budget means the job is already struggling; charge for it
+    lag_budget_ms: float = 20.0
+    per_lag_ms: float = 0.004
+    max_lag_penalty: float = 0.3
+
+    def base_cost(self, mode: str) -> float:
+        return self.base.get(mode, max(self.base.values()))
+
+    def cost(self, report: dict) -> float:
+        lag_over = max(0.0, report.get("loop_lag_ms", 0.0) - self.lag_budget_ms)
+        return (
+            self.base_cost(report.get("mode", ""))
+            + (self.capture_active if report.get("capture_active") else 0.0)
+            + self.per_encode_per_second * report.get("encodes_per_second", 0.0)
+            + self.per_llm_stream * report.get("llm_streams", 0)
+            + min(self.max_lag_penalty, self.per_lag_ms * lag_over)
+        )
+
+
+class JobLoadReporter:
+    """Publishes one job's load signals for the worker process to read.
+
+    Jobs run in their own processes, so the report is a small JSON file named after the
+    job id in a directory shared with the worker (WORKER_LOAD_DIR), rewritten every
+    `interval` seconds and removed when the job ends.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        mode: str,
+        report_dir: str,
+        *,
+        interval: float = 1.0,
+        tick: float = 0.05,
+    ) -> None:
+        self.job_id = job_id
+        self.mode = mode
+        self._path = Path(report_dir) / f"{job_id}.json"
+        self._interval = interval
+        self._tick = tick
+        self._llm_streams = 0
+        self._encoded_count: Callable[[], int] = lambda: 0
+        self._capturing: Callable[[], bool] = lambda: False
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_env(cls, job_id: str, mode: str) -> "JobLoadReporter | None":
+        report_dir = os.getenv("WORKER_LOAD_DIR")
+        if not report_dir:
+            return None
+        return cls(job_id, mode, report_dir)
+
+    def watch_capture(
+        self, capturing: Callable[[], bool], encoded_count: Callable[[], int]
+    ) -> None:
+        self._capturing = capturing
+        self._encoded_count = encoded_count
+
+    @contextlib.contextmanager
+    def llm_stream(self):
+        self._llm_streams += 1
+        try:
+            yield
+        finally:
+            self._llm_streams -= 1
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._path.unlink(missing_ok=True)
+
+    def report(self, loop_lag_ms: float, encodes_per_second: float) -> dict:
+        return {
+            "job_id": self.job_id,
+            "mode": self.mode,
+            "capture_active": self._capturing(),
+            "encodes_per_second": round(encodes_per_second, 2),
+            "llm_streams": self._llm_streams,
+            "loop_lag_ms": round(loop_lag_ms, 1),
+            "updated_at": time.time(),
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            window_start = loop.time()
+            encoded_start = self._encoded_count()
+            max_lag = 0.0
+            while loop.time() - window_start < self._interval:
+                before = loop.time()
+                await asyncio.sleep(self._tick)
+                max_lag = max(max_lag, loop.time() - before - self._tick)
+            elapsed = loop.time() - window_start
+            report = self.report(
+                max_lag * 1000, (self._encoded_count() - encoded_start) / elapsed
+            )
+            try:
+                tmp = self._path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(report))
+                tmp.replace(self._path)
+            except OSError:
+                logger.exception("failed to write job load report")
+
+
+class WorkerLoadEstimator:
+    """Cost-aware `load_fnc` and admission control for the worker process.
+
+    The load is the summed cost of the active jobs (from their latest reports, or the
+    base cost of their mode until the first report arrives), floored by the measured CPU
+    load so work the model doesn't know about still counts. `request_fnc` turns a job
+    down when accepting it would push the load past the threshold.
+    """
+
+    def __init__(
+        self,
+        report_dir: str,
+        *,
+        threshold: float = 0.7,
+        cost_model: JobCostModel | None = None,
+        stale_after: float = 5.0,
+        on_update: Callable[[dict], None] | None = None,
+    ) -> None:
+        self.report_dir = Path(report_dir)
+        self.threshold = threshold
+        self.cost_model = cost_model or JobCostModel()
+        self._stale_after = stale_after
+        # Diagnostics hook, called with `snapshot()` after every load computation
+        self._on_update = on_update
+        self._lock = threading.Lock()
+        self._snapshot: dict = {"load": 0.0, "cpu": 0.0, "jobs": {}}
+        self._cpu = 0.0
+        self._cpu_thread: threading.Thread | None = None
+        # Set when the estimator made the report directory itself; removed by `close`
+        self._temp_dir: tempfile.TemporaryDirectory | None = None
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "WorkerLoadEstimator":
+        """Reports go to WORKER_LOAD_DIR, or to a temporary directory owned by the estimator."""
+        report_dir = os.getenv("WORKER_LOAD_DIR")
+        temp_dir = None
+        if not report_dir:
+            temp_dir = tempfile.TemporaryDirectory(prefix="agent-worker-load-")
+            report_dir = temp_dir.name
+            # Job processes inherit the environment and find the directory from here
+            os.environ["WORKER_LOAD_DIR"] = report_dir
+        estimator = cls(
+            report_dir,
+            threshold=float(os.getenv("WORKER_LOAD_THRESHOLD", "0.7")),
+            **kwargs,
+        )
+        estimator._temp_dir = temp_dir
+        return estimator
+
+    def close(self) -> None:
+        """Remove the report directory if the estimator created it; call when the worker exits."""
+        temp_dir, self._temp_dir = self._temp_dir, None
+        if temp_dir is None:
+            return
+        if os.environ.get("WORKER_LOAD_DIR") == temp_dir.name:
+            del os.environ["WORKER_LOAD_DIR"]
+        temp_dir.cleanup()
+
+    def _sample_cpu(self) -> None:
+        monitor = get_cpu_monitor()
+        while True:
+            self._cpu = monitor.cpu_percent(interval=1.0)
+
+    def _read_report(self, job_id: str) -> dict | None:
+        try:
+            report = json.loads((self.report_dir / f"{job_id}.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - report.get("updated_at", 0.0) > self._stale_after:
+            return None
+        return report
+
+    def estimate(self, jobs: list[tuple[str, str]]) -> float:
+        """Load for `(job_id, room_name)` pairs; also refreshes `snapshot()`."""
+        costs = {}
+        for job_id, room_name in jobs:
+            report = self._read_report(job_id)
+            if report is None:
+                costs[job_id] = self.cost_model.base_cost(mode_for_room(room_name))
+            else:
+                costs[job_id] = self.cost_model.cost(report)
+        load = min(1.0, max(sum(costs.values()), self._cpu))
+        with self._lock:
+            self._snapshot = {
+                "load": round(load, 3),
+                "cpu": round(self._cpu, 3),
+                "threshold": self.threshold,
+                "rejected": self.rejected,
+                "jobs": {job_id: round(cost, 3) for job_id, cost in costs.items()},
+            }
+        if self._on_update is not None:
+            self._on_update(self.snapshot())
+        return load
+
+    def load_fnc(self, worker) -> float:
+        if self._cpu_thread is None:
+            self._cpu_thread = threading.Thread(
+                target=self._sample_cpu, daemon=True, name="worker_load_cpu"
+            )
+            self._cpu_thread.start()
+        return self.estimate(
+            [(info.job.id, info.job.room.name) for info in worker.active_jobs]
+        )
+
+    def admit(self, mode: str) -> bool:
+        with self._lock:
+            load = self._snapshot["load"]
+        return load + self.cost_model.base_cost(mode) <= self.threshold
+
+    async def request_fnc(self, req: JobRequest) -> None:
+        mode = mode_for_room(req.room.name)
+        if self.admit(mode):
+            await req.accept()
+            return
+        self.rejected += 1
+        logger.warning(
+            "rejecting %s job %s: worker load %.2f is near the threshold %.2f",
+            mode,
+            req.id,
+            self.snapshot()["load"],
+            self.threshold,
+        )
+        # Not terminal: the server offers the job to another worker
+        await req.reject(terminate=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self._snapshot, "jobs": dict(self._snapshot["jobs"])}
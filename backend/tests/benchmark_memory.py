@@ -0,0 +1,202 @@
+"""Screen capture memory benchmark.
+
+Runs one simulated session per fresh interpreter, so peak RSS is the session's own, and
+reports it along with image allocation counts and the peak of Python-tracked memory. A
+session pushes 1080p I420 frames (what the screen share track delivers) through the lazy
+encoder and attaches the newest frame to each turn; every other turn the screen hasn't
+changed and the same encoded frame is attached again. Both encode paths are measured:
+
+    baseline  lk_encode (full-size RGBA and RGB copies) and a data URL built per turn
+    current   encode from views of the frame's planes and the cached data URL
+
+    uv run python tests/benchmark_memory.py --turns 40 --json memory.json
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import json
+import resource
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+MODES = ("baseline", "current")
+
+
+def _frames(count: int, width: int, height: int) -> list:
+    import numpy as np
+    from livekit import rtc
+
+    # Built from row/column vectors so no full-size temporaries inflate the process's peak
+    x, y = np.arange(width), np.arange(height)
+    frames = []
+    for i in range(count):
+        pixels = np.empty((height, width, 4), dtype=np.uint8)
+        pixels[..., 0] = ((x + 40 * i) * 255 // width % 256).astype(np.uint8)
+        pixels[..., 1] = (y * 255 // height).astype(np.uint8)[:, None]
+        pixels[..., 2] = (
+            (x // 32 % 2).astype(np.uint8)
+            ^ ((y // 32 + i) % 2).astype(np.uint8)[:, None]
+        ) * 200
+        pixels[..., 3] = 255
+        rgba = rtc.VideoFrame(width, height, rtc.VideoBufferType.RGBA, pixels.tobytes())
+        frames.append(rgba.convert(rtc.VideoBufferType.I420))
+    return frames
+
+
+async def _session(mode: str, turns: int, frames_per_turn: int, frames: list) -> dict:
+    from livekit.agents.utils.images import encode as lk_encode
+
+    import screen_capture
+    from screen_capture import EncodeExecutor, LazyFrameEncoder, fitted_size
+
+    if mode == "baseline":
+
+        def _lk_encode_frame(frame, options):
+            resize = options.resize_options
+            return lk_encode(frame, options), *fitted_size(
+                frame.width, frame.height, resize.width, resize.height
+            )
+
+        screen_capture.encode_frame_jpeg = _lk_encode_frame
+
+    encoder = LazyFrameEncoder(executor=EncodeExecutor(max_workers=1))
+    data_url_builds = 0
+    pushed = 0
+    for turn in range(turns):
+        if turn % 2 == 0:
+            for _ in range(frames_per_turn):
+                encoder.push(frames[pushed % len(frames)])
+                pushed += 1
+        encoded = await encoder.get_encoded()
+        if mode == "baseline":
+            data_url = "data:image/jpeg;base64," + base64.b64encode(
+                encoded.jpeg
+            ).decode("utf-8")
+            data_url_builds += 1
+        else:
+            data_url_builds += "data_url" not in vars(encoded)
+            data_url = encoded.data_url
+        assert data_url.startswith("data:image/jpeg;base64,")
+    return {
+        "turns": turns,
+        "frames_encoded": encoder.frames_encoded,
+        "data_url_builds": data_url_builds,
+    }
+
+
+def _reset_peak_rss() -> None:
+    # Linux: restart the VmHWM high-water mark from the current RSS
+    with contextlib.suppress(OSError):
+        Path("/proc/self/clear_refs").write_text("5")
+
+
+def _peak_rss_kb() -> int:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux, and can't be reset
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _child(
+    mode: str, turns: int, frames_per_turn: int, width: int, height: int
+) -> None:
+    from PIL import Image
+
+    import screen_capture  # noqa: F401
+
+    # Source frames and imports are in place before the mark; the session's encodes come after
+    frames = _frames(4, width, height)
+    _reset_peak_rss()
+    rss_before = _peak_rss_kb()
+    images_before = Image.core.get_stats()
+
+    tracemalloc.start()
+    result = asyncio.run(_session(mode, turns, frames_per_turn, frames))
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    images_after = Image.core.get_stats()
+    rss_peak = _peak_rss_kb()
+    image_allocs = images_after["new_count"] - images_before["new_count"]
+    print(
+        json.dumps(
+            {
+                **result,
+                "peak_rss_mb": round(rss_peak / 1024, 1),
+                "session_rss_growth_mb": round((rss_peak - rss_before) / 1024, 1),
+                "traced_peak_mb": round(traced_peak / 2**20, 1),
+                "pil_image_allocs": image_allocs,
+                "pil_image_allocs_per_encode": round(
+                    image_allocs / max(result["frames_encoded"], 1), 1
+                ),
+                "pil_blocks_allocated": images_after["allocated_blocks"]
+                - images_before["allocated_blocks"],
+            }
+        )
+    )
+
+
+def run_once(
+    mode: str, turns: int, frames_per_turn: int, width: int, height: int
+) -> dict:
+    args = [
+        sys.executable,
+        __file__,
+        "--child",
+        mode,
+        "--turns",
+        str(turns),
+        "--frames-per-turn",
+        str(frames_per_turn),
+    ]
+    args += ["--width", str(width), "--height", str(height)]
+    out = subprocess.run(args, cwd=SRC, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(
+    turns: int = 20, frames_per_turn: int = 5, width: int = 1920, height: int = 1080
+) -> dict:
+    return {
+        mode: run_once(mode, turns, frames_per_turn, width, height) for mode in MODES
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{'':>28}" + "".join(f"{mode:>12}" for mode in MODES))
+    for key in report[MODES[0]]:
+        print(f"{key:>28}" + "".join(f"{report[mode][key]:>12}" for mode in MODES))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--frames-per-turn", type=int, default=5)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.child, args.turns, args.frames_per_turn, args.width, args.height)
+        return
+    report = run_benchmark(args.turns, args.frames_per_turn, args.width, args.height)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Offline end-to-end latency benchmark for the agent pipeline.
+
+Drives `Assistant` through scripted user turns (some with a shared screen) against a
+local OpenAI-compatible stand-in, and reports per turn: STT, `on_user_turn_completed`,
+LLM time to first token and TTS time to first byte, the estimated turn latency (their
+sum), bytes sent to the LLM, prompt tokens served from the (simulated) prompt cache, and
+CPU time spent in the agent process.
+
+    uv run python tests/benchmark_pipeline.py --llm-ttft 0.3 --json bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+import numpy as np
+import openai as openai_lib
+from fake_openai import FakeLatency, FakeOpenAIServer
+from livekit import rtc
+from livekit.agents import AgentSession, llm, metrics
+from livekit.plugins import openai
+
+from agent import TTS_MODEL, TTS_VOICE, Assistant
+from screen_capture import ScreenCapture
+
+
+@dataclass
+class ScriptedTurn:
+    text: str
+    # Seed of the synthetic screen to show during this turn, None for no screen share yet
+    screen: int | None = None
+
+
+DEFAULT_SCRIPT = [
+    ScriptedTurn("Hi, I'm ready."),
+    ScriptedTurn("Okay I shared my screen.", screen=1),
+    ScriptedTurn("What do I click now?", screen=1),
+    ScriptedTurn("I opened the menu.", screen=2),
+    ScriptedTurn("Now I'm in customize ChatGPT.", screen=3),
+    ScriptedTurn("I typed that I love hamburgers.", screen=4),
+    ScriptedTurn("Saved it.", screen=5),
+    ScriptedTurn("Here's the new recipe.", screen=6),
+]
+
+
+def synthetic_screen(seed: int, width: int = 1280, height: int = 720) -> rtc.VideoFrame:
+    """A UI-like RGBA frame: light background with text-line-like dark blocks."""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 4), 245, dtype=np.uint8)
+    img[:, :240, :3] = 230  # sidebar
+    for _ in range(120):
+        y, x = int(rng.integers(0, height - 12)), int(rng.integers(0, width - 200))
+        img[y : y + 10, x : x + int(rng.integers(40, 200)), :3] = rng.integers(20, 90)
+    return rtc.VideoFrame(width, height, rtc.VideoBufferType.RGBA, img.tobytes())
+
+
+def _speech_frames(
+    seconds: float = 1.5, sample_rate: int = 24000
+) -> list[rtc.AudioFrame]:
+    samples = int(seconds * sample_rate)
+    tone = (np.sin(np.arange(samples) * 2 * np.pi * 220 / sample_rate) * 8000).astype(
+        np.int16
+    )
+    return [rtc.AudioFrame(tone.tobytes(), sample_rate, 1, samples)]
+
+
+async def drive_turn(
+    session: AgentSession, agent: Assistant, text: str
+) -> tuple[float, llm.ChatMessage, str]:
+    """Replay what the voice pipeline does at end of turn, without audio.
+
+    Runs `on_user_turn_completed` on a copy of the chat context, commits the user message
+    and waits for the reply. Returns the hook time, the (possibly edited) user message and
+    the assistant's reply text.
+    """
+    start = time.perf_counter()
+    turn_ctx = agent.chat_ctx.copy()
+    message = llm.ChatMessage(role="user", content=[text])
+    await agent.on_user_turn_completed(turn_ctx, message)
+    hook_time = time.perf_counter() - start
+    turn_ctx.items.append(message)
+    await agent.update_chat_ctx(turn_ctx)
+
+    await session.generate_reply()
+    reply = next(
+        (
+            item.text_content
+            for item in reversed(agent.chat_ctx.items)
+            if item.type == "message" and item.role == "assistant"
+        ),
+        "",
+    )
+    return hook_time, message, reply or ""
+
+
+async def _llm_bytes(stats_url: str) -> int:
+    async with httpx.AsyncClient() as client:
+        stats = (await client.get(stats_url)).json()
+    return stats.get("chat", {}).get("bytes", 0)
+
+
+async def run_benchmark(
+    script: list[ScriptedTurn] = DEFAULT_SCRIPT, latency: FakeLatency | None = None
+) -> dict:
+    with FakeOpenAIServer(latency=latency) as server:
+        stats_url = server.base_url.removesuffix("/v1") + "/_stats"
+        client = openai_lib.AsyncClient(api_key="fake", base_url=server.base_url)
+        llm_client = openai.LLM(model="gpt-4o-mini", client=client)
+        stt_client = openai.STT(
+            model="gpt-4o-transcribe", client=client, use_realtime=False
+        )
+        tts_client = openai.TTS(
+            model=TTS_MODEL, voice=TTS_VOICE, client=client, response_format="pcm"
+        )
+
+        screen_capture = ScreenCapture(rtc.Room())
+        agent = Assistant(screen_capture=screen_capture)
+        llm_ttft: dict[str, float] = {}
+        cached_tokens: dict[str, int] = {}
+
+        async with AgentSession(llm=llm_client) as session:
+
+            @session.on("metrics_collected")
+            def _on_metrics(ev) -> None:
+                if isinstance(ev.metrics, metrics.LLMMetrics):
+                    llm_ttft.setdefault("last", ev.metrics.ttft)
+                    cached_tokens.setdefault("last", ev.metrics.prompt_cached_tokens)
+
+            await session.start(agent)
+            speech = _speech_frames()
+            turns = []
+            for turn in script:
+                if turn.screen is not None:
+                    screen_capture.push_frame(synthetic_screen(turn.screen))
+                llm_ttft.clear()
+                cached_tokens.clear()
+                bytes_before = await _llm_bytes(stats_url)
+                cpu_start = time.process_time()
+
+                start = time.perf_counter()
+                await stt_client.recognize(speech)
+                stt_time = time.perf_counter() - start
+
+                hook_time, message, reply = await drive_turn(session, agent, turn.text)
+
+                start = time.perf_counter()
+                async with tts_client.synthesize(reply or "Okay.") as stream:
+                    async for _ in stream:
+                        break
+                tts_ttfb = time.perf_counter() - start
+
+                cpu_time = time.process_time() - cpu_start
+                ttft = llm_ttft.get("last", 0.0)
+                turns.append(
+                    {
+                        "text": turn.text,
+                        "screen": turn.screen,
+                        "images_attached": sum(
+                            isinstance(c, llm.ImageContent) for c in message.content
+                        ),
+                        "stt_s": round(stt_time, 4),
+                        "on_user_turn_completed_s": round(hook_time, 4),
+                        "llm_ttft_s": round(ttft, 4),
+                        "tts_ttfb_s": round(tts_ttfb, 4),
+                        "turn_latency_s": round(
+                            stt_time + hook_time + ttft + tts_ttfb, 4
+                        ),
+                        "llm_request_bytes": await _llm_bytes(stats_url) - bytes_before,
+                        "llm_cached_tokens": cached_tokens.get("last", 0),
+                        "cpu_s": round(cpu_time, 4),
+                    }
+                )
+
+        await screen_capture.aclose()
+        await client.close()
+
+    latencies = [t["turn_latency_s"] for t in turns]
+    return {
+        "latency": vars(server.latency),
+        "turns": turns,
+        "summary": {
+            "turn_latency_p50_s": round(statistics.median(latencies), 4),
+            "turn_latency_max_s": round(max(latencies), 4),
+            "llm_request_bytes_total": sum(t["llm_request_bytes"] for t in turns),
+            "llm_request_bytes_max": max(t["llm_request_bytes"] for t in turns),
+            "llm_cached_tokens_total": sum(t["llm_cached_tokens"] for t in turns),
+            "cpu_s_per_turn": round(sum(t["cpu_s"] for t in turns) / len(turns), 4),
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    columns = [
+        "stt_s",
+        "on_user_turn_completed_s",
+        "llm_ttft_s",
+        "tts_ttfb_s",
+        "turn_latency_s",
+        "llm_request_bytes",
+        "llm_cached_tokens",
+        "cpu_s",
+    ]
+    print("turn  img  " + "  ".join(f"{c:>24}" for c in columns))
+    for i, turn in enumerate(report["turns"]):
+        print(
+            f"{i:>4}  {turn['images_attached']:>3}  "
+            + "  ".join(f"{turn[c]:>24}" for c in columns)
+        )
+    print(json.dumps(report["summary"], indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--llm-ttft", type=float, default=FakeLatency.llm_ttft)
+    parser.add_argument(
+        "--llm-token-delay", type=float, default=FakeLatency.llm_token_delay
+    )
+    parser.add_argument("--stt-latency", type=float, default=FakeLatency.stt)
+    parser.add_argument("--tts-ttfb", type=float, default=FakeLatency.tts_ttfb)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    latency = FakeLatency(
+        llm_ttft=args.llm_ttft,
+        llm_token_delay=args.llm_token_delay,
+        stt=args.stt_latency,
+        tts_ttfb=args.tts_ttfb,
+    )
+    report = asyncio.run(run_benchmark(latency=latency))
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Worker cold-start benchmark.
+
+Starts fresh interpreters the way the worker starts job processes and reports, per run:
+module import time of `agent` (also what the worker's main process pays), which job-only
+plugins that import pulled in, `prewarm` time by step, and time to first job readiness
+(interpreter start to the session's models and components being built). The turn detector
+is left out of readiness: it needs a running job's inference executor.
+
+    uv run python tests/benchmark_startup.py --runs 5 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+JOB_ONLY_PLUGINS = (
+    "livekit.plugins.openai",
+    "livekit.plugins.silero",
+    "livekit.plugins.noise_cancellation",
+)
+
+
+def _child() -> None:
+    started = time.perf_counter()
+    import agent
+
+    imported = time.perf_counter()
+    plugins_on_import = [name for name in JOB_ONLY_PLUGINS if name in sys.modules]
+
+    from types import SimpleNamespace
+
+    proc = SimpleNamespace(userdata={})
+    agent.prewarm(proc)
+    prewarmed = time.perf_counter()
+
+    # What the entrypoint builds before the session can start
+    from livekit.agents import AgentSession
+    from livekit.plugins import openai
+
+    session = AgentSession(
+        llm=openai.LLM(model="gpt-4o-mini"),
+        stt=openai.STT(model="gpt-4o-transcribe"),
+        tts=openai.TTS(model=agent.TTS_MODEL, voice=agent.TTS_VOICE),
+        vad=proc.userdata["vad"],
+    )
+    agent.Assistant()
+    ready = time.perf_counter()
+    del session
+
+    print(
+        json.dumps(
+            {
+                "import_s": round(imported - started, 3),
+                "prewarm_s": round(prewarmed - imported, 3),
+                "job_setup_s": round(ready - prewarmed, 3),
+                "prewarm_steps": proc.userdata["startup_profile"],
+                "plugins_on_import": plugins_on_import,
+            }
+        )
+    )
+
+
+def run_once() -> dict:
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "fake"),
+        "LOG_QUEUE": "0",
+    }
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, __file__, "--child"],
+        env=env,
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - started
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    # Interpreter start included; the in-process phases don't see it
+    result["first_job_ready_s"] = round(wall, 3)
+    return result
+
+
+def run_benchmark(runs: int = 3) -> dict:
+    results = [run_once() for _ in range(runs)]
+    summary = {
+        key: round(statistics.median(r[key] for r in results), 3)
+        for key in ("import_s", "prewarm_s", "job_setup_s", "first_job_ready_s")
+    }
+    return {
+        "runs": results,
+        "median": summary,
+        "plugins_on_import": results[0]["plugins_on_import"],
+    }
+
+
+def print_report(report: dict) -> None:
+    for key, value in report["median"].items():
+        print(f"{key:>20}: {value:.3f}s")
+    print(f"{'prewarm steps':>20}: {report['runs'][0]['prewarm_steps']}")
+    print(f"{'plugins on import':>20}: {report['plugins_on_import'] or 'none'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child()
+        return
+    report = run_benchmark(args.runs)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
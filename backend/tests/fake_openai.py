@@ -0,0 +1,219 @@
+"""Local OpenAI-compatible stand-in for offline benchmarks.
+
+Serves chat completions (streamed, optionally as one tool call with streamed arguments),
+audio transcriptions and speech with configurable artificial latency, and counts the request bytes each endpoint receives. Chat usage
+reports cached prompt tokens the way OpenAI's prefix cache would (longest prefix shared
+with an earlier request, from 1024 tokens in 128-token steps, ~4 bytes per token). It
+runs in a separate process so its CPU time doesn't pollute the agent's measurements.
+"""
+
+import asyncio
+import json
+import multiprocessing as mp
+import time
+from dataclasses import asdict, dataclass
+
+from aiohttp import web
+
+
+@dataclass
+class FakeLatency:
+    llm_ttft: float = 0.2
+    llm_token_delay: float = 0.01
+    stt: float = 0.15
+    tts_ttfb: float = 0.1
+
+
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+
+def _shared_prefix(a: str, b: str) -> int:
+    return next(
+        (i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b))
+    )
+
+
+def _cached_tokens(prompt: str, seen: list[str]) -> int:
+    shared = max((_shared_prefix(prompt, previous) for previous in seen), default=0)
+    tokens = shared // 4
+    if tokens < CACHE_MIN_TOKENS:
+        return 0
+    return tokens - (tokens - CACHE_MIN_TOKENS) % CACHE_STEP_TOKENS
+
+
+def _build_app(
+    latency: FakeLatency, reply: str, transcript: str, tool_call: list | None
+) -> web.Application:
+    stats: dict[str, dict[str, int]] = {}
+    prompts: list[str] = []
+
+    def _record(name: str, size: int) -> None:
+        entry = stats.setdefault(name, {"requests": 0, "bytes": 0})
+        entry["requests"] += 1
+        entry["bytes"] += size
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+        _record("chat", len(body))
+        req = json.loads(body)
+        prompt = json.dumps([req.get("tools"), req.get("messages")])
+        cached_tokens = _cached_tokens(prompt, prompts)
+        prompts.append(prompt)
+        del prompts[:-32]
+        await asyncio.sleep(latency.llm_ttft)
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+
+        def _chunk(
+            delta: dict | None,
+            usage: dict | None = None,
+            finish_reason: str | None = None,
+        ) -> bytes:
+            data = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": req.get("model", "fake"),
+                "choices": []
+                if delta is None
+                else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage is not None:
+                data["usage"] = usage
+            return f"data: {json.dumps(data)}\n\n".encode()
+
+        tool_names = {tool["function"]["name"] for tool in req.get("tools") or []}
+        last_role = (req.get("messages") or [{}])[-1].get("role")
+        if tool_call and tool_call[0] in tool_names and last_role == "user":
+            # The arguments arrive a few characters at a time, like a real model's
+            name, arguments = tool_call
+            call = {
+                "index": 0,
+                "id": "call_fake",
+                "type": "function",
+                "function": {"name": name, "arguments": ""},
+            }
+            await resp.write(_chunk({"role": "assistant", "tool_calls": [call]}))
+            for i in range(0, len(arguments), 8):
+                piece = {"index": 0, "function": {"arguments": arguments[i : i + 8]}}
+                await resp.write(_chunk({"tool_calls": [piece]}))
+                await asyncio.sleep(latency.llm_token_delay)
+            await resp.write(_chunk({}, finish_reason="tool_calls"))
+            words = []
+        else:
+            words = reply.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            if i == 0:
+                delta["role"] = "assistant"
+            await resp.write(_chunk(delta))
+            await asyncio.sleep(latency.llm_token_delay)
+        # Rough token estimate so usage metrics are populated
+        usage = {
+            "prompt_tokens": len(body) // 4,
+            "completion_tokens": len(words),
+            "total_tokens": len(body) // 4 + len(words),
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        await resp.write(_chunk(None, usage))
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    async def transcriptions(request: web.Request) -> web.Response:
+        body = await request.read()
+        _record("stt", len(body))
+        await asyncio.sleep(latency.stt)
+        return web.json_response({"text": transcript})
+
+    async def speech(request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+        _record("tts", len(body))
+        await asyncio.sleep(latency.tts_ttfb)
+        resp = web.StreamResponse(headers={"Content-Type": "audio/pcm"})
+        await resp.prepare(request)
+        # 500ms of 24kHz mono silence in 50ms chunks
+        for _ in range(10):
+            await resp.write(bytes(2400))
+        await resp.write_eof()
+        return resp
+
+    async def models(request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": []})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/audio/transcriptions", transcriptions)
+    app.router.add_post("/v1/audio/speech", speech)
+    app.router.add_get("/v1/models", models)
+    app.router.add_get("/_stats", get_stats)
+    return app
+
+
+def _serve(
+    conn, latency: dict, reply: str, transcript: str, tool_call: list | None
+) -> None:
+    async def _main() -> None:
+        runner = web.AppRunner(
+            _build_app(FakeLatency(**latency), reply, transcript, tool_call)
+        )
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        conn.send(site._server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(_main())
+
+
+class FakeOpenAIServer:
+    def __init__(
+        self,
+        latency: FakeLatency | None = None,
+        reply: str = "Ok I see it. Click the profile icon in the bottom left corner.",
+        transcript: str = "Okay, what should I do next?",
+        tool_call: tuple[str, str] | None = None,
+    ) -> None:
+        self.latency = latency or FakeLatency()
+        # (name, JSON arguments): answer user turns offering that tool with this call instead
+        self._tool_call = list(tool_call) if tool_call else None
+        self._reply = reply
+        self._transcript = transcript
+        self._proc: mp.Process | None = None
+        self.base_url = ""
+
+    def start(self) -> None:
+        ctx = mp.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self._proc = ctx.Process(
+            target=_serve,
+            args=(
+                child_conn,
+                asdict(self.latency),
+                self._reply,
+                self._transcript,
+                self._tool_call,
+            ),
+            daemon=True,
+        )
+        self._proc.start()
+        port = parent_conn.recv()
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.join()
+            self._proc = None
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
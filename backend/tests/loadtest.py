@@ -0,0 +1,318 @@
+"""Multi-session load test to find how many sessions one worker can hold.
+
+Starts N simulated sessions at once, each in its own process like the worker's job
+executor does, against a shared local OpenAI-compatible stand-in. Every session gets a
+synthetic screen share pushed through `ScreenCapture`, real-time 48kHz audio fed into
+Silero VAD, and a user turn every few seconds driven through `Assistant`. Per session it
+records event-loop lag, CPU, peak RSS and turn latency; per N it reports the aggregate
+and the capacity knee: the first N whose loop lag p99 exceeds the threshold or whose
+turn latency p95 exceeds 1.5x the single-session baseline.
+
+The room is faked (frames are pushed directly, no WebRTC), and the turn detector and
+noise cancellation are not simulated: the former needs a job context and the latter
+LiveKit Cloud.
+
+    uv run python tests/loadtest.py --sessions 1,2,4,8,16 --duration 30 --json load.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import resource
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+import openai as openai_lib
+from benchmark_pipeline import drive_turn, synthetic_screen
+from fake_openai import FakeLatency, FakeOpenAIServer
+from livekit import rtc
+from livekit.agents import AgentSession
+from livekit.plugins import openai, silero
+
+from agent import TTS_MODEL, TTS_VOICE, Assistant
+from screen_capture import ScreenCapture
+
+AUDIO_SAMPLE_RATE = 48000
+AUDIO_FRAME_MS = 10
+LAG_TICK = 0.01
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return float(np.percentile(values, q))
+
+
+def _audio_frames() -> tuple[rtc.AudioFrame, rtc.AudioFrame]:
+    samples = AUDIO_SAMPLE_RATE * AUDIO_FRAME_MS // 1000
+    t = np.arange(samples)
+    tone = (np.sin(t * 2 * np.pi * 220 / AUDIO_SAMPLE_RATE) * 8000).astype(np.int16)
+    silence = np.zeros(samples, dtype=np.int16)
+    return (
+        rtc.AudioFrame(tone.tobytes(), AUDIO_SAMPLE_RATE, 1, samples),
+        rtc.AudioFrame(silence.tobytes(), AUDIO_SAMPLE_RATE, 1, samples),
+    )
+
+
+def _to_i420(frame: rtc.VideoFrame) -> rtc.VideoFrame:
+    # Browsers publish screen shares as I420; convert once up front so the harness doesn't
+    # spend CPU the real job wouldn't
+    return frame.convert(rtc.VideoBufferType.I420)
+
+
+async def _simulate_session(base_url: str, opts: dict) -> dict:
+    loop = asyncio.get_running_loop()
+    lags: list[float] = []
+    turn_latencies: list[float] = []
+    stop = asyncio.Event()
+
+    async def _measure_lag() -> None:
+        while not stop.is_set():
+            start = loop.time()
+            await asyncio.sleep(LAG_TICK)
+            lags.append(max(0.0, loop.time() - start - LAG_TICK))
+
+    async def _publish_screen(screen_capture: ScreenCapture) -> None:
+        # A handful of screens, switched every turn, re-sent at the publish frame rate
+        screens = [_to_i420(synthetic_screen(opts["seed"] * 100 + i)) for i in range(4)]
+        start = loop.time()
+        while not stop.is_set():
+            turn = int((loop.time() - start) // opts["turn_interval"])
+            screen_capture.offer_frame(screens[turn % len(screens)])
+            await asyncio.sleep(1 / opts["fps"])
+
+    async def _publish_audio(vad: silero.VAD) -> None:
+        tone, silence = _audio_frames()
+        stream = vad.stream()
+
+        async def _consume() -> None:
+            async for _ in stream:
+                pass
+
+        consumer = asyncio.create_task(_consume())
+        # Alternate 1.5s of "speech" and 1.5s of silence, paced in real time
+        frames_per_phase = 1500 // AUDIO_FRAME_MS
+        n = 0
+        next_at = loop.time()
+        while not stop.is_set():
+            stream.push_frame(tone if (n // frames_per_phase) % 2 == 0 else silence)
+            n += 1
+            next_at += AUDIO_FRAME_MS / 1000
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+        await stream.aclose()
+        consumer.cancel()
+
+    client = openai_lib.AsyncClient(api_key="fake", base_url=base_url)
+    llm_client = openai.LLM(model="gpt-4o-mini", client=client)
+    tts_client = openai.TTS(
+        model=TTS_MODEL, voice=TTS_VOICE, client=client, response_format="pcm"
+    )
+    vad = silero.VAD.load()
+    screen_capture = ScreenCapture(
+        rtc.Room(), capture_mode=opts["capture_mode"], max_fps=opts["max_fps"]
+    )
+    agent = Assistant(screen_capture=screen_capture)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    async with AgentSession(llm=llm_client) as session:
+        await session.start(agent)
+        tasks = [
+            asyncio.create_task(_measure_lag()),
+            asyncio.create_task(_publish_screen(screen_capture)),
+            asyncio.create_task(_publish_audio(vad)),
+        ]
+        deadline = loop.time() + opts["duration"]
+        while loop.time() < deadline:
+            await asyncio.sleep(opts["turn_interval"])
+            start = time.perf_counter()
+            _, _, reply = await drive_turn(session, agent, "What do I click now?")
+            async with tts_client.synthesize(reply or "Okay.") as stream:
+                async for _ in stream:
+                    break
+            turn_latencies.append(time.perf_counter() - start)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+    await screen_capture.aclose()
+    await client.close()
+    return {
+        "loop_lag_ms": [round(lag * 1000, 2) for lag in lags],
+        "turn_latency_s": [round(t, 4) for t in turn_latencies],
+        "cpu_pct": round(100 * cpu_time / wall_time, 1),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "screen": screen_capture.stats(),
+    }
+
+
+def _session_main(conn, base_url: str, opts: dict) -> None:
+    try:
+        conn.send(asyncio.run(_simulate_session(base_url, opts)))
+    except Exception as e:
+        conn.send({"error": repr(e)})
+
+
+def run_level(base_url: str, sessions: int, opts: dict) -> dict:
+    ctx = mp.get_context("spawn")
+    procs = []
+    for i in range(sessions):
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(
+            target=_session_main,
+            args=(child_conn, base_url, {**opts, "seed": i + 1}),
+            daemon=True,
+        )
+        proc.start()
+        procs.append((proc, parent_conn))
+
+    results = []
+    for proc, conn in procs:
+        results.append(conn.recv())
+        proc.join()
+
+    errors = [r["error"] for r in results if "error" in r]
+    ok = [r for r in results if "error" not in r]
+    lags = [lag for r in ok for lag in r["loop_lag_ms"]]
+    turns = [t for r in ok for t in r["turn_latency_s"]]
+    return {
+        "sessions": sessions,
+        "errors": errors,
+        "loop_lag_p50_ms": round(_percentile(lags, 50), 2),
+        "loop_lag_p99_ms": round(_percentile(lags, 99), 2),
+        "loop_lag_max_ms": round(max(lags, default=0.0), 2),
+        "turn_latency_p50_s": round(_percentile(turns, 50), 4),
+        "turn_latency_p95_s": round(_percentile(turns, 95), 4),
+        "cpu_pct_per_job": round(statistics.mean(r["cpu_pct"] for r in ok), 1)
+        if ok
+        else 0.0,
+        "peak_rss_mb_per_job": max((r["peak_rss_mb"] for r in ok), default=0.0),
+        "frames_encoded_per_job": round(
+            statistics.mean(r["screen"].get("frames_encoded", 0) for r in ok), 1
+        )
+        if ok
+        else 0.0,
+    }
+
+
+def find_knee(
+    levels: list[dict], lag_threshold_ms: float, latency_factor: float = 1.5
+) -> int | None:
+    """The first session count that degrades, or None if every level stayed healthy."""
+    baseline = levels[0]["turn_latency_p95_s"]
+    for level in levels:
+        if (
+            level["errors"]
+            or level["loop_lag_p99_ms"] > lag_threshold_ms
+            or level["turn_latency_p95_s"] > latency_factor * baseline
+        ):
+            return level["sessions"]
+    return None
+
+
+def run_loadtest(
+    session_counts: list[int],
+    duration: float = 20.0,
+    fps: float = 5.0,
+    turn_interval: float = 4.0,
+    capture_mode: str = "lazy",
+    max_fps: float = 0.0,
+    lag_threshold_ms: float = 50.0,
+    latency: FakeLatency | None = None,
+) -> dict:
+    opts = {
+        "duration": duration,
+        "fps": fps,
+        "turn_interval": turn_interval,
+        "capture_mode": capture_mode,
+        "max_fps": max_fps,
+    }
+    with FakeOpenAIServer(latency=latency) as server:
+        levels = [run_level(server.base_url, n, opts) for n in session_counts]
+    return {
+        "options": {
+            **opts,
+            "lag_threshold_ms": lag_threshold_ms,
+            "cpu_count": os.cpu_count(),
+        },
+        "latency": vars(server.latency),
+        "levels": levels,
+        "knee": find_knee(levels, lag_threshold_ms),
+    }
+
+
+def print_report(report: dict) -> None:
+    columns = [
+        "loop_lag_p50_ms",
+        "loop_lag_p99_ms",
+        "loop_lag_max_ms",
+        "turn_latency_p50_s",
+        "turn_latency_p95_s",
+        "cpu_pct_per_job",
+        "peak_rss_mb_per_job",
+    ]
+    print("sessions  " + "  ".join(f"{c:>20}" for c in columns))
+    for level in report["levels"]:
+        print(
+            f"{level['sessions']:>8}  " + "  ".join(f"{level[c]:>20}" for c in columns)
+        )
+        for error in level["errors"]:
+            print(f"          error: {error}")
+    knee = report["knee"]
+    print(f"capacity knee: {knee} sessions" if knee else "capacity knee: not reached")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sessions", default="1,2,4,8", help="comma-separated session counts to try"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=20.0, help="seconds per session"
+    )
+    parser.add_argument(
+        "--fps", type=float, default=5.0, help="screen-share frames per second"
+    )
+    parser.add_argument(
+        "--turn-interval", type=float, default=4.0, help="seconds between user turns"
+    )
+    parser.add_argument("--capture-mode", choices=["lazy", "eager"], default="lazy")
+    parser.add_argument(
+        "--max-fps",
+        type=float,
+        default=0.0,
+        help="capture frame rate cap (0 = take every frame)",
+    )
+    parser.add_argument("--lag-threshold-ms", type=float, default=50.0)
+    parser.add_argument("--llm-ttft", type=float, default=FakeLatency.llm_ttft)
+    parser.add_argument("--tts-ttfb", type=float, default=FakeLatency.tts_ttfb)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    report = run_loadtest(
+        [int(n) for n in args.sessions.split(",")],
+        duration=args.duration,
+        fps=args.fps,
+        turn_interval=args.turn_interval,
+        capture_mode=args.capture_mode,
+        max_fps=args.max_fps,
+        lag_threshold_ms=args.lag_threshold_ms,
+        latency=FakeLatency(llm_ttft=args.llm_ttft, tts_ttfb=args.tts_ttfb),
+    )
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
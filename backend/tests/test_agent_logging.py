@@ -0,0 +1,78 @@
+import contextvars
+import logging
+import threading
+
+from agent_logging import (
+    LogRollup,
+    install_queue_logging,
+    log_sampled,
+    stop_queue_logging,
+)
+
+
+class _Collect(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[tuple[logging.LogRecord, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append((record, threading.current_thread().name))
+
+
+async def test_queue_logging_keeps_context_fields_and_formats_off_thread() -> None:
+    """Records are handled on the listener thread, with context fields added on the caller as before."""
+    room: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+        "room", default=None
+    )
+
+    class _ContextFields(logging.Filter):
+        def filter(self, record: logging.LogRecord) -> bool:
+            if room.get() is not None:
+                record.room = room.get()
+            return True
+
+    target = logging.getLogger("test-queue-logging")
+    target.propagate = False
+    collect = _Collect()
+    target.addHandler(collect)
+    install_queue_logging(target)
+    # As a job does on start, after the queue is installed
+    for handler in target.handlers:
+        handler.addFilter(_ContextFields())
+
+    room.set("copilot_123")
+    items = ["a"]
+    target.warning("frame %s", items)
+    items.append("b")
+    stop_queue_logging(target)
+
+    [(record, thread)] = collect.records
+    assert thread != threading.current_thread().name
+    assert record.getMessage() == "frame ['a']"
+    assert record.room == "copilot_123"
+
+
+async def test_rollup_logs_a_burst_then_summarizes(caplog) -> None:
+    """Past the burst, hot-path lines are only counted and reported in one summary with the average value."""
+    rollup = LogRollup(interval=30.0, burst=2)
+    rollup.activate()
+    with caplog.at_level(logging.INFO, logger="agent"):
+        for i in range(10):
+            log_sampled(
+                "screen frames encoded",
+                "encoded screen frame: %d bytes",
+                1000 * i,
+                value=1000 * i,
+                unit="bytes",
+            )
+        await rollup.aclose()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages[:2] == [
+        "encoded screen frame: 0 bytes",
+        "encoded screen frame: 1000 bytes",
+    ]
+    assert len(messages) == 3
+    assert messages[2].startswith("screen frames encoded: 10 in ")
+    assert messages[2].endswith("2 logged), avg 4500 bytes")
+    assert rollup.suppressed == 8
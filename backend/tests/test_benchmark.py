@@ -0,0 +1,57 @@
+import json
+import os
+
+import benchmark_memory
+import benchmark_startup
+from benchmark_pipeline import DEFAULT_SCRIPT, print_report, run_benchmark
+from fake_openai import FakeLatency
+
+
+async def test_pipeline_benchmark() -> None:
+    """Offline latency benchmark; guards the per-turn LLM payload against regressions."""
+    report = await run_benchmark(
+        latency=FakeLatency(
+            llm_ttft=0.05, llm_token_delay=0.005, stt=0.02, tts_ttfb=0.02
+        )
+    )
+    print_report(report)
+    if path := os.getenv("BENCHMARK_OUTPUT"):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    turns = report["turns"]
+    assert len(turns) == len(DEFAULT_SCRIPT)
+    assert all(t["turn_latency_s"] > 0 for t in turns)
+
+    # An unchanged screen is not attached again
+    assert [t["images_attached"] for t in turns[1:3]] == [1, 0]
+
+    # Screenshot history is bounded: later turns don't keep growing the request
+    screenshot_turns = [t["llm_request_bytes"] for t in turns if t["images_attached"]]
+    assert max(screenshot_turns) < 2.5 * screenshot_turns[0]
+
+    # Screenshots go last, so the text prefix keeps growing and is eventually served from cache
+    assert turns[-1]["llm_cached_tokens"] > 0
+
+
+def test_startup_benchmark() -> None:
+    """Cold start of a job process; importing the agent module must not pull in the job-only plugins."""
+    report = benchmark_startup.run_benchmark(runs=1)
+    benchmark_startup.print_report(report)
+
+    assert report["plugins_on_import"] == []
+    median = report["median"]
+    assert 0 < median["import_s"] < median["first_job_ready_s"]
+    assert median["prewarm_s"] > 0
+
+
+def test_memory_benchmark() -> None:
+    """A capture session encodes without full-size copies and builds each frame's data URL once."""
+    report = benchmark_memory.run_benchmark(turns=8)
+    benchmark_memory.print_report(report)
+
+    baseline, current = report["baseline"], report["current"]
+    assert current["frames_encoded"] == baseline["frames_encoded"] == 4
+    assert current["data_url_builds"] == 4 < baseline["data_url_builds"]
+    assert current["session_rss_growth_mb"] < baseline["session_rss_growth_mb"]
+    assert current["traced_peak_mb"] < baseline["traced_peak_mb"]
@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import openai as openai_lib
+from fake_openai import FakeLatency, FakeOpenAIServer
+from livekit.agents import Agent
+from livekit.agents.llm import ChatContext, FunctionCall, FunctionCallOutput
+from livekit.plugins import openai
+
+from chat_compaction import SUMMARY_ID, ChatCompactor, drop_tool_noise, history_bytes
+
+
+def _long_chat(turns: int) -> ChatContext:
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="system", content=["instructions"])
+    for i in range(turns):
+        chat_ctx.add_message(role="user", content=[f"user turn {i} " + "x" * 200])
+        call_id = f"call_{i}"
+        chat_ctx.items.append(
+            FunctionCall(
+                call_id=call_id, name="update_prompt", arguments='{"text": "a prompt"}'
+            )
+        )
+        chat_ctx.items.append(
+            FunctionCallOutput(
+                call_id=call_id,
+                name="update_prompt",
+                output="Prompt updated.",
+                is_error=False,
+            )
+        )
+        chat_ctx.add_message(
+            role="assistant", content=[f"assistant turn {i} " + "y" * 200]
+        )
+    return chat_ctx
+
+
+def test_drop_tool_noise_keeps_the_current_turn() -> None:
+    """UI tool calls are dropped once a later user message exists."""
+    chat_ctx = _long_chat(3)
+    assert drop_tool_noise(chat_ctx) == 4
+    assert [item.type for item in chat_ctx.items].count("function_call") == 1
+
+
+async def test_compaction_summarizes_older_turns_in_background() -> None:
+    """Older turns collapse into one summary item; recent turns stay verbatim."""
+    with FakeOpenAIServer(
+        latency=FakeLatency(llm_ttft=0.01, llm_token_delay=0.0),
+        reply="User likes hamburgers.",
+    ) as server:
+        client = openai_lib.AsyncClient(api_key="fake", base_url=server.base_url)
+        compactor = ChatCompactor(
+            openai.LLM(model="gpt-4o-mini", client=client),
+            max_bytes=2000,
+            keep_recent=4,
+        )
+        agent = Agent(instructions="instructions", chat_ctx=_long_chat(12))
+        before = history_bytes(agent.chat_ctx)
+
+        compactor.maybe_compact(agent)
+        await compactor._task
+        items = agent.chat_ctx.items
+        assert items[1].id == SUMMARY_ID
+        assert "User likes hamburgers." in items[1].text_content
+        assert items[-1].text_content.startswith("assistant turn 11")
+        assert history_bytes(agent.chat_ctx) < before / 2
+        # Within budget now, nothing to do
+        compactor.maybe_compact(agent)
+        assert compactor._task.done()
+
+        # The next compaction rolls the previous summary in rather than stacking another one
+        for i in range(12, 24):
+            chat_ctx = agent.chat_ctx.copy()
+            chat_ctx.add_message(role="user", content=[f"user turn {i} " + "x" * 200])
+            chat_ctx.add_message(
+                role="assistant", content=[f"assistant turn {i} " + "y" * 200]
+            )
+            await agent.update_chat_ctx(chat_ctx)
+        compactor.maybe_compact(agent)
+        await compactor._task
+        assert [item.id for item in agent.chat_ctx.items].count(SUMMARY_ID) == 1
+        assert compactor.stats()["compactions"] == 2
+        await client.close()
+
+
+async def test_compaction_follows_a_section_handoff() -> None:
+    """A summary that finishes after a handoff goes to the new agent, not the retired one."""
+    session = SimpleNamespace()
+
+    class _SectionAgent(Agent):
+        @property
+        def session(self):
+            return session
+
+    with FakeOpenAIServer(
+        latency=FakeLatency(llm_ttft=0.05, llm_token_delay=0.0),
+        reply="User likes hamburgers.",
+    ) as server:
+        client = openai_lib.AsyncClient(api_key="fake", base_url=server.base_url)
+        compactor = ChatCompactor(
+            openai.LLM(model="gpt-4o-mini", client=client),
+            max_bytes=2000,
+            keep_recent=4,
+        )
+        first = _SectionAgent(instructions="section 1", chat_ctx=_long_chat(12))
+        session.current_agent = first
+        compactor.maybe_compact(first)
+        await asyncio.sleep(0.01)
+
+        # The next section starts from the same history while the summary is generated
+        second = _SectionAgent(instructions="section 2", chat_ctx=first.chat_ctx)
+        session.current_agent = second
+        await compactor._task
+        assert second.chat_ctx.items[1].id == SUMMARY_ID
+        assert SUMMARY_ID not in [item.id for item in first.chat_ctx.items]
+        assert history_bytes(second.chat_ctx) < history_bytes(first.chat_ctx) / 2
+        await client.close()
@@ -0,0 +1,42 @@
+import agent
+from agent import LESSON_SECTIONS, Assistant, lesson_instructions, next_lesson_section
+
+
+def test_each_section_prompt_carries_only_its_script() -> None:
+    """Section prompts share the rules but not each other's scripts."""
+    assert list(LESSON_SECTIONS) == ["0", "1", "2", "3"]
+    assert [next_lesson_section(s) for s in LESSON_SECTIONS] == ["1", "2", "3", None]
+    for section, script in LESSON_SECTIONS.items():
+        instructions = lesson_instructions(section)
+        assert script in instructions
+        assert not any(
+            other in instructions
+            for other in LESSON_SECTIONS.values()
+            if other != script
+        )
+
+
+async def test_completing_a_section_hands_off_and_keeps_status_contract(
+    monkeypatch,
+) -> None:
+    """set_lesson_status still publishes every update and returns the next section's agent."""
+    published = []
+
+    async def _publish(section_id: str, status: str) -> None:
+        published.append((section_id, status))
+
+    monkeypatch.setattr(agent, "publish_lesson_status", _publish)
+    intro = Assistant()
+    assert intro.lesson_section == "0"
+
+    # Statuses for other sections are published without a handoff
+    assert isinstance(await intro.set_lesson_status(None, "2", "pending"), str)
+
+    lesson_1 = await intro.set_lesson_status(None, "0", "completed")
+    assert isinstance(lesson_1, Assistant)
+    assert lesson_1.lesson_section == "1"
+    assert lesson_1.instructions == lesson_instructions("1")
+
+    wrap_up = Assistant(lesson_section="3")
+    assert isinstance(await wrap_up.set_lesson_status(None, "3", "completed"), str)
+    assert published == [("2", "pending"), ("0", "completed"), ("3", "completed")]
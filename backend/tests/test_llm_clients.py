@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+import pytest
+
+from llm_clients import PortkeyClientPool
+
+
+def test_from_env_disabled_without_api_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("PORTKEY_API_KEY", raising=False)
+    assert PortkeyClientPool.from_env() is None
+
+
+async def test_sessions_share_one_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sessions share the pooled client and carry their own metadata headers; it outlives them until the process loop shuts down."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("PORTKEY_API_KEY", "pk-test")
+    monkeypatch.setenv("PORTKEY_VIRTUAL_KEY", "openai-vk")
+    pool = PortkeyClientPool.from_env()
+    assert pool is not None
+
+    first = pool.llm_for_session(session_id="s1", mode="lesson")
+    second = pool.llm_for_session(session_id="s2", mode="copilot")
+    assert first._client is second._client
+    http_client = first._client._client
+    assert http_client.headers["x-portkey-api-key"] == "pk-test"
+    assert http_client.headers["x-portkey-virtual-key"] == "openai-vk"
+    assert json.loads(second._opts.extra_headers["x-portkey-metadata"]) == {
+        "session_id": "s2",
+        "mode": "copilot",
+    }
+    assert pool.stats()["sessions"] == 2
+
+    summaries = pool.llm_for_summaries(session_id="s1", mode="lesson")
+    assert summaries._client is first._client and summaries is not first
+    assert summaries._opts.prompt_cache_key != first._opts.prompt_cache_key
+    assert pool.stats()["sessions"] == 2
+
+    pool.warm()
+    warm_task = pool._warm_task
+    pool.warm()
+    assert pool._warm_task is warm_task
+    warm_task.cancel()
+
+    await pool.release()
+    await pool.release()
+    assert pool.stats()["sessions"] == 0
+    assert not http_client.is_closed
+    assert pool.llm_for_session(session_id="s3", mode="lesson")._client is first._client
+
+    # What the job process does to pending tasks when it shuts its loop down
+    await asyncio.sleep(0)
+    closer = pool._closer
+    closer.cancel()
+    await asyncio.gather(closer, return_exceptions=True)
+    assert http_client.is_closed
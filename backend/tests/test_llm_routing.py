@@ -0,0 +1,82 @@
+import openai as openai_lib
+from fake_openai import FakeLatency, FakeOpenAIServer
+from livekit.agents.llm import ChatContext
+from livekit.plugins import openai
+
+from llm_routing import HedgedLLM
+
+
+def _chat_ctx() -> ChatContext:
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="user", content=["Which mode should I use?"])
+    return chat_ctx
+
+
+async def _reply(router: HedgedLLM) -> str:
+    parts = []
+    async with router.chat(chat_ctx=_chat_ctx()) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                parts.append(chunk.delta.content)
+    return "".join(parts)
+
+
+async def test_slow_primary_is_hedged_then_circuit_broken(caplog) -> None:
+    """A late first token sends the request to the other backend; repeated lateness demotes the primary."""
+    slow = FakeOpenAIServer(
+        latency=FakeLatency(llm_ttft=1.0, llm_token_delay=0.0), reply="slow reply"
+    )
+    fast = FakeOpenAIServer(
+        latency=FakeLatency(llm_ttft=0.02, llm_token_delay=0.0), reply="fast reply"
+    )
+    with slow, fast:
+        clients = [
+            openai_lib.AsyncClient(api_key="fake", base_url=server.base_url)
+            for server in (slow, fast)
+        ]
+        router = HedgedLLM(
+            [
+                ("portkey", openai.LLM(model="gpt-4o-mini", client=clients[0])),
+                ("openai", openai.LLM(model="gpt-4o-mini", client=clients[1])),
+            ],
+            hedge_after=0.2,
+            trip_after=2,
+        )
+        assert await _reply(router) == "fast reply"
+        assert await _reply(router) == "fast reply"
+        stats = router.stats()
+        assert stats["portkey"]["slow"] == 2 and stats["portkey"]["circuit_open"]
+        assert stats["openai"]["wins"] == 2 and stats["openai"]["hedges"] == 2
+
+        # With the primary's circuit open, the fast backend goes first and nothing is hedged
+        assert [name for name, _ in router.order()] == ["openai", "portkey"]
+        assert await _reply(router) == "fast reply"
+        assert router.stats()["openai"]["hedges"] == 2
+        assert router.stats()["openai"]["ttft_ms_p50"] < 200
+        for client in clients:
+            await client.close()
+
+    # First-token timing hooked into the real plugin's stream, not the fallback
+    assert not [r for r in caplog.records if "unavailable" in r.getMessage()]
+
+
+async def test_failed_primary_falls_back_without_waiting() -> None:
+    """A backend that errors before its first token is hedged immediately, not after the deadline."""
+    with FakeOpenAIServer(
+        latency=FakeLatency(llm_ttft=0.02, llm_token_delay=0.0), reply="direct reply"
+    ) as server:
+        down = openai_lib.AsyncClient(
+            api_key="fake", base_url="http://127.0.0.1:9/v1", max_retries=0
+        )
+        up = openai_lib.AsyncClient(api_key="fake", base_url=server.base_url)
+        router = HedgedLLM(
+            [
+                ("portkey", openai.LLM(model="gpt-4o-mini", client=down)),
+                ("openai", openai.LLM(model="gpt-4o-mini", client=up)),
+            ],
+            hedge_after=5.0,
+        )
+        assert await _reply(router) == "direct reply"
+        assert router.stats()["portkey"]["errors"] == 1
+        await down.close()
+        await up.close()
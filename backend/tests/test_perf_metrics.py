@@ -0,0 +1,73 @@
+from livekit.agents import metrics
+from prometheus_client import REGISTRY
+
+from perf_metrics import SessionMetrics
+
+
+def _count(name: str, mode: str) -> float:
+    return REGISTRY.get_sample_value(f"{name}_count", {"mode": mode}) or 0.0
+
+
+def _sum(name: str, mode: str) -> float:
+    return REGISTRY.get_sample_value(f"{name}_sum", {"mode": mode}) or 0.0
+
+
+def test_response_latency_combines_eou_llm_and_tts() -> None:
+    """Per-stage histograms are labelled by mode; the response latency is recorded once per speech."""
+    session_metrics = SessionMetrics("test-mode")
+    session_metrics.collect(
+        metrics.LLMMetrics.model_construct(
+            ttft=0.4,
+            cancelled=False,
+            speech_id="sp_1",
+            prompt_tokens=2000,
+            prompt_cached_tokens=0,
+        )
+    )
+    session_metrics.collect(
+        metrics.EOUMetrics.model_construct(
+            end_of_utterance_delay=0.5, transcription_delay=0.2, speech_id="sp_1"
+        )
+    )
+    assert _count("agent_response_latency_seconds", "test-mode") == 0
+    session_metrics.collect(
+        metrics.TTSMetrics.model_construct(ttfb=0.3, cancelled=False, speech_id="sp_1")
+    )
+    # A follow-up LLM round after a tool call doesn't count as a new response
+    session_metrics.collect(
+        metrics.LLMMetrics.model_construct(
+            ttft=0.9,
+            cancelled=False,
+            speech_id="sp_1",
+            prompt_tokens=2100,
+            prompt_cached_tokens=1920,
+        )
+    )
+
+    assert _count("agent_llm_ttft_seconds", "test-mode") == 2
+    assert _count("agent_response_latency_seconds", "test-mode") == 1
+    assert abs(_sum("agent_response_latency_seconds", "test-mode") - 1.2) < 1e-9
+
+    # Prompt cache hits are counted and split out of TTFT
+    assert (
+        REGISTRY.get_sample_value(
+            "agent_llm_prompt_cached_tokens_total", {"mode": "test-mode"}
+        )
+        == 1920
+    )
+    assert (
+        REGISTRY.get_sample_value(
+            "agent_llm_prompt_tokens_total", {"mode": "test-mode"}
+        )
+        == 4100
+    )
+    assert (
+        REGISTRY.get_sample_value(
+            "agent_llm_ttft_by_cache_seconds_count",
+            {"mode": "test-mode", "cache": "hit"},
+        )
+        == 1
+    )
+
+    session_metrics.observe_screen_image(120_000)
+    assert _sum("agent_screen_image_bytes", "test-mode") == 120_000
@@ -0,0 +1,121 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import openai as openai_lib
+from fake_openai import FakeLatency, FakeOpenAIServer
+from livekit.agents import function_tool
+from livekit.agents.llm import ChatContext
+from livekit.plugins import openai
+
+from prompt_stream import PROMPT_TOPIC, PromptStreamer, partial_json_string
+
+
+class _FakeWriter:
+    def __init__(self, streams: list, topic: str, attributes: dict) -> None:
+        self.chunks: list[str] = []
+        self.closed = False
+        streams.append((topic, attributes, self))
+
+    async def write(self, text: str) -> None:
+        self.chunks.append(text)
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class _FakeParticipant:
+    def __init__(self) -> None:
+        self.streams: list = []
+
+    async def stream_text(
+        self, *, topic: str = "", attributes: dict | None = None
+    ) -> _FakeWriter:
+        return _FakeWriter(self.streams, topic, attributes or {})
+
+
+def test_partial_json_string_only_returns_settled_text() -> None:
+    """Half-received escapes are held back so every result extends the previous one."""
+    assert partial_json_string('{"te', "text") is None
+    assert partial_json_string('{"text": ', "text") is None
+    assert partial_json_string('{"text": "Write a', "text") == "Write a"
+    assert partial_json_string('{"text": "line\\', "text") == "line"
+    assert partial_json_string('{"text": "line\\nnext \\u00e', "text") == "line\nnext "
+    assert partial_json_string('{"text": "caf\\u00e9 \\ud83d', "text") == "café "
+    assert (
+        partial_json_string('{"text": "caf\\u00e9 \\ud83d\\ude00"}', "text")
+        == "café 😀"
+    )
+    assert partial_json_string('{"text": "say \\"hi\\"", "x": 1}', "text") == 'say "hi"'
+
+
+async def test_update_prompt_arguments_stream_while_generated() -> None:
+    """The prompt text reaches the UI in chunks before the tool call completes."""
+    prompt = "Act as a travel planner. Plan a 3-day trip to Lisbon with a daily budget of 100 euros."
+
+    @function_tool
+    async def update_prompt(text: str) -> str:
+        """Set the suggested prompt."""
+        return "ok"
+
+    arguments = json.dumps({"text": prompt})
+    latency = FakeLatency(llm_ttft=0.01, llm_token_delay=0.005)
+    with FakeOpenAIServer(
+        latency=latency, tool_call=("update_prompt", arguments)
+    ) as server:
+        client = openai_lib.AsyncClient(api_key="fake", base_url=server.base_url)
+        participant = _FakeParticipant()
+        streamer = PromptStreamer(SimpleNamespace(local_participant=participant))
+        chat_ctx = ChatContext.empty()
+        chat_ctx.add_message(
+            role="user", content=["Give me a prompt for a Lisbon trip"]
+        )
+
+        calls = []
+        async with openai.LLM(model="gpt-4o-mini", client=client).chat(
+            chat_ctx=chat_ctx, tools=[update_prompt]
+        ) as stream:
+            # Fails loudly, rather than streaming silently turning off, if the plugin's internals move
+            assert streamer.watch(stream)
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.tool_calls:
+                    calls.extend(chunk.delta.tool_calls)
+                    # Partial text was already on its way before the call was complete
+                    assert streamer.stats()["prompt_chunks"] > 1
+        await streamer.aclose()
+        await client.close()
+
+    assert [call.arguments for call in calls] == [arguments]
+    [(topic, attributes, writer)] = participant.streams
+    assert topic == PROMPT_TOPIC and attributes == {
+        "type": "prompt_delta",
+        "call_id": "call_fake",
+    }
+    assert "".join(writer.chunks) == prompt
+    assert writer.closed
+
+
+async def test_streams_without_the_hook_point_are_reported(caplog) -> None:
+    """An LLM stream without the parse hook or tool-call state logs a warning instead of silently not streaming."""
+    streamer = PromptStreamer(SimpleNamespace(local_participant=_FakeParticipant()))
+
+    class _OpaqueStream:
+        pass
+
+    with caplog.at_level(logging.WARNING, logger="agent"):
+        assert not streamer.watch(_OpaqueStream())
+        assert not streamer.watch(_OpaqueStream())
+
+    class _NoToolState:
+        def _parse_choice(self, chunk_id, choice, *args):
+            return None
+
+    stream = _NoToolState()
+    with caplog.at_level(logging.WARNING, logger="agent"):
+        assert streamer.watch(stream)
+        stream._parse_choice("chunk", SimpleNamespace(delta=None))
+
+    warnings = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert len(warnings) == 2
+    assert "_OpaqueStream has no _parse_choice" in warnings[0]
+    assert "_NoToolState has no _tool_call_id" in warnings[1]
@@ -0,0 +1,257 @@
+import asyncio
+import io
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+from livekit import rtc
+from PIL import Image
+
+from screen_capture import (
+    SCREEN_ENCODE_OPTIONS,
+    EncodedFrame,
+    EncodeExecutor,
+    LazyFrameEncoder,
+    ScreenCapture,
+    ScreenChangeDetector,
+    cells_to_box,
+    encode_frame_jpeg,
+    lk_encode,
+    preferred_video_publication,
+)
+
+
+def _frame(width: int = 64, height: int = 48, value: int = 0) -> rtc.VideoFrame:
+    return rtc.VideoFrame(
+        width, height, rtc.VideoBufferType.RGBA, bytes([value]) * (width * height * 4)
+    )
+
+
+async def test_lazy_encoder_encodes_once_per_frame() -> None:
+    """Frames are only encoded on demand, and the result is cached until a newer frame arrives."""
+    encoder = LazyFrameEncoder(executor=EncodeExecutor(max_workers=1))
+    assert await encoder.get_encoded() is None
+
+    for i in range(10):
+        encoder.push(_frame(value=i))
+    assert encoder.stats() == {"frames_received": 10, "frames_encoded": 0}
+
+    first = await encoder.get_encoded()
+    assert first and first.jpeg[:2] == b"\xff\xd8"
+    assert await encoder.get_encoded() is first
+    assert encoder.stats() == {"frames_received": 10, "frames_encoded": 1}
+
+    encoder.push(_frame(value=200))
+    assert await encoder.get_encoded() is not first
+    assert encoder.stats() == {"frames_received": 11, "frames_encoded": 2}
+
+
+async def test_clear_during_encode_drops_the_result() -> None:
+    """A frame still being encoded when the track goes away never reaches the cache."""
+    executor = EncodeExecutor(max_workers=1)
+    release = threading.Event()
+    blocker = asyncio.ensure_future(executor.run_latest("blocker", release.wait))
+    encoder = LazyFrameEncoder(executor=executor)
+    encoder.push(_frame(value=10))
+    pending = asyncio.ensure_future(encoder.get_encoded())
+    await asyncio.sleep(0.05)
+
+    encoder.clear()
+    release.set()
+    assert await pending is None
+    await blocker
+    assert encoder._encoded is None
+    assert encoder.stats()["frames_encoded"] == 0
+
+    encoder.push(_frame(value=120))
+    assert (await encoder.get_encoded()).seq == 2
+
+
+async def test_executor_drops_oldest_pending_job() -> None:
+    """Only the newest queued job per key runs; earlier waiters receive its result."""
+    executor = EncodeExecutor(max_workers=1)
+    release = threading.Event()
+
+    blocker = asyncio.ensure_future(executor.run_latest("blocker", release.wait))
+    await asyncio.sleep(0.05)
+
+    waiters = [
+        asyncio.ensure_future(executor.run_latest("session", lambda v=v: v))
+        for v in range(5)
+    ]
+    await asyncio.sleep(0)
+    assert executor.stats()["queue_depth"] == 1
+
+    release.set()
+    assert await blocker is True
+    assert await asyncio.gather(*waiters) == [4] * 5
+
+    stats = executor.stats()
+    assert stats["submitted"] == 6
+    assert stats["dropped"] == 4
+    assert stats["completed"] == 2
+    assert stats["queue_depth"] == 0
+
+
+async def test_change_detector_skips_unchanged_frames() -> None:
+    """Identical frames are only attached once; a visible change is attached again."""
+    encoder = LazyFrameEncoder(executor=EncodeExecutor(max_workers=1))
+    detector = ScreenChangeDetector(threshold=0.0)
+
+    encoder.push(_frame(value=10))
+    encoded = await encoder.get_encoded()
+    assert detector.should_attach(encoded)
+    detector.mark_attached(encoded)
+    # Same frame object, then a new but identical frame
+    assert not detector.should_attach(await encoder.get_encoded())
+    encoder.push(_frame(value=10))
+    assert not detector.should_attach(await encoder.get_encoded())
+
+    encoder.push(_frame(value=120))
+    encoded = await encoder.get_encoded()
+    assert detector.should_attach(encoded)
+    detector.mark_attached(encoded)
+    assert detector.stats() == {"attachments": 2, "attachments_avoided": 2}
+
+
+async def test_change_detector_baseline_is_the_last_attached_frame() -> None:
+    """A changed frame that wasn't attached (budget, OCR) doesn't become the baseline."""
+    encoder = LazyFrameEncoder(executor=EncodeExecutor(max_workers=1))
+    detector = ScreenChangeDetector(threshold=0.0)
+    encoder.push(_frame(value=10))
+    first = await encoder.get_encoded()
+    assert detector.should_attach(first)
+    detector.mark_attached(first)
+
+    encoder.push(_frame(value=120))
+    skipped = await encoder.get_encoded()
+    assert detector.should_attach(skipped)
+    # Not attached: the same frame is still a change on the next turn
+    assert detector.should_attach(skipped)
+    encoder.push(_frame(value=10))
+    # Back to what the model last saw
+    assert not detector.should_attach(await encoder.get_encoded())
+    assert detector.stats() == {"attachments": 1, "attachments_avoided": 1}
+
+
+async def test_capture_rate_cap_keeps_the_newest_frame() -> None:
+    """Frames over max_fps never reach the encoder, but the newest one is taken at the next slot."""
+    capture = ScreenCapture(SimpleNamespace(), max_fps=10)
+    frames = [_frame(value=i) for i in range(5)]
+    for frame in frames:
+        capture.offer_frame(frame)
+    assert capture.encoder._frame is frames[0]
+
+    await asyncio.sleep(0.15)
+    assert capture.encoder._frame is frames[-1]
+    stats = capture.stats()
+    assert (
+        stats["frames_delivered"],
+        stats["frames_skipped"],
+        stats["frames_processed"],
+    ) == (5, 3, 2)
+    assert stats["frames_received"] == 2
+
+
+def test_preferred_video_publication_prefers_screenshare() -> None:
+    """Screen share wins over camera regardless of subscription order; ties go to the newest."""
+    camera = SimpleNamespace(sid="TR_cam", source=rtc.TrackSource.SOURCE_CAMERA)
+    screen = SimpleNamespace(sid="TR_screen", source=rtc.TrackSource.SOURCE_SCREENSHARE)
+    screen2 = SimpleNamespace(
+        sid="TR_screen2", source=rtc.TrackSource.SOURCE_SCREENSHARE
+    )
+
+    assert preferred_video_publication([]) is None
+    assert preferred_video_publication([camera]) is camera
+    assert preferred_video_publication([screen, camera]) is screen
+    assert preferred_video_publication([camera, screen, screen2]) is screen2
+
+
+async def test_downscaled_copy_is_cached_per_frame() -> None:
+    """Low-detail turns get a smaller JPEG of the same frame, encoded once."""
+    encoder = LazyFrameEncoder(executor=EncodeExecutor(max_workers=1))
+    encoder.push(_frame(width=1280, height=720, value=90))
+    encoded = await encoder.get_encoded()
+    assert (encoded.width, encoded.height) == (1024, 576)
+
+    small = await encoder.get_downscaled(encoded, 512)
+    assert (small.width, small.height) == (512, 288)
+    assert len(small.jpeg) < len(encoded.jpeg) and small.seq == encoded.seq
+    assert await encoder.get_downscaled(encoded, 512) is small
+    assert await encoder.get_downscaled(encoded, 2048) is encoded
+
+
+async def test_region_crop_covers_only_the_changed_area() -> None:
+    """A local change yields a padded native-resolution crop around it; a full-page change doesn't."""
+    encoder = LazyFrameEncoder(executor=EncodeExecutor(max_workers=1))
+    detector = ScreenChangeDetector(threshold=0.0)
+    encoder.push(_frame(width=1280, height=720, value=255))
+    first = await encoder.get_encoded()
+    assert detector.should_attach(first)
+    assert detector.last_changed_cells is None
+    detector.mark_attached(first)
+
+    # A dark "menu" opens at x 800-1000, y 100-400
+    pixels = np.full((720, 1280, 4), 255, dtype=np.uint8)
+    pixels[100:400, 800:1000] = 0
+    encoder.push(rtc.VideoFrame(1280, 720, rtc.VideoBufferType.RGBA, pixels.tobytes()))
+    encoded = await encoder.get_encoded()
+    assert detector.should_attach(encoded)
+    box = encoder.changed_region(
+        encoded, detector.last_changed_cells, padding=16, max_area=0.5
+    )
+    x0, y0, x1, y1 = box
+    assert x0 <= 800 - 16 and y0 <= 100 - 16 and x1 >= 1000 + 16 and y1 >= 400 + 16
+    assert (x1 - x0) * (y1 - y0) < 0.1 * 1280 * 720
+
+    crop = await encoder.get_region(encoded, box)
+    assert (crop.width, crop.height) == (x1 - x0, y1 - y0)
+    assert crop.region == box and crop.jpeg[:2] == b"\xff\xd8"
+    assert (
+        encoder.changed_region(encoded, (0, 0, 64, 64), padding=16, max_area=0.5)
+        is None
+    )
+
+    # The raw frame is gone once a newer one arrives
+    encoder.push(_frame(width=1280, height=720, value=0))
+    assert await encoder.get_region(encoded, box) is None
+
+
+def test_cells_to_box_clamps_and_keeps_edge_pixels() -> None:
+    """The last cell row/column extends to the frame edge; padding stays inside the frame."""
+    assert cells_to_box((0, 0, 1, 1), (64, 64), 1300, 650, padding=8) == (0, 0, 28, 18)
+    assert cells_to_box((63, 63, 64, 64), (64, 64), 1300, 650, padding=8) == (
+        1252,
+        622,
+        1300,
+        650,
+    )
+
+
+def test_plane_encode_matches_lk_encode() -> None:
+    """Encoding I420 straight from its planes gives the same picture as lk_encode, and the data URL is built once."""
+    x, y = np.arange(1280), np.arange(720)
+    pixels = np.empty((720, 1280, 4), dtype=np.uint8)
+    pixels[..., 0] = (x * 255 // 1280).astype(np.uint8)
+    pixels[..., 1] = (y * 255 // 720).astype(np.uint8)[:, None]
+    pixels[..., 2] = (
+        (x // 40 % 2).astype(np.uint8) ^ (y // 40 % 2).astype(np.uint8)[:, None]
+    ) * 200
+    pixels[..., 3] = 255
+    frame = rtc.VideoFrame(
+        1280, 720, rtc.VideoBufferType.RGBA, pixels.tobytes()
+    ).convert(rtc.VideoBufferType.I420)
+
+    jpeg, width, height = encode_frame_jpeg(frame, SCREEN_ENCODE_OPTIONS)
+    assert (width, height) == (1024, 576)
+    ours = np.asarray(Image.open(io.BytesIO(jpeg)).convert("RGB"), dtype=np.float32)
+    theirs = np.asarray(
+        Image.open(io.BytesIO(lk_encode(frame, SCREEN_ENCODE_OPTIONS))).convert("RGB"),
+        dtype=np.float32,
+    )
+    assert ours.shape == theirs.shape
+    assert np.abs(ours - theirs).mean() < 4
+
+    encoded = EncodedFrame(seq=1, jpeg=jpeg, signature=None, width=width, height=height)
+    assert encoded.data_url.startswith("data:image/jpeg;base64,/9j/")
+    assert encoded.data_url is encoded.data_url
@@ -0,0 +1,47 @@
+import numpy as np
+
+from screen_capture import EncodedFrame, EncodeExecutor
+from screen_ocr import OcrResult, ScreenTextReader
+
+
+def _encoded(seq: int, jpeg: bytes) -> EncodedFrame:
+    return EncodedFrame(seq=seq, jpeg=jpeg, signature=np.zeros((1, 1)))
+
+
+async def test_reader_runs_ocr_once_per_distinct_frame() -> None:
+    """A frame whose bytes were already read comes from the cache, even under a new sequence number."""
+    calls = []
+
+    def engine(jpeg: bytes) -> OcrResult:
+        calls.append(jpeg)
+        return OcrResult(text="New chat\nAsk anything", confidence=0.9, words=4)
+
+    reader = ScreenTextReader(engine, executor=EncodeExecutor(max_workers=1))
+    first = await reader.read(_encoded(1, b"page-a"))
+    assert reader.usable(first)
+    assert await reader.read(_encoded(2, b"page-b")) == first
+    assert await reader.read(_encoded(3, b"page-a")) == first
+    assert calls == [b"page-a", b"page-b"]
+    assert reader.stats()["ocr_runs"] == 2 and reader.stats()["ocr_cache_hits"] == 1
+
+
+async def test_low_confidence_or_failed_ocr_is_not_usable() -> None:
+    """Unreadable screens fall back to the image instead of passing garbled text."""
+
+    def engine(jpeg: bytes) -> OcrResult:
+        if jpeg == b"broken":
+            raise RuntimeError("tesseract crashed")
+        return OcrResult(text="~ |l ::", confidence=0.3, words=3)
+
+    reader = ScreenTextReader(
+        engine, executor=EncodeExecutor(max_workers=1), max_chars=4
+    )
+    blurry = await reader.read(_encoded(1, b"blurry"))
+    assert blurry.text == "~ |l"
+    assert not reader.usable(blurry)
+    assert await reader.read(_encoded(2, b"broken")) is None
+    assert not reader.usable(None)
+    assert (
+        reader.stats()["ocr_failures"] == 1
+        and reader.stats()["ocr_low_confidence"] == 1
+    )
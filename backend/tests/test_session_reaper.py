@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+from livekit import rtc
+
+from screen_capture import EncodeExecutor, ScreenCapture
+from session_reaper import IdleReaper
+
+
+def _frame(value: int) -> rtc.VideoFrame:
+    return rtc.VideoFrame(
+        64, 48, rtc.VideoBufferType.RGBA, bytes([value]) * (64 * 48 * 4)
+    )
+
+
+def _reaper(**kwargs) -> tuple[IdleReaper, list[str]]:
+    events: list[str] = []
+
+    async def on_prompt() -> None:
+        events.append("prompt")
+
+    async def on_shutdown(reason: str) -> None:
+        events.append("shutdown")
+
+    kwargs.setdefault("hard_timeout", 10.0)
+    reaper = IdleReaper(
+        on_prompt=on_prompt,
+        on_shutdown=on_shutdown,
+        prompt_after=0.1,
+        shutdown_after=0.1,
+        **kwargs,
+    )
+    return reaper, events
+
+
+async def test_idle_session_is_prompted_then_reaped() -> None:
+    """A silent session is prompted, then shut down, and the rest of the hard timeout is counted as reclaimed."""
+    reaper, events = _reaper()
+    reaper.start()
+    await asyncio.wait_for(reaper._task, 2.0)
+
+    assert events == ["prompt", "shutdown"]
+    stats = reaper.stats()
+    assert stats["reaped"] and stats["idle_prompts"] == 1
+    assert 9.0 < stats["reclaimed_worker_seconds"] < 10.0
+
+
+async def test_speech_and_agent_turns_keep_the_session_alive() -> None:
+    """Answering the prompt withdraws it, and the idle clock is paused while the agent speaks."""
+    reaper, events = _reaper()
+    reaper.start()
+    await asyncio.sleep(0.15)
+    assert events == ["prompt"]
+
+    reaper._on_user_state_changed(SimpleNamespace(new_state="speaking"))
+    reaper._on_user_state_changed(SimpleNamespace(new_state="listening"))
+    reaper._on_agent_state_changed(SimpleNamespace(new_state="speaking"))
+    await asyncio.sleep(0.3)
+    assert events == ["prompt"]
+
+    reaper._on_agent_state_changed(SimpleNamespace(new_state="listening"))
+    await asyncio.wait_for(reaper._task, 2.0)
+    assert events == ["prompt", "prompt", "shutdown"]
+    assert reaper.stats()["resumed_after_prompt"] == 1
+    assert reaper.stats()["activity"] == {"speech": 1}
+
+
+async def test_screen_changes_count_as_activity() -> None:
+    """A user working on their shared screen without talking is not prompted."""
+    changes = iter([True] * 6)
+
+    async def probe() -> bool:
+        return next(changes, False)
+
+    reaper, events = _reaper(screen_probe=probe, screen_poll=0.05)
+    reaper.start()
+    await asyncio.sleep(0.3)
+    assert events == []
+    await asyncio.wait_for(reaper._task, 2.0)
+    assert events == ["prompt", "shutdown"]
+    assert reaper.stats()["activity"]["screen"] == 6
+
+
+async def test_screen_activity_poll_compares_signatures_without_encoding() -> None:
+    """Polling reports a change only when the frame's luma signature moved, and never JPEG-encodes."""
+    capture = ScreenCapture(SimpleNamespace(), change_threshold=0.002)
+    capture.encoder._executor = EncodeExecutor(max_workers=1)
+    assert await capture.poll_activity() is False
+
+    capture.push_frame(_frame(value=10))
+    assert await capture.poll_activity() is False
+    capture.push_frame(_frame(value=10))
+    assert await capture.poll_activity() is False
+    capture.push_frame(_frame(value=200))
+    assert await capture.poll_activity() is True
+    assert capture.encoder.frames_encoded == 0
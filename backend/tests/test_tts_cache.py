@@ -0,0 +1,81 @@
+import asyncio
+
+from livekit import rtc
+
+from tts_cache import PhraseAudioCache
+
+
+class _FakeStream:
+    async def __aenter__(self) -> "_FakeStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        pass
+
+    async def collect(self) -> rtc.AudioFrame:
+        await asyncio.sleep(0.01)
+        return rtc.AudioFrame(
+            data=bytes(4800 * 2),
+            sample_rate=24000,
+            num_channels=1,
+            samples_per_channel=4800,
+        )
+
+
+class _FakeTTS:
+    model = "fake-tts"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def synthesize(self, text: str) -> _FakeStream:
+        self.calls += 1
+        return _FakeStream()
+
+
+async def test_phrase_is_synthesized_once_and_persisted(tmp_path) -> None:
+    """Concurrent fills share one TTS request; a new cache instance (new process) loads it from disk."""
+    tts_engine = _FakeTTS()
+    cache = PhraseAudioCache(cache_dir=str(tmp_path))
+    assert cache.lookup(tts_engine, "Hello!", voice="echo") is None
+
+    first, second = await asyncio.gather(
+        cache.fill(tts_engine, "Hello!", voice="echo"),
+        cache.fill(tts_engine, "Hello!", voice="echo"),
+    )
+    assert first is second
+    assert tts_engine.calls == 1
+    # 200ms of audio, replayed as 100ms frames
+    assert [f.samples_per_channel for f in first.frames()] == [2400, 2400]
+
+    fresh = PhraseAudioCache(cache_dir=str(tmp_path))
+    assert fresh.preload("Hello!", "echo", "fake-tts")
+    assert fresh.lookup(tts_engine, "Hello!", voice="echo").pcm == first.pcm
+    assert fresh.stats() == {"entries": 1, "hits": 1, "misses": 0}
+
+
+async def test_prefetch_loads_from_disk_without_synthesis(tmp_path) -> None:
+    """In a session, phrases on disk reach memory through prefetch; lookup alone never reads the disk."""
+    tts_engine = _FakeTTS()
+    await PhraseAudioCache(cache_dir=str(tmp_path)).fill(
+        tts_engine, "Hello!", voice="echo"
+    )
+
+    fresh = PhraseAudioCache(cache_dir=str(tmp_path))
+    assert fresh.lookup(tts_engine, "Hello!", voice="echo") is None
+    fresh.prefetch(tts_engine, "Hello!", voice="echo")
+    for _ in range(100):
+        if fresh.stats()["entries"]:
+            break
+        await asyncio.sleep(0.01)
+    assert fresh.lookup(tts_engine, "Hello!", voice="echo") is not None
+    assert tts_engine.calls == 1
+
+
+async def test_memory_and_disk_eviction(tmp_path) -> None:
+    tts_engine = _FakeTTS()
+    cache = PhraseAudioCache(cache_dir=str(tmp_path), max_entries=1, max_disk_entries=2)
+    for text in ("one", "two", "three"):
+        await cache.fill(tts_engine, text, voice="echo")
+    assert cache.stats()["entries"] == 1
+    assert len(list(tmp_path.glob("*.wav"))) == 2
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+
+from ui_publisher import UiPublisher
+
+
+class _FakeParticipant:
+    def __init__(self, failures: int = 0, delay: float = 0.0) -> None:
+        self.sent: list[tuple[str, dict]] = []
+        self.failures = failures
+        self.delay = delay
+
+    async def publish_data(
+        self, data: bytes, *, reliable: bool = True, topic: str = ""
+    ) -> None:
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("data channel not ready")
+        self.sent.append((topic, json.loads(data)))
+
+
+def _publisher(participant: _FakeParticipant) -> UiPublisher:
+    publisher = UiPublisher(
+        SimpleNamespace(local_participant=participant), retry_delay=0.01
+    )
+    publisher.start()
+    return publisher
+
+
+async def test_prompt_bursts_coalesce_and_statuses_keep_order() -> None:
+    """Queued prompt updates collapse to the newest; lesson statuses go out in the order queued."""
+    participant = _FakeParticipant(delay=0.02)
+    publisher = _publisher(participant)
+    publisher.publish("lesson-status", {"id": "0", "status": "completed"})
+    for i in range(5):
+        publisher.publish(
+            "prompt-update", {"text": f"draft {i}"}, coalesce_key="prompt"
+        )
+    publisher.publish("lesson-status", {"id": "1", "status": "active"})
+    await publisher.aclose()
+
+    assert participant.sent == [
+        ("lesson-status", {"id": "0", "status": "completed"}),
+        ("prompt-update", {"text": "draft 4"}),
+        ("lesson-status", {"id": "1", "status": "active"}),
+    ]
+    stats = publisher.stats()
+    assert stats["published"] == 3 and stats["coalesced"] == 4 and stats["pending"] == 0
+    assert stats["latency_ms_max"] >= 20
+
+
+async def test_failed_publishes_are_retried_in_place() -> None:
+    """A transient failure is retried before anything queued after it is sent."""
+    participant = _FakeParticipant(failures=2)
+    publisher = _publisher(participant)
+    publisher.publish("lesson-status", {"id": "0", "status": "completed"})
+    publisher.publish("lesson-status", {"id": "1", "status": "active"})
+    await publisher.aclose()
+
+    assert [payload["id"] for _, payload in participant.sent] == ["0", "1"]
+    assert publisher.stats()["retried"] == 2 and publisher.stats()["failed"] == 0
+
+
+async def test_published_payloads_are_not_logged(caplog) -> None:
+    """The prompt text stays out of the logs; only the topic and payload size are logged."""
+    participant = _FakeParticipant()
+    publisher = _publisher(participant)
+    publisher.publish(
+        "prompt-update", {"text": "my secret draft"}, coalesce_key="prompt"
+    )
+    with caplog.at_level(logging.INFO, logger="agent"):
+        await publisher.aclose()
+
+    assert participant.sent == [("prompt-update", {"text": "my secret draft"})]
+    assert "published prompt-update" in caplog.text
+    assert "my secret draft" not in caplog.text
@@ -0,0 +1,109 @@
+from livekit.agents.llm import (
+    ChatContext,
+    FunctionCall,
+    FunctionCallOutput,
+    ImageContent,
+)
+
+from vision_context import (
+    SCREENSHOT_PLACEHOLDER,
+    estimate_request_bytes,
+    prune_screenshots,
+    screenshots_last,
+)
+
+
+def _ctx_with_screenshots(count: int) -> ChatContext:
+    chat_ctx = ChatContext.empty()
+    for i in range(count):
+        chat_ctx.add_message(
+            role="user",
+            content=[
+                f"turn {i}",
+                ImageContent(
+                    image="data:image/jpeg;base64," + "A" * 1000,
+                    inference_detail="high",
+                ),
+            ],
+        )
+    return chat_ctx
+
+
+def test_prune_replaces_older_screenshots_with_placeholder() -> None:
+    """Only the newest screenshots survive; the original context is left untouched."""
+    original = _ctx_with_screenshots(5)
+    chat_ctx = original.copy()
+    before = estimate_request_bytes(chat_ctx)
+
+    assert prune_screenshots(chat_ctx, keep=2) == 3
+    contents = [item.content[1] for item in chat_ctx.items]
+    assert contents[:3] == [SCREENSHOT_PLACEHOLDER] * 3
+    assert all(isinstance(c, ImageContent) for c in contents[3:])
+    assert estimate_request_bytes(chat_ctx) < before / 2
+
+    assert all(isinstance(item.content[1], ImageContent) for item in original.items)
+    # Already pruned, nothing left to do
+    assert prune_screenshots(chat_ctx, keep=2) == 0
+
+
+def test_prune_low_detail_policy() -> None:
+    """The "low" policy keeps older images but downgrades their inference detail."""
+    chat_ctx = _ctx_with_screenshots(3)
+    assert prune_screenshots(chat_ctx, keep=1, policy="low") == 2
+    details = [item.content[1].inference_detail for item in chat_ctx.items]
+    assert details == ["low", "low", "high"]
+
+
+def test_screenshots_last_keeps_the_prompt_prefix_stable() -> None:
+    """Each request is the previous one plus new turns, with only the latest user message differing."""
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="system", content=["instructions"])
+    requests = []
+    for turn in range(3):
+        chat_ctx.add_message(
+            role="user",
+            content=[
+                f"turn {turn}",
+                ImageContent(image=f"data:image/jpeg;base64,{turn}AAA" + "A" * 100),
+            ],
+        )
+        prune_screenshots(chat_ctx, keep=2)
+        messages, _ = screenshots_last(chat_ctx).to_provider_format("openai")
+        requests.append(messages)
+        chat_ctx.add_message(role="assistant", content=[f"reply {turn}"])
+
+    for previous, current in zip(requests, requests[1:]):
+        assert current[: len(previous) - 1] == previous[:-1]
+    # Images only ever appear in the last message, the user's latest turn
+    last = requests[-1]
+    assert all("image_url" not in str(m) for m in last[:-1])
+    assert sum(part["type"] == "image_url" for part in last[-1]["content"]) == 2
+    # The context the agent keeps is unchanged
+    assert isinstance(chat_ctx.items[-2].content[1], ImageContent)
+
+
+def test_screenshots_join_the_latest_user_message_not_a_new_turn() -> None:
+    """When the context ends in tool output, images go on the user's message and no user turn is invented."""
+    chat_ctx = _ctx_with_screenshots(2)
+    chat_ctx.items.append(
+        FunctionCall(call_id="call_1", name="set_lesson_status", arguments="{}")
+    )
+    chat_ctx.items.append(
+        FunctionCallOutput(
+            call_id="call_1", name="set_lesson_status", output="ok", is_error=False
+        )
+    )
+
+    request = screenshots_last(chat_ctx)
+    assert [item.type for item in request.items] == [
+        item.type for item in chat_ctx.items
+    ]
+    assert [item.role for item in request.items if item.type == "message"] == [
+        "user",
+        "user",
+    ]
+    assert request.items[-1].type == "function_call_output"
+    first, latest = request.items[0], request.items[1]
+    assert first.content == ["turn 0", SCREENSHOT_PLACEHOLDER]
+    assert latest.content[:2] == ["turn 1", SCREENSHOT_PLACEHOLDER]
+    assert sum(isinstance(c, ImageContent) for c in latest.content) == 2
@@ -0,0 +1,109 @@
+from vision_policy import SCREEN_REFERENCE, VisionPolicy, estimate_image_tokens
+
+
+def test_image_token_estimate_follows_tiling() -> None:
+    """Low detail is flat; high detail pays per 512px tile after fitting."""
+    assert estimate_image_tokens(1024, 576, "low") == 85
+    assert estimate_image_tokens(512, 288, "high") == 85 + 170
+    assert estimate_image_tokens(1024, 576, "high") == 85 + 170 * 4
+    # Scaled so the short side is 768: 1365x768 is 3x2 tiles
+    assert estimate_image_tokens(2560, 1440, "high") == 85 + 170 * 6
+
+
+def test_policy_picks_detail_from_diff_and_transcript() -> None:
+    """Big changes and screen references get high detail; small changes while chatting get low."""
+    policy = VisionPolicy(token_budget=100_000)
+    first = policy.decide(diff=None, transcript="hi", width=1024, height=576)
+    assert (first.attach, first.detail, first.max_side) == (True, "high", 1024)
+    assert (
+        policy.decide(diff=0.4, transcript="ok", width=1024, height=576).detail
+        == "high"
+    )
+    small = policy.decide(diff=0.01, transcript="I like pizza", width=1024, height=576)
+    assert (small.detail, small.max_side, small.tokens) == ("low", 512, 85)
+    assert (
+        policy.decide(
+            diff=0.01, transcript="What is this button?", width=1024, height=576
+        ).detail
+        == "high"
+    )
+    assert (
+        policy.stats()["image_tokens_saved"]
+        == estimate_image_tokens(1024, 576, "high") - 85
+    )
+
+    always_high = VisionPolicy(policy="high")
+    assert (
+        always_high.decide(
+            diff=0.01, transcript="I like pizza", width=1024, height=576
+        ).detail
+        == "high"
+    )
+
+
+def test_budget_downgrades_then_stops_attaching() -> None:
+    """Once the session's image budget runs low, high turns go low, then nothing is attached."""
+    policy = VisionPolicy(token_budget=1000)
+    assert (
+        policy.decide(diff=None, transcript="", width=1024, height=576).detail == "high"
+    )
+    downgraded = policy.decide(diff=0.5, transcript="look here", width=1024, height=576)
+    assert downgraded.detail == "low" and "over budget" in downgraded.reason
+    assert policy.decide(diff=0.01, transcript="", width=1024, height=576).attach
+    skipped = policy.decide(diff=0.01, transcript="", width=1024, height=576)
+    assert not skipped.attach and skipped.tokens == 0
+    assert policy.stats()["skipped"] == 1
+
+
+def test_region_crop_is_high_detail_unless_screen_is_referenced() -> None:
+    """A small crop goes at native size and high detail; pointing at the screen gets the whole of it."""
+    policy = VisionPolicy(token_budget=100_000)
+    crop = policy.decide(
+        diff=0.02,
+        transcript="ok",
+        width=1024,
+        height=576,
+        region=(300, 200),
+        thumbnail=True,
+    )
+    assert (crop.crop, crop.detail, crop.max_side) == (True, "high", 300)
+    assert crop.tokens == estimate_image_tokens(300, 200, "high") + 85
+    full = policy.decide(
+        diff=0.02,
+        transcript="where is the save button",
+        width=1024,
+        height=576,
+        region=(300, 200),
+    )
+    assert not full.crop and full.max_side == 1024
+
+
+def test_refunded_crop_is_recharged_as_the_full_screenshot() -> None:
+    """When the crop can't be made, its tokens come back and the full screenshot is charged."""
+    policy = VisionPolicy(token_budget=100_000)
+    crop = policy.decide(
+        diff=0.02, transcript="ok", width=1024, height=576, region=(300, 200)
+    )
+    policy.refund(crop)
+    assert policy.stats() == {
+        "image_tokens_used": 0,
+        "image_tokens_saved": 0,
+        "high": 0,
+    }
+    full = policy.decide(diff=0.02, transcript="ok", width=1024, height=576)
+    assert not full.crop
+    assert policy.stats()["image_tokens_used"] == full.tokens
+
+
+def test_everyday_speech_is_not_a_screen_reference() -> None:
+    """Ordinary sentences stay at low detail; only words about the screen itself raise it."""
+    for transcript in ("that sounds good", "where were we", "I see, look at that"):
+        assert not SCREEN_REFERENCE.search(transcript)
+        policy = VisionPolicy(token_budget=100_000)
+        policy.decide(diff=None, transcript="hi", width=1024, height=576)
+        decision = policy.decide(
+            diff=0.01, transcript=transcript, width=1024, height=576
+        )
+        assert decision.detail == "low"
+    for transcript in ("I clicked the menu", "there's an error", "can you see my tab?"):
+        assert SCREEN_REFERENCE.search(transcript)
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import time
+
+from worker_load import JobCostModel, JobLoadReporter, WorkerLoadEstimator
+
+
+def test_cost_model_charges_capture_encodes_streams_and_lag() -> None:
+    """A copilot job encoding a screen share costs more than an idle voice-only lesson."""
+    model = JobCostModel()
+    lesson = model.cost({"mode": "lesson"})
+    copilot = model.cost(
+        {
+            "mode": "copilot",
+            "capture_active": True,
+            "encodes_per_second": 2,
+            "llm_streams": 1,
+        }
+    )
+    assert lesson == model.base_cost("lesson")
+    assert copilot > lesson + model.capture_active
+    lagging = model.cost({"mode": "lesson", "loop_lag_ms": 1000})
+    assert lagging == lesson + model.max_lag_penalty
+
+
+async def test_reporter_feeds_estimator_and_admission(tmp_path) -> None:
+    """Job reports drive the worker load; new jobs are refused before it crosses the threshold."""
+    reporter = JobLoadReporter(
+        "job_a", "copilot", str(tmp_path), interval=0.05, tick=0.01
+    )
+    reporter.watch_capture(lambda: True, lambda: 0)
+    reporter.start()
+    with reporter.llm_stream():
+        await asyncio.sleep(0.15)
+    report = json.loads((tmp_path / "job_a.json").read_text())
+    assert report["capture_active"] is True
+
+    estimator = WorkerLoadEstimator(str(tmp_path), threshold=0.3)
+    load = estimator.estimate([("job_a", "copilot_room"), ("job_b", "lesson_room")])
+    model = estimator.cost_model
+    assert estimator.snapshot()["jobs"]["job_b"] == model.base_cost("lesson")
+    assert load >= model.base_cost("copilot") + model.capture_active + model.base_cost(
+        "lesson"
+    )
+    assert estimator.admit("lesson")
+    estimator.estimate(
+        [("job_a", "copilot_room"), ("job_b", "lesson_room"), ("job_c", "copilot_room")]
+    )
+    assert not estimator.admit("copilot")
+
+    await reporter.aclose()
+    assert not (tmp_path / "job_a.json").exists()
+
+
+def test_stale_reports_fall_back_to_base_cost(tmp_path) -> None:
+    """A report from a hung job is ignored rather than trusted forever."""
+    (tmp_path / "job_a.json").write_text(
+        json.dumps(
+            {"mode": "copilot", "capture_active": True, "updated_at": time.time() - 60}
+        )
+    )
+    estimator = WorkerLoadEstimator(str(tmp_path), stale_after=5.0)
+    estimator.estimate([("job_a", "copilot_room")])
+    assert estimator.snapshot()["jobs"]["job_a"] == estimator.cost_model.base_cost(
+        "copilot"
+    )
+
+
+def test_owned_report_dir_is_removed_on_close(monkeypatch) -> None:
+    """Without WORKER_LOAD_DIR the estimator's temporary report directory doesn't outlive the worker."""
+    monkeypatch.delenv("WORKER_LOAD_DIR", raising=False)
+    estimator = WorkerLoadEstimator.from_env()
+    report_dir = estimator.report_dir
+    (report_dir / "job_a.json").write_text("{}")
+    assert os.environ["WORKER_LOAD_DIR"] == str(report_dir)
+
+    estimator.close()
+    assert not report_dir.exists()
+    assert "WORKER_LOAD_DIR" not in os.environ
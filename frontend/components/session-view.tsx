@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { AnimatePresence, motion } from 'motion/react';
 import {
   type AgentState,
@@ -18,7 +18,7 @@ import { useDebugMode } from '@/hooks/useDebug';
 import type { AppConfig } from '@/lib/types';
 import { cn } from '@/lib/utils';
 import { ConversationStatus, type ConversationSection } from '@/components/conversation-status';
-import { RoomEvent } from 'livekit-client';
+import { RoomEvent, type TextStreamReader } from 'livekit-client';
 import { CopyIcon } from '@phosphor-icons/react/dist/ssr';
 
 function isAgentAvailable(agentState: AgentState) {
@@ -54,6 +54,10 @@ export const SessionView = React.forwardRef<
 
   const [sections, setSections] = useState<ConversationSection[]>(createInitialSections());
   const [promptText, setPromptText] = useState<string>('');
+  // True while the agent is still generating the prompt and its text streams in
+  const [promptStreaming, setPromptStreaming] = useState<boolean>(false);
+  // Tool call ids whose final prompt_update already arrived; late stream chunks for them are ignored
+  const committedPromptCalls = useRef<Set<string>>(new Set());
   const [copiedAt, setCopiedAt] = useState<number>(0);
 
   // Reset to a fresh state for each session start
@@ -61,6 +65,8 @@ export const SessionView = React.forwardRef<
     if (sessionStarted) {
       setSections(createInitialSections());
       setPromptText('');
+      setPromptStreaming(false);
+      committedPromptCalls.current.clear();
     }
   }, [sessionStarted]);
 
@@ -84,16 +90,44 @@ export const SessionView = React.forwardRef<
             return next;
           });
         } else if (msg?.type === 'prompt_update' && typeof msg.text === 'string') {
+          // Commits the prompt, replacing any text streamed while it was generated
+          if (typeof msg.call_id === 'string') {
+            committedPromptCalls.current.add(msg.call_id);
+          }
           setPromptText(msg.text);
+          setPromptStreaming(false);
         }
       } catch {
         // ignore malformed payloads
       }
     }
 
+    // Partial prompt text, streamed while the agent generates the update_prompt call
+    async function onPromptStream(reader: TextStreamReader) {
+      const callId = reader.info.attributes?.call_id ?? '';
+      if (committedPromptCalls.current.has(callId)) {
+        return;
+      }
+      setPromptText('');
+      setPromptStreaming(true);
+      try {
+        for await (const chunk of reader) {
+          if (committedPromptCalls.current.has(callId)) {
+            break;
+          }
+          setPromptText((prev) => prev + chunk);
+        }
+      } catch {
+        // the final prompt_update still arrives as a data message
+      }
+      setPromptStreaming(false);
+    }
+
     room.on(RoomEvent.DataReceived, onData as any);
+    room.registerTextStreamHandler('prompt-update', onPromptStream);
     return () => {
       room.off(RoomEvent.DataReceived, onData as any);
+      room.unregisterTextStreamHandler('prompt-update');
     };
   }, [room]);
 
@@ -185,8 +219,12 @@ export const SessionView = React.forwardRef<
                   <span className="hidden md:inline">{copiedAt ? 'Copied' : 'Copy'}</span>
                 </button>
               </div>
-              <div className="mt-3 max-h-64 overflow-auto rounded-lg border border-fg2/30 bg-background p-3 text-sm leading-6 whitespace-pre-wrap break-words">
+              <div
+                className="mt-3 max-h-64 overflow-auto rounded-lg border border-fg2/30 bg-background p-3 text-sm leading-6 whitespace-pre-wrap break-words"
+                aria-busy={promptStreaming}
+              >
                 {promptText}
+                {promptStreaming && <span className="ml-0.5 inline-block animate-pulse">▍</span>}
               </div>
             </div>
           )}